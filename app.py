@@ -2,11 +2,8 @@ import streamlit as st
 import os
 import random
 from dotenv import load_dotenv
-from modules.ai_service import AIService
-from modules.syllabary import JapaneseSyllabary
-from modules.user_data import UserProgressManager
-from modules.content_recommender import ContentRecommender
-from modules.practice_manager import PracticeManager  # Import the new module
+from modules import metrics
+from modules.service_container import ServiceContainer
 
 # Load environment variables
 load_dotenv()
@@ -18,17 +15,48 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize services
+# Initialize services (each one is imported and built on first use)
 @st.cache_resource
 def init_services():
-    ai_service = AIService()
-    syllabary = JapaneseSyllabary()
-    user_manager = UserProgressManager()
-    recommender = ContentRecommender(ai_service)
-    practice_manager = PracticeManager()  # Initialize the practice manager
-    return ai_service, syllabary, user_manager, recommender, practice_manager
+    # Prometheus endpoint for the latency histograms, only when TONEMASTER_METRICS=1
+    metrics.start_http_exporter()
+    return ServiceContainer()
 
-ai_service, syllabary, user_manager, recommender, practice_manager = init_services()
+services = init_services()
+
+# Fragments rerun only their own widgets; older Streamlit versions rerun the whole script
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+def pinned_exercise(slot, generate):
+    """Get the exercise pinned to a page slot, generating one only when the slot is empty
+    
+    Returns (exercise, token). The token changes with every new exercise, so widgets
+    keyed on it start blank instead of carrying over the previous answer.
+    """
+    exercises = st.session_state.setdefault("exercises", {})
+    if slot not in exercises:
+        st.session_state.exercise_generation = st.session_state.get("exercise_generation", 0) + 1
+        exercises[slot] = (generate(), st.session_state.exercise_generation)
+    return exercises[slot]
+
+def banked_exercise(difficulty, practice_type, syllabary_data=None):
+    """Pin an exercise from generate_exercise, drawn along the learner's own order through the exercise bank
+    
+    Exercises in the learner's recent history of the practice type are skipped.
+    """
+    user_manager = services.user_manager
+    return pinned_exercise(f"{difficulty}:{practice_type}", lambda: services.practice_manager.generate_exercise(
+        practice_type, difficulty, syllabary_data, user_manager.exercise_cursor(),
+        user_manager.recent_fingerprints(difficulty, practice_type)))
+
+def next_exercise(slot):
+    """Drop the pinned exercise so the next run generates a fresh one"""
+    st.session_state.setdefault("exercises", {}).pop(slot, None)
+
+def start_practice(difficulty, practice_type):
+    """Make a practice type the active one for a difficulty tab, with a fresh exercise"""
+    st.session_state.setdefault("active_practice", {})[difficulty] = practice_type
+    next_exercise(f"{difficulty}:{practice_type}")
 
 # Sidebar menu
 st.sidebar.title("ToneMaster AI")
@@ -36,119 +64,132 @@ page = st.sidebar.radio(
     "Navigation",
     ["Home", "Learn Hiragana", "Learn Katakana", "Practice", "Settings"]
 )
+metrics.increment("page_views_total", page=page)
 
-# User interests for personalization
-if "interests" not in st.session_state:
-    st.session_state.interests = []
+def render_page(page):
+    """Render the body of the selected page"""
+    # User interests for personalization
+    if "interests" not in st.session_state:
+        st.session_state.interests = []
 
-# Home page
-if page == "Home":
-    st.title("Welcome to ToneMaster AI")
-    st.write("Learn Japanese syllabary through personalized AI-powered lessons.")
-    
-    # User interest collection
-    if not st.session_state.interests:
-        st.subheader("Let's personalize your learning experience")
-        interest = st.text_input("What topics interest you? (e.g., anime, travel, food)")
-        if st.button("Add Interest"):
-            if interest:
-                st.session_state.interests.append(interest)
-                st.success(f"Added '{interest}' to your interests!")
-                
-    # Display current interests
-    if st.session_state.interests:
-        st.subheader("Your interests:")
-        for i in st.session_state.interests:
-            st.write(f"• {i}")
+    # Home page
+    if page == "Home":
+        st.title("Welcome to ToneMaster AI")
+        st.write("Learn Japanese syllabary through personalized AI-powered lessons.")
         
-        # Generate personalized recommendation
-        if st.button("Generate Personalized Learning Path"):
-            with st.spinner("Creating your personalized learning experience..."):
-                recommendation = recommender.generate_recommendation(st.session_state.interests)
-                st.session_state.recommendation = recommendation
-                
-        if "recommendation" in st.session_state:
-            st.subheader("Your Personalized Learning Path")
-            st.write(st.session_state.recommendation)
-
-# Syllabary learning pages
-elif page in ["Learn Hiragana", "Learn Katakana"]:
-    syllabary_type = "hiragana" if page == "Learn Hiragana" else "katakana"
-    st.title(f"Learn {syllabary_type.capitalize()}")
-    
-    # Display syllabary chart
-    st.subheader(f"{syllabary_type.capitalize()} Chart")
-    chart = syllabary.get_chart(syllabary_type)
-    st.table(chart)
-    
-    # Interactive learning
-    st.subheader("Practice Section")
-    character = syllabary.get_random_character(syllabary_type)
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown(f"## {character['symbol']}")
-    
-    with col2:
-        user_answer = st.text_input("What is the pronunciation? (romaji)")
-        if st.button("Check"):
-            if user_answer.lower() == character['romaji'].lower():
-                st.success("Correct! 🎉")
-                user_manager.record_success(syllabary_type, character['symbol'])
-            else:
-                st.error(f"Not quite. The correct answer is '{character['romaji']}'")
-                user_manager.record_mistake(syllabary_type, character['symbol'])
+        # User interest collection
+        if not st.session_state.interests:
+            st.subheader("Let's personalize your learning experience")
+            interest = st.text_input("What topics interest you? (e.g., anime, travel, food)")
+            if st.button("Add Interest"):
+                if interest:
+                    st.session_state.interests.append(interest)
+                    st.success(f"Added '{interest}' to your interests!")
+                    
+        # Display current interests
+        if st.session_state.interests:
+            st.subheader("Your interests:")
+            for i in st.session_state.interests:
+                st.write(f"• {i}")
+            
+            # Generate personalized recommendation
+            if st.button("Generate Personalized Learning Path"):
+                with st.spinner("Creating your personalized learning experience..."):
+                    recommendation = services.recommender.generate_recommendation(st.session_state.interests)
+                    st.session_state.recommendation = recommendation
+                    
+            if "recommendation" in st.session_state:
+                st.subheader("Your Personalized Learning Path")
+                st.write(st.session_state.recommendation)
+            
+            # Connect with learners who share these interests
+            if st.button("Find Learners with Similar Interests"):
+                learner_index = services.learner_index
+                user_manager = services.user_manager
+                if learner_index.upsert(user_manager.user_id, st.session_state.interests, user_manager.progress_data):
+                    learner_index.save_if_due()
+                similar_learners = learner_index.find_similar(user_manager.user_id, k=10)
+                if similar_learners:
+                    st.subheader("Learners like you")
+                    for learner_id, similarity in similar_learners:
+                        shared = learner_index.shared_interests(user_manager.user_id, learner_id)
+                        st.write(f"• {learner_id} ({similarity * 100:.0f}% match)"
+                                 + (f" — also into {', '.join(shared)}" if shared else ""))
+                else:
+                    st.info("No other learners yet. Check back soon!")
 
-# Practice page
-elif page == "Practice":
-    st.title("Practice Your Skills")
-    
-    # Tabs for different difficulty levels
-    difficulty_tabs = st.tabs(["Beginner", "Intermediate", "Advanced"])
-    
-    # Beginner tab
-    with difficulty_tabs[0]:
-        st.header("Beginner Level Practice")
-        st.write("Perfect for those just starting to learn Japanese characters and basic vocabulary.")
+    # Syllabary learning pages
+    elif page in ["Learn Hiragana", "Learn Katakana"]:
+        syllabary_type = "hiragana" if page == "Learn Hiragana" else "katakana"
+        st.title(f"Learn {syllabary_type.capitalize()}")
+        syllabary = services.syllabary
+        user_manager = services.user_manager
         
-        # Add practice recommendations
-        recommended_practice = user_manager.get_recommended_practice("beginner")
-        if recommended_practice:
-            format_name = {
-                "kana_recognition": "Listen & Recognize Kana",
-                "kana_matching": "Match Hiragana & Katakana",
-                "simple_vocabulary": "Basic Word Practice",
-                "word_image_matching": "Match Words with Images",
-                "listen_and_choose": "Listen and Choose"
-            }.get(recommended_practice, recommended_practice.replace("_", " ").title())
-            
-            st.info(f"💡 Recommended: Try '{format_name}' to improve your skills!")
+        # Display syllabary chart
+        st.subheader(f"{syllabary_type.capitalize()} Chart")
+        chart = syllabary.get_chart(syllabary_type)
+        st.table(chart)
+        with st.expander("Contracted Sounds (Yoon)"):
+            st.table(syllabary.get_yoon_chart(syllabary_type))
         
-        # Practice types for beginners
-        beginner_activities = practice_manager.get_practice_activities("beginner")
-        beginner_practice_type = st.selectbox(
-            "Choose practice type:",
-            beginner_activities,
-            format_func=lambda x: {
-                "kana_recognition": "Listen & Recognize Kana",
-                "kana_matching": "Match Hiragana & Katakana",
-                "simple_vocabulary": "Basic Word Practice",
-                "word_image_matching": "Match Words with Images",
-                "listen_and_choose": "Listen and Choose"
-            }.get(x, x.replace("_", " ").title())
-        )
+        # Interactive learning
+        st.subheader("Practice Section")
+        slot = f"learn:{syllabary_type}"
+        character, token = pinned_exercise(slot, lambda: syllabary.get_random_character(syllabary_type))
         
-        # Start practice session button
-        if st.button("Start Beginner Practice"):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown(f"## {character['symbol']}")
+            st.button("Next Character", on_click=next_exercise, args=(slot,))
+        
+        with col2:
+            user_answer = st.text_input("What is the pronunciation? (romaji)", key=f"{slot}:{token}")
+            if st.button("Check"):
+                result = services.answer_checker.check(user_answer, kana=character['symbol'])
+                if result.correct:
+                    st.success("Correct! 🎉")
+                    user_manager.record_success(syllabary_type, character['symbol'])
+                elif result.close:
+                    st.warning(f"Almost! The correct answer is '{character['romaji']}'")
+                    user_manager.record_mistake(syllabary_type, character['symbol'])
+                else:
+                    st.error(f"Not quite. The correct answer is '{character['romaji']}'")
+                    user_manager.record_mistake(syllabary_type, character['symbol'])
+        
+        # AI example sentences for the current character
+        if st.button("Show Example Sentences"):
+            with st.spinner("Finding example sentences..."):
+                examples = services.ai_service.generate_example_sentences(character['symbol'], st.session_state.interests)
+            if examples:
+                for example in examples:
+                    st.write(f"**{example.japanese}**  \n{example.romaji}  \n{example.english}")
+            else:
+                st.info("No example sentences are available right now.")
+
+    # Practice page
+    elif page == "Practice":
+        st.title("Practice Your Skills")
+        syllabary = services.syllabary
+        user_manager = services.user_manager
+        with st.spinner("Loading practice content..."):
+            practice_manager = services.practice_manager
+        
+        @fragment
+        def beginner_exercise(practice_type):
+            """Render the pinned beginner exercise; its widgets rerun only this fragment"""
+            slot = f"beginner:{practice_type}"
+
             # Create practice exercise based on selected type
-            if beginner_practice_type == "kana_recognition":
-                # Choose a random syllabary type for this exercise
-                target_syllabary = "hiragana" if random.random() > 0.5 else "katakana"
-                syllabary_data = syllabary.hiragana if target_syllabary == "hiragana" else syllabary.katakana
-                exercise = practice_manager.generate_exercise("kana_recognition", "beginner", syllabary_data)
+            if practice_type == "kana_recognition":
+                def generate():
+                    # Choose a random syllabary type for this exercise
+                    target_syllabary = "hiragana" if random.random() > 0.5 else "katakana"
+                    syllabary_data = syllabary.hiragana if target_syllabary == "hiragana" else syllabary.katakana
+                    return practice_manager.generate_exercise("kana_recognition", "beginner", syllabary_data)
+                exercise, token = pinned_exercise(slot, generate)
                 
                 st.write(f"## {exercise['question']}")
-                user_answer = st.radio("Select the correct character:", exercise['options'])
+                user_answer = st.radio("Select the correct character:", exercise['options'], key=f"{slot}:{token}")
                 
                 check_col1, check_col2 = st.columns([1, 4])
                 with check_col1:
@@ -165,28 +206,28 @@ elif page == "Practice":
                             user_manager.record_practice_result("beginner", "kana_recognition", False, exercise['answer'])
                         st.info(exercise['explanation'])
                 
-            elif beginner_practice_type == "kana_matching":
-                exercise = practice_manager.generate_exercise("kana_matching", "beginner", 
-                                                            {"hiragana": syllabary.hiragana, "katakana": syllabary.katakana})
+            elif practice_type == "kana_matching":
+                exercise, token = banked_exercise(
+                    "beginner", "kana_matching", {"hiragana": syllabary.hiragana, "katakana": syllabary.katakana})
                 
                 st.write(f"## {exercise['question']}")
-                user_answer = st.radio("Select the matching katakana:", exercise['options'])
+                user_answer = st.radio("Select the matching katakana:", exercise['options'], key=f"{slot}:{token}")
                 
                 if st.button("Check Answer", key="matching_check"):
                     if user_answer == exercise['answer']:
                         st.success("Correct! 🎉")
                         st.session_state.last_result = True
                         # Record successful practice result
-                        user_manager.record_practice_result("beginner", "kana_matching", True, exercise['answer'])
+                        user_manager.record_practice_result("beginner", "kana_matching", True, exercise['answer'], exercise.get('fingerprint'))
                     else:
                         st.error(f"Not quite. The correct answer is '{exercise['answer']}'")
                         st.session_state.last_result = False
                         # Record unsuccessful practice result
-                        user_manager.record_practice_result("beginner", "kana_matching", False, exercise['answer'])
+                        user_manager.record_practice_result("beginner", "kana_matching", False, exercise['answer'], exercise.get('fingerprint'))
                     st.info(exercise['explanation'])
                 
-            elif beginner_practice_type == "simple_vocabulary":
-                exercise = practice_manager.generate_exercise("simple_vocabulary", "beginner")
+            elif practice_type == "simple_vocabulary":
+                exercise, token = banked_exercise("beginner", "simple_vocabulary")
                 
                 st.write(f"## {exercise['question']}")
                 
@@ -194,82 +235,58 @@ elif page == "Practice":
                 if 'image' in exercise and exercise['image']:
                     st.write("(Image would be displayed here)")
                 
-                user_answer = st.radio("Select the meaning:", exercise['options'])
+                user_answer = st.radio("Select the meaning:", exercise['options'], key=f"{slot}:{token}")
                 
                 if st.button("Check Answer", key="vocab_check"):
                     if user_answer == exercise['answer']:
                         st.success("Correct! 🎉")
                         st.session_state.last_result = True
                         # Track progress
-                        user_manager.record_practice_result("beginner", "simple_vocabulary", True, exercise['question'])
+                        user_manager.record_practice_result("beginner", "simple_vocabulary", True, exercise['question'], exercise.get('fingerprint'))
                     else:
                         st.error(f"Not quite. The correct answer is '{exercise['answer']}'")
                         st.session_state.last_result = False
                         # Track progress
-                        user_manager.record_practice_result("beginner", "simple_vocabulary", False, exercise['question'])
+                        user_manager.record_practice_result("beginner", "simple_vocabulary", False, exercise['question'], exercise.get('fingerprint'))
                     st.info(exercise['explanation'])
             
-            elif beginner_practice_type == "listen_and_choose":
-                exercise = practice_manager.generate_listen_and_choose_exercise()
+            elif practice_type == "listen_and_choose":
+                exercise, token = banked_exercise("beginner", "listen_and_choose")
                 
                 st.write(f"## {exercise['question']}")
                 
-                # In a real implementation, this would play actual audio
                 st.info(f"Listen to the word: {exercise['japanese_text']}")
+                clip = services.audio_cache.open(exercise['audio_word'])
+                if clip is not None:
+                    # Streamlit reads the reader itself, so the clip is inflated once, straight into its media store
+                    with clip:
+                        st.audio(clip, format="audio/wav")
                 
-                user_answer = st.radio("Select the meaning:", exercise['options'])
+                user_answer = st.radio("Select the meaning:", exercise['options'], key=f"{slot}:{token}")
                 
                 if st.button("Check Answer", key="listen_check"):
                     if user_answer == exercise['answer']:
                         st.success("Correct! 🎉")
                         st.session_state.last_result = True
                         # Record the successful practice result
-                        user_manager.record_practice_result("beginner", "listen_and_choose", True, exercise['japanese_text'])
+                        user_manager.record_practice_result("beginner", "listen_and_choose", True, exercise['japanese_text'], exercise.get('fingerprint'))
                     else:
                         st.error(f"Not quite. The correct answer is '{exercise['answer']}'")
                         st.session_state.last_result = False
                         # Record the unsuccessful practice result
-                        user_manager.record_practice_result("beginner", "listen_and_choose", False, exercise['japanese_text'])
+                        user_manager.record_practice_result("beginner", "listen_and_choose", False, exercise['japanese_text'], exercise.get('fingerprint'))
                     st.info(exercise['explanation'])
-    
-    # Intermediate tab
-    with difficulty_tabs[1]:
-        st.header("Intermediate Level Practice")
-        st.write("For learners who have mastered the basics and are ready for more complex patterns.")
-        
-        # Add practice recommendations
-        recommended_practice = user_manager.get_recommended_practice("intermediate")
-        if recommended_practice:
-            format_name = {
-                "common_phrases": "Common Japanese Phrases",
-                "vocabulary_categories": "Vocabulary by Category",
-                "sentence_completion": "Complete the Sentence",
-                "speed_challenge": "Speed Recognition Challenge",
-                "special_kana_combinations": "Special Kana Combinations",
-                "listening_comprehension": "Listening Comprehension"
-            }.get(recommended_practice, recommended_practice.replace("_", " ").title())
             
-            st.info(f"💡 Recommended: Try '{format_name}' to improve your skills!")
-        
-        # Practice types for intermediate level
-        intermediate_activities = practice_manager.get_practice_activities("intermediate")
-        intermediate_practice_type = st.selectbox(
-            "Choose practice type:",
-            intermediate_activities,
-            format_func=lambda x: {
-                "common_phrases": "Common Japanese Phrases",
-                "vocabulary_categories": "Vocabulary by Category",
-                "sentence_completion": "Complete the Sentence",
-                "speed_challenge": "Speed Recognition Challenge",
-                "special_kana_combinations": "Special Kana Combinations",
-                "listening_comprehension": "Listening Comprehension"
-            }.get(x, x.replace("_", " ").title())
-        )
+            st.button("Next Exercise", key=f"{slot}:next", on_click=next_exercise, args=(slot,))
         
-        # Start practice session button
-        if st.button("Start Intermediate Practice"):
-            if intermediate_practice_type == "vocabulary_categories":
-                exercise = practice_manager.generate_exercise("vocabulary_categories", "intermediate")
+
+        @fragment
+        def intermediate_exercise(practice_type):
+            """Render the pinned intermediate exercise; its widgets rerun only this fragment"""
+            slot = f"intermediate:{practice_type}"
+
+            if practice_type == "vocabulary_categories":
+                exercise, token = banked_exercise("intermediate", "vocabulary_categories")
                 
                 st.write(f"## {exercise['question']}")
                 
@@ -277,7 +294,7 @@ elif page == "Practice":
                 if exercise.get('multiple_answers', False):
                     selected_options = []
                     for option in exercise['options']:
-                        if st.checkbox(option, key=f"option_{option}"):
+                        if st.checkbox(option, key=f"{slot}:{token}:{option}"):
                             selected_options.append(option)
                     
                     if st.button("Check Answers", key="categories_check"):
@@ -285,29 +302,33 @@ elif page == "Practice":
                             st.success("All correct! 🎉")
                             st.session_state.last_result = True
                             # Record successful practice result
-                            user_manager.record_practice_result("intermediate", "vocabulary_categories", True, exercise['question'])
+                            user_manager.record_practice_result("intermediate", "vocabulary_categories", True, exercise['question'], exercise.get('fingerprint'))
                         else:
                             st.error(f"Not quite. The correct answers are: {', '.join(exercise['answers'])}")
                             st.session_state.last_result = False
                             # Record unsuccessful practice result
-                            user_manager.record_practice_result("intermediate", "vocabulary_categories", False, exercise['question'])
+                            user_manager.record_practice_result("intermediate", "vocabulary_categories", False, exercise['question'], exercise.get('fingerprint'))
                         st.info(exercise['explanation'])
                         
-            elif intermediate_practice_type == "common_phrases":
-                # Choose a random phrase
-                phrase, meaning = random.choice(list(practice_manager.common_phrases.items()))
+            elif practice_type == "common_phrases":
+                def generate():
+                    # Choose a random phrase
+                    phrase, meaning = random.choice(list(practice_manager.common_phrases.items()))
+                    
+                    # Create options (1 correct + 3 random)
+                    options = [meaning]
+                    other_meanings = [m for m in practice_manager.common_phrases.values() if m != meaning]
+                    options.extend(random.sample(other_meanings, min(3, len(other_meanings))))
+                    random.shuffle(options)
+                    return {"phrase": phrase, "meaning": meaning, "options": options}
+                exercise, token = pinned_exercise(slot, generate)
+                phrase, meaning = exercise["phrase"], exercise["meaning"]
                 
                 # Create a listening exercise (simulated)
                 st.write("## Listen to the phrase and select its meaning")
                 st.write(f"Phrase: {phrase}")
                 
-                # Create options (1 correct + 3 random)
-                options = [meaning]
-                other_meanings = [m for m in practice_manager.common_phrases.values() if m != meaning]
-                options.extend(random.sample(other_meanings, min(3, len(other_meanings))))
-                random.shuffle(options)
-                
-                user_answer = st.radio("Select the meaning:", options)
+                user_answer = st.radio("Select the meaning:", exercise["options"], key=f"{slot}:{token}")
                 
                 if st.button("Check Answer", key="phrases_check"):
                     if user_answer == meaning:
@@ -321,90 +342,68 @@ elif page == "Practice":
                         # Record unsuccessful practice result
                         user_manager.record_practice_result("intermediate", "common_phrases", False, phrase)
             
-            elif intermediate_practice_type == "sentence_completion":
-                # Get a simple sentence from the Tatoeba database
-                if practice_manager.sentences["intermediate"]:
+            elif practice_type == "sentence_completion":
+                def generate():
+                    # Get a simple sentence from the Tatoeba database
+                    if not practice_manager.sentences["intermediate"]:
+                        return None
                     sentence = random.choice(practice_manager.sentences["intermediate"])
                     
                     # Split sentence into words (simplified approach)
                     words = sentence["text"].replace("。", "").split()
+                    if len(words) <= 2:  # Ensure sentence has enough words
+                        return None
                     
-                    if len(words) > 2:  # Ensure sentence has enough words
-                        # Choose a random word to blank out
-                        blank_index = random.randint(0, len(words) - 1)
-                        correct_word = words[blank_index]
-                        
-                        # Create the question by replacing the word with a blank
-                        words[blank_index] = "＿＿＿"
-                        question_text = " ".join(words)
-                        
-                        st.write(f"## Complete the sentence: {question_text}")
-                        
-                        # Add options (simplified)
-                        options = [correct_word]
-                        # Add some distractors
-                        for _ in range(3):
-                            if practice_manager.sentences["beginner"]:
-                                distractor_sentence = random.choice(practice_manager.sentences["beginner"])
-                                distractor_words = distractor_sentence["text"].replace("。", "").split()
-                                if distractor_words:
-                                    options.append(random.choice(distractor_words))
-                        
-                        # Ensure we have 4 options
-                        while len(options) < 4:
-                            options.append("わたし")  # Add a common word as fallback
-                        
-                        user_answer = st.radio("Select the missing word:", options)
-                        
-                        if st.button("Check Answer", key="completion_check"):
-                            if user_answer == correct_word:
-                                st.success("Correct! 🎉")
-                                st.session_state.last_result = True
-                            else:
-                                st.error(f"Not quite. The correct answer is '{correct_word}'")
-                                st.session_state.last_result = False
-                                
-                            # Show the complete sentence
-                            st.info(f"Complete sentence: {sentence['text']}")
-    
-    # Advanced tab
-    with difficulty_tabs[2]:
-        st.header("Advanced Level Practice")
-        st.write("Challenge yourself with complex grammar, conversations, and reading comprehension.")
-        
-        # Add practice recommendations for advanced level
-        recommended_practice = user_manager.get_recommended_practice("advanced")
-        if recommended_practice:
-            format_name = {
-                "dialogue_comprehension": "Dialogue Comprehension",
-                "grammar_application": "Grammar Usage",
-                "sentence_creation": "Create Sentences",
-                "verb_conjugation": "Verb Conjugation",
-                "reading_comprehension": "Reading Comprehension",
-                "speech_practice": "Speech Practice"
-            }.get(recommended_practice, recommended_practice.replace("_", " ").title())
+                    # Choose a random word to blank out
+                    blank_index = random.randint(0, len(words) - 1)
+                    correct_word = words[blank_index]
+                    
+                    # Create the question by replacing the word with a blank
+                    words[blank_index] = "＿＿＿"
+                    
+                    # Add options (simplified)
+                    options = [correct_word]
+                    # Add some distractors, from sentences of the same difficulty and length
+                    for distractor_sentence in practice_manager.distractor_sentences(sentence, 3):
+                        distractor_words = distractor_sentence["text"].replace("。", "").split()
+                        if distractor_words:
+                            options.append(random.choice(distractor_words))
+                    
+                    # Ensure we have 4 options
+                    while len(options) < 4:
+                        options.append("わたし")  # Add a common word as fallback
+                    return {"sentence": sentence, "question": " ".join(words),
+                            "correct_word": correct_word, "options": options}
+                exercise, token = pinned_exercise(slot, generate)
+                
+                if exercise:
+                    sentence, correct_word = exercise["sentence"], exercise["correct_word"]
+                    
+                    st.write(f"## Complete the sentence: {exercise['question']}")
+                    
+                    user_answer = st.radio("Select the missing word:", exercise["options"], key=f"{slot}:{token}")
+                    
+                    if st.button("Check Answer", key="completion_check"):
+                        if user_answer == correct_word:
+                            st.success("Correct! 🎉")
+                            st.session_state.last_result = True
+                        else:
+                            st.error(f"Not quite. The correct answer is '{correct_word}'")
+                            st.session_state.last_result = False
+                            
+                        # Show the complete sentence
+                        st.info(f"Complete sentence: {sentence['text']}")
             
-            st.info(f"💡 Recommended: Try '{format_name}' to improve your skills!")
-        
-        # Practice types for advanced level
-        advanced_activities = practice_manager.get_practice_activities("advanced")
-        advanced_practice_type = st.selectbox(
-            "Choose practice type:",
-            advanced_activities,
-            format_func=lambda x: {
-                "dialogue_comprehension": "Dialogue Comprehension",
-                "grammar_application": "Grammar Usage",
-                "sentence_creation": "Create Sentences",
-                "verb_conjugation": "Verb Conjugation",
-                "reading_comprehension": "Reading Comprehension",
-                "speech_practice": "Speech Practice"
-            }.get(x, x.replace("_", " ").title())
-        )
+            st.button("Next Exercise", key=f"{slot}:next", on_click=next_exercise, args=(slot,))
         
-        # Start practice session button
-        if st.button("Start Advanced Practice"):
-            if advanced_practice_type == "dialogue_comprehension":
-                exercise = practice_manager.generate_dialogue_comprehension()
+
+        @fragment
+        def advanced_exercise(practice_type):
+            """Render the pinned advanced exercise; its widgets rerun only this fragment"""
+            slot = f"advanced:{practice_type}"
+
+            if practice_type == "dialogue_comprehension":
+                exercise, token = banked_exercise("advanced", "dialogue_comprehension")
                 
                 st.write("## Read the following dialogue:")
                 dialogue_container = st.container()
@@ -413,7 +412,7 @@ elif page == "Practice":
                         st.write(f"**{line['speaker']}**: {line['text']}")
                 
                 st.write(f"**Question**: {exercise['question']}")
-                user_answer = st.radio("Select your answer:", exercise['options'])
+                user_answer = st.radio("Select your answer:", exercise['options'], key=f"{slot}:{token}")
                 
                 if st.button("Check Answer", key="dialogue_check"):
                     if user_answer == exercise['answer']:
@@ -424,11 +423,14 @@ elif page == "Practice":
                         st.session_state.last_result = False
                     st.info(exercise['explanation'])
             
-            elif advanced_practice_type == "grammar_application":
-                exercise = practice_manager.generate_grammar_exercise()
+            elif practice_type == "grammar_application":
+                exercise, token = banked_exercise("advanced", "grammar_application")
                 
                 st.write(f"## {exercise['question']}")
-                user_answer = st.radio("Select the correct answer:", exercise['options'])
+                if exercise.get('translation'):
+                    # Several endings can fit the blank grammatically; the meaning decides
+                    st.caption(f"Translation: {exercise['translation']}")
+                user_answer = st.radio("Select the correct answer:", exercise['options'], key=f"{slot}:{token}")
                 
                 if st.button("Check Answer", key="grammar_check"):
                     if user_answer == exercise['answer']:
@@ -439,15 +441,15 @@ elif page == "Practice":
                         st.session_state.last_result = False
                     st.info(exercise['explanation'])
             
-            elif advanced_practice_type == "sentence_creation":
-                exercise = practice_manager.generate_sentence_creation_exercise()
+            elif practice_type == "sentence_creation":
+                exercise, token = banked_exercise("advanced", "sentence_creation")
                 
                 st.write(f"## Create a sentence about: {exercise['scenario']}")
                 st.write("Use these vocabulary words:")
                 for word in exercise['vocabulary']:
                     st.write(f"- {word}")
                 
-                user_sentence = st.text_input("Your sentence:")
+                user_sentence = st.text_input("Your sentence:", key=f"{slot}:{token}")
                 
                 if st.button("Check Sentence", key="creation_check"):
                     # For demonstration purposes, just check if they used some of the vocabulary
@@ -465,11 +467,11 @@ elif page == "Practice":
                     
                     st.info(f"Example: {exercise['example']}\nTranslation: {exercise['translation']}")
             
-            elif advanced_practice_type == "verb_conjugation":
-                exercise = practice_manager.generate_verb_conjugation_exercise()
+            elif practice_type == "verb_conjugation":
+                exercise, token = banked_exercise("advanced", "verb_conjugation")
                 
                 st.write(f"## {exercise['question']}")
-                user_answer = st.radio("Select the correct conjugation:", exercise['options'])
+                user_answer = st.radio("Select the correct conjugation:", exercise['options'], key=f"{slot}:{token}")
                 
                 if st.button("Check Answer", key="conjugation_check"):
                     if user_answer == exercise['answer']:
@@ -480,14 +482,14 @@ elif page == "Practice":
                         st.session_state.last_result = False
                     st.info(exercise['explanation'])
             
-            elif advanced_practice_type == "reading_comprehension":
-                exercise = practice_manager.generate_reading_comprehension_exercise()
+            elif practice_type == "reading_comprehension":
+                exercise, token = banked_exercise("advanced", "reading_comprehension")
                 
                 st.write("## Read the following passage:")
                 st.write(exercise['text'])
                 
                 st.write(f"**Question**: {exercise['question']}")
-                user_answer = st.radio("Select your answer:", exercise['options'])
+                user_answer = st.radio("Select your answer:", exercise['options'], key=f"{slot}:{token}")
                 
                 if st.button("Check Answer", key="reading_check"):
                     if user_answer == exercise['answer']:
@@ -498,8 +500,8 @@ elif page == "Practice":
                         st.session_state.last_result = False
                     st.info(exercise['explanation'])
             
-            elif advanced_practice_type == "speech_practice":
-                exercise = practice_manager.generate_speech_practice_exercise()
+            elif practice_type == "speech_practice":
+                exercise, token = banked_exercise("advanced", "speech_practice")
                 
                 st.write(f"## {exercise['prompt']}")
                 st.write(f"### {exercise['japanese_text']}")
@@ -514,158 +516,349 @@ elif page == "Practice":
                     for vocab in exercise['key_vocabulary']:
                         st.write(f"- {vocab}")
                 
-                # In a real implementation, these would be functional
                 st.write("**Practice tools:**")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.button("🔊 Listen to Reference", key="listen_reference")
-                with col2:
-                    st.button("🎤 Record Your Attempt", key="record_attempt")
+                reference_clip = services.audio_cache.open(exercise['reference_audio'])
+                if reference_clip is not None:
+                    st.write("🔊 Listen to Reference")
+                    with reference_clip:
+                        st.audio(reference_clip, format="audio/wav")
+                
+                # Record with the microphone where this Streamlit version supports it
+                if hasattr(st, "audio_input"):
+                    recording = st.audio_input("🎤 Record Your Attempt", key=f"{slot}:{token}:recording")
+                else:
+                    recording = st.file_uploader("🎤 Upload a WAV recording of your attempt", type=["wav"],
+                                                 key=f"{slot}:{token}:recording")
+                
+                if recording is not None:
+                    from modules.pitch_accent import read_wav
+                    analyzer = services.pitch_analyzer
+                    try:
+                        samples, sample_rate = read_wav(recording.getvalue())
+                        attempt = analyzer.extract(samples, sample_rate)
+                    except Exception as e:
+                        st.error(f"Could not read the recording: {e}")
+                        attempt = None
+                    
+                    if attempt is not None and not attempt.voiced.any():
+                        st.warning("No voice detected in the recording. Try again a little closer to the microphone.")
+                    elif attempt is not None:
+                        reference_clip = services.audio_cache.open(exercise['reference_audio'])
+                        if reference_clip is not None:
+                            with reference_clip:
+                                reference = analyzer.extract(*read_wav(reference_clip))
+                            # The synthesizer knows where each mora starts, so use its timings
+                            # The clip may have been evicted since it was opened, then there are no timings
+                            clip_info = services.audio_cache.metadata(exercise['reference_audio']) or {}
+                            boundaries = [round(t / analyzer.hop_seconds) for t in clip_info.get("boundaries", [])] or None
+                            report = analyzer.score(reference, attempt, exercise['japanese_text'], boundaries)
+                            st.metric("Pitch accent match", f"{report['overall'] or 0:.0f}/100")
+                            st.dataframe({
+                                "Mora": [m.mora for m in report['morae']],
+                                "Score": [m.score for m in report['morae']],
+                                "Reference pitch": [round(m.reference, 1) for m in report['morae']],
+                                "Your pitch": [round(m.learner, 1) for m in report['morae']]
+                            })
+                        else:
+                            st.info("No reference recording is available for this sentence yet. Here is your pitch contour:")
+                        st.line_chart({"Your pitch (semitones)": attempt.semitones})
                 
                 # Simplified assessment for demo
                 st.write("### Self-assessment")
-                confidence = st.slider("How well do you think you pronounced it?", 1, 5, 3)
+                confidence = st.slider("How well do you think you pronounced it?", 1, 5, 3, key=f"{slot}:{token}:confidence")
                 
                 if st.button("Submit Practice", key="speech_submit"):
                     if confidence >= 4:
                         st.success("Great job! Keep practicing to perfect your pronunciation.")
                         # Record a successful result for high confidence
-                        user_manager.record_practice_result("advanced", "speech_practice", True, exercise['japanese_text'])
+                        user_manager.record_practice_result("advanced", "speech_practice", True, exercise['japanese_text'], exercise.get('fingerprint'))
                     else:
                         st.info("Practice makes perfect! Try listening to the reference again and repeating.")
                         # Record as a learning opportunity for lower confidence
-                        user_manager.record_practice_result("advanced", "speech_practice", False, exercise['japanese_text'])
+                        user_manager.record_practice_result("advanced", "speech_practice", False, exercise['japanese_text'], exercise.get('fingerprint'))
                         
                     # Provide encouragement regardless of confidence level
                     st.write("**Tips for improving:**")
                     st.write("- Practice individual sounds first, then the full sentence")
                     st.write("- Pay attention to pitch accent and rhythm")
                     st.write("- Record yourself and compare to native speakers")
+            
+            st.button("Next Exercise", key=f"{slot}:next", on_click=next_exercise, args=(slot,))
+        
+        # Tabs for different difficulty levels
+        difficulty_tabs = st.tabs(["Beginner", "Intermediate", "Advanced"])
+        
+        # Beginner tab
+        with difficulty_tabs[0]:
+            st.header("Beginner Level Practice")
+            st.write("Perfect for those just starting to learn Japanese characters and basic vocabulary.")
+            
+            # Add practice recommendations
+            recommended_practice = user_manager.get_recommended_practice("beginner")
+            if recommended_practice:
+                format_name = {
+                    "kana_recognition": "Listen & Recognize Kana",
+                    "kana_matching": "Match Hiragana & Katakana",
+                    "simple_vocabulary": "Basic Word Practice",
+                    "word_image_matching": "Match Words with Images",
+                    "listen_and_choose": "Listen and Choose"
+                }.get(recommended_practice, recommended_practice.replace("_", " ").title())
+                
+                st.info(f"💡 Recommended: Try '{format_name}' to improve your skills!")
+            
+            # Practice types for beginners
+            beginner_activities = practice_manager.get_practice_activities("beginner")
+            beginner_practice_type = st.selectbox(
+                "Choose practice type:",
+                beginner_activities,
+                format_func=lambda x: {
+                    "kana_recognition": "Listen & Recognize Kana",
+                    "kana_matching": "Match Hiragana & Katakana",
+                    "simple_vocabulary": "Basic Word Practice",
+                    "word_image_matching": "Match Words with Images",
+                    "listen_and_choose": "Listen and Choose"
+                }.get(x, x.replace("_", " ").title())
+            )
+            
+            # Start practice session button
+            st.button("Start Beginner Practice", on_click=start_practice, args=("beginner", beginner_practice_type))
+            if st.session_state.get("active_practice", {}).get("beginner") == beginner_practice_type:
+                beginner_exercise(beginner_practice_type)
+        
+        # Intermediate tab
+        with difficulty_tabs[1]:
+            st.header("Intermediate Level Practice")
+            st.write("For learners who have mastered the basics and are ready for more complex patterns.")
+            
+            # Add practice recommendations
+            recommended_practice = user_manager.get_recommended_practice("intermediate")
+            if recommended_practice:
+                format_name = {
+                    "common_phrases": "Common Japanese Phrases",
+                    "vocabulary_categories": "Vocabulary by Category",
+                    "sentence_completion": "Complete the Sentence",
+                    "speed_challenge": "Speed Recognition Challenge",
+                    "special_kana_combinations": "Special Kana Combinations",
+                    "listening_comprehension": "Listening Comprehension"
+                }.get(recommended_practice, recommended_practice.replace("_", " ").title())
+                
+                st.info(f"💡 Recommended: Try '{format_name}' to improve your skills!")
+            
+            # Practice types for intermediate level
+            intermediate_activities = practice_manager.get_practice_activities("intermediate")
+            intermediate_practice_type = st.selectbox(
+                "Choose practice type:",
+                intermediate_activities,
+                format_func=lambda x: {
+                    "common_phrases": "Common Japanese Phrases",
+                    "vocabulary_categories": "Vocabulary by Category",
+                    "sentence_completion": "Complete the Sentence",
+                    "speed_challenge": "Speed Recognition Challenge",
+                    "special_kana_combinations": "Special Kana Combinations",
+                    "listening_comprehension": "Listening Comprehension"
+                }.get(x, x.replace("_", " ").title())
+            )
+            
+            # Start practice session button
+            st.button("Start Intermediate Practice", on_click=start_practice, args=("intermediate", intermediate_practice_type))
+            if st.session_state.get("active_practice", {}).get("intermediate") == intermediate_practice_type:
+                intermediate_exercise(intermediate_practice_type)
+        
+        # Advanced tab
+        with difficulty_tabs[2]:
+            st.header("Advanced Level Practice")
+            st.write("Challenge yourself with complex grammar, conversations, and reading comprehension.")
+            
+            # Add practice recommendations for advanced level
+            recommended_practice = user_manager.get_recommended_practice("advanced")
+            if recommended_practice:
+                format_name = {
+                    "dialogue_comprehension": "Dialogue Comprehension",
+                    "grammar_application": "Grammar Usage",
+                    "sentence_creation": "Create Sentences",
+                    "verb_conjugation": "Verb Conjugation",
+                    "reading_comprehension": "Reading Comprehension",
+                    "speech_practice": "Speech Practice"
+                }.get(recommended_practice, recommended_practice.replace("_", " ").title())
+                
+                st.info(f"💡 Recommended: Try '{format_name}' to improve your skills!")
+            
+            # Practice types for advanced level
+            advanced_activities = practice_manager.get_practice_activities("advanced")
+            advanced_practice_type = st.selectbox(
+                "Choose practice type:",
+                advanced_activities,
+                format_func=lambda x: {
+                    "dialogue_comprehension": "Dialogue Comprehension",
+                    "grammar_application": "Grammar Usage",
+                    "sentence_creation": "Create Sentences",
+                    "verb_conjugation": "Verb Conjugation",
+                    "reading_comprehension": "Reading Comprehension",
+                    "speech_practice": "Speech Practice"
+                }.get(x, x.replace("_", " ").title())
+            )
+            
+            # Start practice session button
+            st.button("Start Advanced Practice", on_click=start_practice, args=("advanced", advanced_practice_type))
+            if st.session_state.get("active_practice", {}).get("advanced") == advanced_practice_type:
+                advanced_exercise(advanced_practice_type)
 
-# Settings page
-elif page == "Settings":
-    st.title("Settings")
-    
-    # Practice Progress Dashboard
-    st.subheader("Practice Progress Dashboard")
-    practice_stats = user_manager.get_practice_stats()
-    
-    if practice_stats:
-        # Create tabs for each difficulty level
-        progress_tabs = st.tabs(["Beginner", "Intermediate", "Advanced"])
+    # Settings page
+    elif page == "Settings":
+        st.title("Settings")
+        user_manager = services.user_manager
         
-        # Prepare data for display
-        for i, difficulty in enumerate(["beginner", "intermediate", "advanced"]):
-            with progress_tabs[i]:
-                if difficulty in practice_stats:
-                    level_stats = practice_stats[difficulty]
-                    if level_stats:
-                        # Create a table of practice type statistics
-                        data = []
-                        for practice_type, stats in level_stats.items():
-                            # Format for display
-                            display_name = {
-                                # Beginner
-                                "kana_recognition": "Listen & Recognize Kana",
-                                "kana_matching": "Match Hiragana & Katakana",
-                                "simple_vocabulary": "Basic Word Practice",
-                                "word_image_matching": "Match Words with Images",
-                                "listen_and_choose": "Listen and Choose",
-                                # Intermediate
-                                "common_phrases": "Common Japanese Phrases",
-                                "vocabulary_categories": "Vocabulary by Category",
-                                "sentence_completion": "Complete the Sentence",
-                                "speed_challenge": "Speed Recognition Challenge",
-                                "special_kana_combinations": "Special Kana Combinations",
-                                "listening_comprehension": "Listening Comprehension",
-                                # Advanced
-                                "dialogue_comprehension": "Dialogue Comprehension",
-                                "grammar_application": "Grammar Usage",
-                                "sentence_creation": "Create Sentences",
-                                "verb_conjugation": "Verb Conjugation",
-                                "reading_comprehension": "Reading Comprehension",
-                                "speech_practice": "Speech Practice"
-                            }.get(practice_type, practice_type.replace("_", " ").title())
-                            
-                            # Calculate accuracy
-                            total = stats["attempts"]
-                            correct = stats["correct"]
-                            accuracy = f"{int(correct/total * 100)}%" if total > 0 else "N/A"
-                            
-                            # Format last practiced time
-                            last_practiced = "Never" if not stats["last_practiced"] else stats["last_practiced"].split("T")[0]
-                            
-                            data.append({
-                                "Practice Type": display_name,
-                                "Attempts": total,
-                                "Correct": correct,
-                                "Accuracy": accuracy,
-                                "Last Practiced": last_practiced
-                            })
-                        
-                        if data:
-                            st.table(data)
-                            
-                            # Show streaks and achievements
-                            st.subheader("Practice Suggestions")
-                            
-                            # Find least practiced activities
-                            sorted_by_attempts = sorted(level_stats.items(), key=lambda x: x[1]["attempts"])
-                            if sorted_by_attempts:
-                                least_practiced = sorted_by_attempts[0][0]
-                                display_name = {
-                                    # Format names as above
-                                }.get(least_practiced, least_practiced.replace("_", " ").title())
-                                st.info(f"💡 You should try practicing '{display_name}' more often")
-                            
-                            # Find activities with low accuracy
-                            low_accuracy_activities = []
+        # Practice Progress Dashboard
+        st.subheader("Practice Progress Dashboard")
+        practice_stats = user_manager.get_practice_stats()
+        
+        if practice_stats:
+            # Create tabs for each difficulty level
+            progress_tabs = st.tabs(["Beginner", "Intermediate", "Advanced"])
+            
+            # Prepare data for display
+            for i, difficulty in enumerate(["beginner", "intermediate", "advanced"]):
+                with progress_tabs[i]:
+                    if difficulty in practice_stats:
+                        level_stats = practice_stats[difficulty]
+                        if level_stats:
+                            # Create a table of practice type statistics
+                            data = []
                             for practice_type, stats in level_stats.items():
-                                if stats["attempts"] >= 5 and stats["correct"] / stats["attempts"] < 0.7:
-                                    low_accuracy_activities.append(practice_type)
+                                # Format for display
+                                display_name = {
+                                    # Beginner
+                                    "kana_recognition": "Listen & Recognize Kana",
+                                    "kana_matching": "Match Hiragana & Katakana",
+                                    "simple_vocabulary": "Basic Word Practice",
+                                    "word_image_matching": "Match Words with Images",
+                                    "listen_and_choose": "Listen and Choose",
+                                    # Intermediate
+                                    "common_phrases": "Common Japanese Phrases",
+                                    "vocabulary_categories": "Vocabulary by Category",
+                                    "sentence_completion": "Complete the Sentence",
+                                    "speed_challenge": "Speed Recognition Challenge",
+                                    "special_kana_combinations": "Special Kana Combinations",
+                                    "listening_comprehension": "Listening Comprehension",
+                                    # Advanced
+                                    "dialogue_comprehension": "Dialogue Comprehension",
+                                    "grammar_application": "Grammar Usage",
+                                    "sentence_creation": "Create Sentences",
+                                    "verb_conjugation": "Verb Conjugation",
+                                    "reading_comprehension": "Reading Comprehension",
+                                    "speech_practice": "Speech Practice"
+                                }.get(practice_type, practice_type.replace("_", " ").title())
+                                
+                                # Calculate accuracy
+                                total = stats["attempts"]
+                                correct = stats["correct"]
+                                accuracy = f"{int(correct/total * 100)}%" if total > 0 else "N/A"
+                                
+                                # Format last practiced time
+                                last_practiced = "Never" if not stats["last_practiced"] else stats["last_practiced"].split("T")[0]
+                                
+                                data.append({
+                                    "Practice Type": display_name,
+                                    "Attempts": total,
+                                    "Correct": correct,
+                                    "Accuracy": accuracy,
+                                    "Last Practiced": last_practiced
+                                })
                             
-                            if low_accuracy_activities:
-                                practice_to_improve = random.choice(low_accuracy_activities)
-                                display_name = practice_to_improve.replace("_", " ").title()
-                                st.warning(f"📝 Focus on improving '{display_name}' - this is challenging for you")
+                            if data:
+                                st.table(data)
+                                
+                                # Show streaks and achievements
+                                st.subheader("Practice Suggestions")
+                                
+                                # Find least practiced activities
+                                sorted_by_attempts = sorted(level_stats.items(), key=lambda x: x[1]["attempts"])
+                                if sorted_by_attempts:
+                                    least_practiced = sorted_by_attempts[0][0]
+                                    display_name = {
+                                        # Format names as above
+                                    }.get(least_practiced, least_practiced.replace("_", " ").title())
+                                    st.info(f"💡 You should try practicing '{display_name}' more often")
+                                
+                                # Find activities with low accuracy
+                                low_accuracy_activities = []
+                                for practice_type, stats in level_stats.items():
+                                    if stats["attempts"] >= 5 and stats["correct"] / stats["attempts"] < 0.7:
+                                        low_accuracy_activities.append(practice_type)
+                                
+                                if low_accuracy_activities:
+                                    practice_to_improve = random.choice(low_accuracy_activities)
+                                    display_name = practice_to_improve.replace("_", " ").title()
+                                    st.warning(f"📝 Focus on improving '{display_name}' - this is challenging for you")
+                            else:
+                                st.info(f"You haven't practiced any {difficulty} level exercises yet.")
                         else:
                             st.info(f"You haven't practiced any {difficulty} level exercises yet.")
                     else:
                         st.info(f"You haven't practiced any {difficulty} level exercises yet.")
-                else:
-                    st.info(f"You haven't practiced any {difficulty} level exercises yet.")
-    else:
-        st.info("Start practicing to see your progress tracked here!")
-    
-    # App settings
-    st.subheader("Application Settings")
-    theme = st.selectbox("Theme", ["Light", "Dark"])
-    
-    # Learning preferences
-    st.subheader("Learning Preferences")
-    daily_goal = st.slider("Daily learning goal (minutes)", 5, 60, 15)
-    
-    # Practice settings
-    st.subheader("Practice Settings")
-    practice_mode = st.selectbox(
-        "Default Practice Mode",
-        ["Regular", "Spaced Repetition", "Challenge Mode"]
-    )
-    
-    # Audio settings
-    st.subheader("Audio Settings")
-    enable_audio = st.checkbox("Enable pronunciation audio", value=True)
-    audio_volume = st.slider("Audio volume", 0, 100, 75)
-    
-    # Reset progress option
-    st.subheader("Reset Progress")
-    if st.button("Reset All Progress"):
-        user_confirmation = st.text_input("Type 'reset' to confirm")
-        if user_confirmation == "reset":
-            user_manager.reset_progress()
-            st.success("Progress has been reset!")
+        else:
+            st.info("Start practicing to see your progress tracked here!")
+
+        # Learning path cache statistics (only once the recommender has been used)
+        cache_stats = services.recommender.get_cache_stats() if services.is_loaded("recommender") else {"lookups": 0}
+        if cache_stats["lookups"]:
+            with st.expander("Learning Path Cache"):
+                st.write(f"Hit rate: {cache_stats['hit_rate'] * 100:.1f}% "
+                         f"({cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                         f"{cache_stats['entries']} cached paths)")
+                if cache_stats["similarity_histogram"]:
+                    st.bar_chart({row["bucket"]: row["count"] for row in cache_stats["similarity_histogram"]})
+
+        # AI service health
+        with st.expander("AI Service Status"):
+            if services.is_loaded("ai_service"):
+                breaker_metrics = services.ai_service.get_breaker_metrics()
+                if breaker_metrics["state"] != "closed":
+                    st.warning("The AI service is currently unavailable. Showing saved or offline content.")
+                st.table([breaker_metrics])
+            else:
+                st.write("The AI service has not been started yet.")
+
+        # App settings
+        st.subheader("Application Settings")
+        theme = st.selectbox("Theme", ["Light", "Dark"])
+        
+        # Learning preferences
+        st.subheader("Learning Preferences")
+        daily_goal = st.slider("Daily learning goal (minutes)", 5, 60, 15)
+        
+        # Practice settings
+        st.subheader("Practice Settings")
+        practice_mode = st.selectbox(
+            "Default Practice Mode",
+            ["Regular", "Spaced Repetition", "Challenge Mode"]
+        )
+        
+        # Audio settings
+        st.subheader("Audio Settings")
+        enable_audio = st.checkbox("Enable pronunciation audio", value=True)
+        audio_volume = st.slider("Audio volume", 0, 100, 75)
+        
+        # Reset progress option
+        st.subheader("Reset Progress")
+        if st.button("Reset All Progress"):
+            user_confirmation = st.text_input("Type 'reset' to confirm")
+            if user_confirmation == "reset":
+                user_manager.reset_progress()
+                st.success("Progress has been reset!")
+
+# Time the whole page, including runs cut short by st.stop(), st.rerun() or an error
+page_span = metrics.start_span("page_render", page=page)
+try:
+    render_page(page)
+finally:
+    page_span.finish()
 
 # Footer
 st.markdown("---")
 st.markdown("ToneMaster AI - Personalized Japanese Learning | Powered by Mistral AI")
 
+# Build the remaining services in the background once the first page has been sent
+if os.getenv("TONEMASTER_WARM_UP", "1") != "0":
+    services.start_warm_up()
+
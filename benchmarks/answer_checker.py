@@ -0,0 +1,67 @@
+"""Benchmark for romaji answer checking on whole sentences.
+
+Run from the repository root:
+
+    python -m benchmarks.answer_checker --sentences 2000
+
+Uses the kana-only sentences of the Tatoeba export as items, answers each one
+with a Kunrei-shiki spelling (exact match) and with a one-letter typo (goes
+through the edit-distance automata).
+"""
+import argparse
+import random
+import time
+
+from modules.answer_checker import AnswerChecker
+from modules.corpus_files import find_translation_file, read_translation_pairs
+
+
+def kana_sentences(limit):
+    """Kana-only corpus sentences, so every item has a full reading"""
+    sentences = {}
+    for jp_id, jp_text, _, _ in read_translation_pairs(find_translation_file()):
+        if all("぀" <= c <= "ヿ" or c in "。、！？ " for c in jp_text):
+            sentences.setdefault(jp_id, jp_text)
+        if len(sentences) >= limit:
+            break
+    return list(sentences.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--max-distance", type=int, default=1)
+    args = parser.parse_args()
+
+    checker = AnswerChecker(max_distance=args.max_distance)
+    sentences = kana_sentences(args.sentences)
+    rng = random.Random(0)
+
+    start = time.perf_counter()
+    for sentence in sentences:
+        checker.accepted_forms(kana=sentence)
+    build_us = (time.perf_counter() - start) * 1e6 / len(sentences)
+
+    answers = [checker.transliterator.to_romaji(s, "kunrei") for s in sentences]
+    typos = []
+    for answer in answers:
+        i = rng.randrange(len(answer))
+        typos.append(answer[:i] + "x" + answer[i + 1:])
+
+    results = {}
+    for name, batch in (("exact", answers), ("typo", typos)):
+        start = time.perf_counter()
+        outcomes = [checker.check(answer, kana=sentence) for answer, sentence in zip(batch, sentences)]
+        results[name] = ((time.perf_counter() - start) * 1e6 / len(sentences), outcomes)
+
+    average_length = sum(len(s) for s in sentences) / len(sentences)
+    print(f"{len(sentences)} kana sentences, {average_length:.1f} chars on average")
+    print(f"{'accepted forms':<18}{build_us:>10.1f} us/item (one-off)")
+    exact_us, exact = results["exact"]
+    typo_us, typo = results["typo"]
+    print(f"{'exact answer':<18}{exact_us:>10.1f} us/check   accepted {sum(r.correct for r in exact) / len(exact):.3f}")
+    print(f"{'one-letter typo':<18}{typo_us:>10.1f} us/check   close {sum(r.close for r in typo) / len(typo):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Load benchmark for the practice JSON API: requests per second and latency.
+
+Run from the repository root:
+
+    python -m benchmarks.api_server --learners 1000 --rounds 5
+
+Starts modules.api_server in a separate process (fresh temporary progress
+and audio directories) and has every simulated learner run the practice loop
+concurrently: get an exercise, answer it, and every few rounds check progress
+and recommendations. Latency is measured per request on the client side.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+import numpy as np
+
+DIFFICULTIES = ["beginner", "intermediate", "advanced"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_up(session, base_url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base_url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+
+async def timed(session, latencies, name, method, url, **kwargs):
+    start = time.perf_counter()
+    async with session.request(method, url, **kwargs) as response:
+        body = await response.json()
+        response.raise_for_status()
+    latencies.setdefault(name, []).append(time.perf_counter() - start)
+    return body
+
+
+def choose_answer(rng, exercise):
+    """A plausible answer; the server hides the right one, so options are picked at random"""
+    if "vocabulary" in exercise:
+        return " ".join(exercise["vocabulary"][:2])
+    if not exercise.get("options"):
+        return rng.randint(1, 5)  # self-assessment
+    return rng.choice(exercise["options"])
+
+
+async def learner(session, base_url, learner_number, rounds, latencies, start_gate):
+    rng = random.Random(learner_number)
+    learner_url = f"{base_url}/learners/learner-{learner_number}"
+    await start_gate.wait()
+    for round_number in range(rounds):
+        difficulty = rng.choice(DIFFICULTIES)
+        created = await timed(session, latencies, "exercise", "POST", f"{learner_url}/exercises",
+                              json={"difficulty": difficulty})
+        answer = choose_answer(rng, created["exercise"])
+        await timed(session, latencies, "answer", "POST", f"{learner_url}/answers",
+                    json={"exercise_id": created["exercise_id"], "answer": answer})
+        if round_number % 5 == 4:
+            await timed(session, latencies, "progress", "GET", f"{learner_url}/progress")
+            await timed(session, latencies, "recommendations", "GET",
+                        f"{learner_url}/recommendations", params={"difficulty": difficulty})
+
+
+async def run_load(base_url, learners, rounds):
+    latencies = {}
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=300)) as session:
+        await wait_until_up(session, base_url)
+        start_gate = asyncio.Event()
+        tasks = [asyncio.create_task(learner(session, base_url, number, rounds, latencies, start_gate))
+                 for number in range(learners)]
+        start = time.perf_counter()
+        start_gate.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--learners", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        port = free_port()
+        server = subprocess.Popen([
+            sys.executable, "-m", "modules.api_server", "--port", str(port),
+            "--progress-dir", os.path.join(directory, "progress"),
+            "--audio-cache", os.path.join(directory, "audio_cache")
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            latencies, elapsed = asyncio.run(run_load(f"http://127.0.0.1:{port}", args.learners,
+                                                      args.rounds))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        files = len(os.listdir(os.path.join(directory, "progress")))
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{args.learners} concurrent learners x {args.rounds} rounds: {total} requests in {elapsed:.2f}s "
+          f"({total / elapsed:.0f} req/s), {files} progress files written")
+    print(f"{'endpoint':<18}{'requests':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    every = np.concatenate([np.array(samples) for samples in latencies.values()])
+    for name, samples in list(latencies.items()) + [("all", every)]:
+        samples = np.asarray(samples) * 1000
+        print(f"{name:<18}{len(samples):>9}{np.percentile(samples, 50):>9.1f}{np.percentile(samples, 99):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Benchmark for exercise generation and render time per page interaction.
+
+Run from the repository root:
+
+    python -m benchmarks.app_interactions --rounds 10 --compare HEAD~1
+
+Drives app.py headlessly with Streamlit's AppTest through a learner session
+(open an exercise, type or pick an answer, check it, move on) and counts
+calls to the exercise generators. With --compare, the same session runs
+against app.py from another git revision. AppTest always reruns the whole
+script, so times are upper bounds for fragment-scoped reruns in a browser.
+"""
+import argparse
+import functools
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from modules.practice_manager import PracticeManager
+from modules.syllabary import JapaneseSyllabary
+
+GENERATORS = [(PracticeManager, name) for name in dir(PracticeManager) if name.startswith("generate_")]
+GENERATORS.append((JapaneseSyllabary, "get_random_character"))
+
+calls = {"count": 0, "depth": 0}
+
+
+def count_calls(cls, name):
+    original = getattr(cls, name)
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        # generate_exercise dispatches to the specific generators; count the outer call only
+        calls["count"] += calls["depth"] == 0
+        calls["depth"] += 1
+        try:
+            return original(*args, **kwargs)
+        finally:
+            calls["depth"] -= 1
+
+    setattr(cls, name, wrapper)
+
+
+def find(elements, label):
+    return next((element for element in elements if element.label == label), None)
+
+
+def learn_session(at, rounds):
+    """Answer characters on the Learn Hiragana page"""
+    at.sidebar.radio[0].set_value("Learn Hiragana")
+    yield "open page", at.run
+    for _ in range(rounds):
+        box = find(at.text_input, "What is the pronunciation? (romaji)")
+        yield "type answer", box.input("a").run
+        yield "check", find(at.button, "Check").click().run
+        button = find(at.button, "Next Character")
+        if button is not None:
+            yield "next", button.click().run
+
+
+def practice_session(at, rounds):
+    """Answer vocabulary exercises on the beginner Practice tab"""
+    at.sidebar.radio[0].set_value("Practice")
+    yield "open page", at.run
+    at.selectbox[0].set_value("simple_vocabulary")
+    yield "choose type", at.run
+    yield "start", find(at.button, "Start Beginner Practice").click().run
+    for _ in range(rounds):
+        radio = find(at.radio, "Select the meaning:")
+        if radio is None:
+            # The exercise vanished with the rerun, so start over
+            yield "restart", find(at.button, "Start Beginner Practice").click().run
+            radio = find(at.radio, "Select the meaning:")
+        yield "pick answer", radio.set_value(radio.options[-1]).run
+        check = find(at.button, "Check Answer")
+        yield "check", (check.click().run if check is not None else at.run)
+        button = find(at.button, "Next Exercise")
+        if button is not None:
+            yield "next", button.click().run
+
+
+def run_session(script, session, rounds):
+    """Run one session; returns {interaction: [(generator calls, seconds, feedback shown), ...]}"""
+    at = AppTest.from_file(os.path.abspath(script), default_timeout=120)
+    at.run()
+    results = {}
+    for interaction, step in session(at, rounds):
+        before = calls["count"]
+        start = time.perf_counter()
+        step()
+        elapsed = time.perf_counter() - start
+        feedback = len(at.success) + len(at.warning) + len(at.error) > 0
+        results.setdefault(interaction, []).append((calls["count"] - before, elapsed, feedback))
+    return results
+
+
+def report(title, results):
+    print(title)
+    total_calls = total_steps = 0
+    for interaction, samples in results.items():
+        generated = sum(count for count, _, _ in samples)
+        median_ms = statistics.median(seconds for _, seconds, _ in samples) * 1000
+        total_calls += generated
+        total_steps += len(samples)
+        line = f"  {interaction:<14}{len(samples):>4} x {median_ms:>7.1f} ms   {generated / len(samples):>5.2f} generator calls"
+        if interaction == "check":
+            line += f"   feedback shown {sum(shown for _, _, shown in samples)}/{len(samples)}"
+        print(line)
+    print(f"  {'total':<14}{total_steps:>4} steps   {total_calls:>14} generator calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--compare", help="git revision whose app.py to run the same sessions against")
+    args = parser.parse_args()
+
+    # Skip the corpus and model warm-up; it is not what is being measured
+    os.environ.setdefault("TONEMASTER_WARM_UP", "0")
+    for cls, name in GENERATORS:
+        count_calls(cls, name)
+
+    # user_progress.json is written by every checked answer; leave it as it was
+    progress = open("user_progress.json", "rb").read() if os.path.exists("user_progress.json") else None
+    scripts = [("current", "app.py", None)]
+    if args.compare:
+        source = subprocess.run(["git", "show", f"{args.compare}:app.py"], check=True, capture_output=True).stdout
+        handle, path = tempfile.mkstemp(suffix=".py", prefix="_app_", dir=".")
+        with os.fdopen(handle, "wb") as f:
+            f.write(source)
+        scripts.append((args.compare, path, path))
+
+    try:
+        for label, script, _ in scripts:
+            for session in (learn_session, practice_session):
+                report(f"{label}: {session.__doc__}", run_session(script, session, args.rounds))
+    finally:
+        for _, _, temporary in scripts:
+            if temporary:
+                os.remove(temporary)
+        if progress is not None:
+            with open("user_progress.json", "wb") as f:
+                f.write(progress)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Cloze mining throughput and sampling cost.
+
+Run from the repository root:
+
+    python -m benchmarks.cloze_bank --copies 20
+
+Repeats the bundled jp-zh sentences --copies times (about 250k sentences at
+20), mines a cloze bank from them, and reports sentences per second, the
+clozes found and the bank's bytes. Sampling is timed on that bank and on
+one mined from a tenth of it, to show that it does not grow with the corpus.
+"""
+import argparse
+import random
+import time
+
+from benchmarks.microbench import measure
+from modules.cloze_bank import ClozeBank
+from modules.corpus_files import find_translation_file
+from modules.corpus_refresh import read_export
+from modules.difficulty import DifficultyClassifier
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=20)
+    args = parser.parse_args()
+
+    path = find_translation_file()
+    if path is None:
+        parser.error("No corpus pair file found")
+    _, texts, _ = read_export(path)
+    tiers = DifficultyClassifier().fit_predict(texts)
+    texts = texts * args.copies
+    tiers = list(tiers) * args.copies
+
+    banks = {}
+    for label, count in (("full", len(texts)), ("tenth", len(texts) // 10)):
+        start = time.perf_counter()
+        banks[label] = ClozeBank.mine(texts[:count], tiers[:count])
+        seconds = time.perf_counter() - start
+        bank = banks[label]
+        size = bank.rows.nbytes + bank.offsets.nbytes + bank.lengths.nbytes + bank.bounds.nbytes
+        print(f"{label:<6}{count:>9} sentences mined in {seconds:.2f}s ({count / seconds:,.0f}/s): "
+              f"{len(bank)} clozes, {size / 1e6:.1f} MB")
+
+    rng = random.Random(0)
+    for label, bank in banks.items():
+        for tier in (None, "advanced"):
+            seconds = measure(lambda bank=bank, tier=tier: bank.sample(tier, rng=rng), 0.2, 5)
+            print(f"sample {label:<6} tier={tier or 'any':<9}{seconds * 1e6:>8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark for the collaborative-filtering practice recommender.
+
+Run from the repository root:
+
+    python -m benchmarks.collaborative --users 10000 100000
+
+Synthetic learners are drawn from a handful of archetypes (each struggling
+with a different subset of kana and practice types), so the item-item
+similarities have real structure to find.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from modules.collaborative import (
+    InteractionMatrix, ItemItemRecommender, practice_item, character_item,
+    NEEDS_REVIEW_WEIGHT, LEARNED_WEIGHT, MASTERED_WEIGHT
+)
+from modules.practice_manager import PracticeManager
+from modules.syllabary import JapaneseSyllabary
+
+
+def synthetic_matrix(num_users, archetypes=8, seed=0):
+    """Build a learner x item matrix directly in CSR form"""
+    rng = np.random.default_rng(seed)
+    syllabary = JapaneseSyllabary()
+    items = [character_item("hiragana", v["symbol"]) for v in syllabary.hiragana.values()]
+    items += [character_item("katakana", v["symbol"]) for v in syllabary.katakana.values()]
+    for difficulty, types in PracticeManager().practice_types.items():
+        items += [practice_item(difficulty, t) for t in types]
+
+    # Each archetype touches some items and struggles with a few of them
+    touch = rng.uniform(0.05, 0.6, size=(archetypes, len(items)))
+    struggle = rng.uniform(0, 1, size=(archetypes, len(items))) ** 3
+    labels = rng.integers(0, archetypes, size=num_users)
+
+    touched = rng.random((num_users, len(items)), dtype=np.float32) < touch[labels]
+    draws = rng.random((num_users, len(items)), dtype=np.float32)
+    weights = np.where(draws < struggle[labels], NEEDS_REVIEW_WEIGHT,
+                       np.where(draws < 0.7, LEARNED_WEIGHT, MASTERED_WEIGHT)).astype(np.float32)
+
+    rows, cols = np.nonzero(touched)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=num_users))])
+    return InteractionMatrix([f"learner{i}" for i in range(num_users)], items,
+                             indptr.astype(np.int64), cols.astype(np.int32), weights[rows, cols])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'learners':>10}{'items':>7}{'nnz':>11}{'build s':>9}{'fit s':>8}{'top-k s':>9}"
+          f"{'table MB':>10}{'lookup us':>11}")
+    for num_users in args.users:
+        start = time.perf_counter()
+        matrix = synthetic_matrix(num_users)
+        build_seconds = time.perf_counter() - start
+
+        recommender = ItemItemRecommender(k=args.k)
+        start = time.perf_counter()
+        recommender.fit(matrix)
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        recommender.precompute(matrix)
+        precompute_seconds = time.perf_counter() - start
+
+        table_bytes = sum(ids.nbytes + scores.nbytes for ids, scores in recommender.tables.values())
+        users = np.random.default_rng(1).integers(0, num_users, size=args.lookups)
+        start = time.perf_counter()
+        for user in users:
+            recommender.recommend(f"learner{user}", "practice:beginner", count=3)
+        lookup_us = (time.perf_counter() - start) * 1e6 / args.lookups
+
+        print(f"{num_users:>10}{len(matrix.items):>7}{len(matrix.data):>11}{build_seconds:>9.2f}"
+              f"{fit_seconds:>8.2f}{precompute_seconds:>9.2f}{table_bytes / 1e6:>10.1f}{lookup_us:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
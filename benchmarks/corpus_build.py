@@ -0,0 +1,91 @@
+"""Parallel corpus build: scaling with workers and determinism of the output.
+
+Run from the repository root:
+
+    python -m benchmarks.corpus_build --sentences 200000 --workers 1 2 4 8
+
+Writes a synthetic jp-zh pair export (some sentences with two translations),
+compresses a copy with bz2, and builds a corpus directory from each with
+every --workers count. Reports per-stage seconds and the speedup over one
+worker, checks that every build wrote byte-identical files, and that the
+plain build matches a first build by modules/corpus_refresh.py.
+"""
+import argparse
+import bz2
+import hashlib
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.corpus_refresh import sentence
+from modules.corpus_build import build
+from modules.corpus_refresh import MANIFEST_FILE, refresh
+
+
+def write_export(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for jp_id, (text, translations) in sorted(rows.items()):
+            for offset, translation in enumerate(translations):
+                f.write(f"{jp_id}\t{text}\t{jp_id * 2 + offset}\t{translation}\n")
+
+
+def digests(corpus_dir):
+    return {name: hashlib.sha256(open(os.path.join(corpus_dir, name), "rb").read()).hexdigest()
+            for name in sorted(os.listdir(corpus_dir)) if os.path.isfile(os.path.join(corpus_dir, name))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--skip-refresh", action="store_true", help="do not compare with a serial refresh build")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rows = {jp_id: (sentence(rng), [f"句子{jp_id}"] + ([f"另一句{jp_id}"] if rng.random() < 0.2 else []))
+            for jp_id in rng.sample(range(args.sentences * 5), args.sentences)}
+    print(f"{os.cpu_count()} CPUs available")
+    with tempfile.TemporaryDirectory() as directory:
+        plain = os.path.join(directory, "export.tsv")
+        write_export(plain, rows)
+        compressed = plain + ".bz2"
+        with open(plain, "rb") as source, bz2.open(compressed, "wb") as target:
+            shutil.copyfileobj(source, target)
+
+        print(f"{'input':<8}{'workers':>8}{'seconds':>9}{'parse s':>9}{'analyze s':>11}{'cluster s':>11}"
+              f"{'write s':>9}{'speedup':>9}")
+        outputs = {}
+        for label, path in (("tsv", plain), ("tsv.bz2", compressed)):
+            serial = None
+            for workers in args.workers:
+                corpus_dir = os.path.join(directory, f"{label}-{workers}")
+                start = time.perf_counter()
+                stats = build(corpus_dir, path, workers)
+                seconds = time.perf_counter() - start
+                serial = serial or seconds
+                print(f"{label:<8}{workers:>8}{seconds:>9.2f}{stats['parse_seconds']:>9.2f}"
+                      f"{stats['analyze_seconds']:>11.2f}{stats['cluster_seconds']:>11.2f}"
+                      f"{stats['write_seconds']:>9.2f}{serial / seconds:>9.2f}")
+                outputs[label, workers] = digests(corpus_dir)
+
+        # The manifest records the export's file name, so it only matches between builds of the same input
+        same_input = all(files == outputs["tsv", args.workers[0]] for (label, _), files in outputs.items()
+                         if label == "tsv")
+        without_manifest = [{name: digest for name, digest in files.items() if name != MANIFEST_FILE}
+                            for files in outputs.values()]
+        print(f"all builds byte-identical: {same_input and all(files == without_manifest[0] for files in without_manifest)}")
+
+        if not args.skip_refresh:
+            refreshed = os.path.join(directory, "refresh")
+            start = time.perf_counter()
+            refresh(refreshed, plain)
+            seconds = time.perf_counter() - start
+            built = outputs["tsv", args.workers[0]]
+            matches = all(built[name] == digest for name, digest in digests(refreshed).items())
+            print(f"serial refresh build {seconds:.2f}s; parallel build files match it: {matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Incremental corpus refresh vs a full rebuild.
+
+Run from the repository root:
+
+    python -m benchmarks.corpus_refresh --sentences 200000 --change 0.01
+
+Writes a synthetic jp-zh pair export, builds a corpus directory from it,
+then writes a second export in which --change of the sentences were
+inserted, updated or deleted (in equal parts) and times a refresh against a
+full rebuild of the same export. Embeddings come from a stub that costs
+--embed-latency seconds per sentence, standing in for the embedding API.
+The refreshed artifacts are checked against the rebuilt ones.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from modules import shared_corpus
+from modules.corpus_refresh import DISTRACTORS_FILE, EMBEDDINGS_DIR, SENTENCES_FILE, DistractorIndex, refresh
+
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+KANJI = "日本人学生先時間年今大小山川田中上下右左出入見行来食言話読書"
+
+
+def sentence(rng):
+    return "".join(rng.choice(KANA if rng.random() < 0.7 else KANJI) for _ in range(rng.randint(4, 40))) + "。"
+
+
+def write_export(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for jp_id, (text, translation) in sorted(rows.items()):
+            f.write(f"{jp_id}\t{text}\t{jp_id + 10_000_000}\t{translation}\n")
+
+
+class StubEmbedder:
+    """Deterministic pseudo-embeddings with a fixed cost per sentence"""
+
+    def __init__(self, dimension=64, latency=0.0005):
+        self.dimension = dimension
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += len(texts)
+        time.sleep(self.latency * len(texts))
+        return np.stack([np.random.default_rng(abs(hash(text)) % 2 ** 32).standard_normal(self.dimension)
+                         for text in texts]).astype(np.float32)
+
+
+def contents(corpus_dir):
+    store = shared_corpus.map_segment(os.path.join(corpus_dir, SENTENCES_FILE))
+    return {store.row(i).id: (store.row(i).text, store.row(i).translation) for i in range(len(store))}
+
+
+def vector_count(corpus_dir):
+    from modules.vector_store import CorpusVectorStore
+    shards = os.path.join(corpus_dir, EMBEDDINGS_DIR)
+    return sum(len(CorpusVectorStore.load(os.path.join(shards, name)))
+               for name in os.listdir(shards) if name.endswith(".faiss"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=200_000)
+    parser.add_argument("--change", type=float, default=0.01, help="share of sentences changed")
+    parser.add_argument("--embed-latency", type=float, default=0.0005, help="stub seconds per embedded sentence")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rows = {jp_id: (sentence(rng), f"句子{jp_id}") for jp_id in rng.sample(range(args.sentences * 5), args.sentences)}
+    with tempfile.TemporaryDirectory() as directory:
+        old_export, new_export = (os.path.join(directory, name) for name in ("old.tsv", "new.tsv"))
+        write_export(old_export, rows)
+        incremental, rebuilt = (os.path.join(directory, name) for name in ("incremental", "rebuilt"))
+        embedder = StubEmbedder(latency=args.embed_latency)
+        start = time.perf_counter()
+        refresh(incremental, old_export, embedder)
+        print(f"initial build of {args.sentences} sentences: {time.perf_counter() - start:.2f}s")
+
+        changed = int(args.sentences * args.change) // 3
+        ids = list(rows)
+        for jp_id in rng.sample(ids, changed):
+            del rows[jp_id]
+        for jp_id in rng.sample(list(rows), changed):
+            rows[jp_id] = (sentence(rng), rows[jp_id][1] + "（新）")
+        for jp_id in range(args.sentences * 5, args.sentences * 5 + changed):
+            rows[jp_id] = (sentence(rng), f"句子{jp_id}")
+        write_export(new_export, rows)
+
+        print(f"{'run':<12}{'seconds':>9}{'read s':>8}{'apply s':>9}{'embedded':>10}{'shards':>8}")
+        for name, corpus_dir in (("refresh", incremental), ("rebuild", rebuilt)):
+            embedder = StubEmbedder(latency=args.embed_latency)
+            start = time.perf_counter()
+            stats = refresh(corpus_dir, new_export, embedder)
+            print(f"{name:<12}{time.perf_counter() - start:>9.2f}{stats['read_seconds']:>8.2f}"
+                  f"{stats['apply_seconds']:>9.2f}{embedder.calls:>10}{stats['shards_rewritten']:>8}")
+
+        distractors = [DistractorIndex.load(os.path.join(path, DISTRACTORS_FILE)) for path in (incremental, rebuilt)]
+        same_store = contents(incremental) == contents(rebuilt) == rows
+        same_distractors = set(distractors[0].ids.tolist()) == set(distractors[1].ids.tolist())
+        vectors = [vector_count(path) for path in (incremental, rebuilt)]
+        print(f"refreshed store matches rebuild: {same_store}; distractor ids match: {same_distractors}; "
+              f"vectors {vectors[0]} vs {vectors[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Duplicate clustering: speed, accuracy and the corpus footprint it saves.
+
+Run from the repository root:
+
+    python -m benchmarks.duplicates --sentences 250000 --duplicates 0.05
+
+Generates distinct synthetic sentences, then adds --duplicates of them again
+as variants (an exclamation mark for the full stop, inserted spaces or
+commas, full-width digits) and as many again as edits that change the
+meaning (a question mark for the full stop, one character replaced or
+dropped). Reports the time to cluster, how many variants were folded into
+their original, how many edits were wrongly folded, and the SentenceStore
+size with and without the duplicates. The bundled jp-zh export is clustered
+too when it is present.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from modules.corpus_files import find_translation_file, read_translation_pairs
+from modules.duplicates import cluster
+from modules.sentence_store import SentenceStore
+
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+KANJI = "日本人学生先時間年今大小山川田中上下右左出入見行来食言話読書"
+DIGITS = "0123456789"
+
+
+def sentence(rng):
+    body = "".join(rng.choice(KANA if rng.random() < 0.7 else KANJI) for _ in range(rng.randint(12, 40)))
+    return body + str(rng.randrange(100)) + "。"
+
+
+def variant(rng, text):
+    """The same sentence written differently"""
+    body = text[:-1]
+    kind = rng.randrange(3)
+    if kind == 0:
+        return body + "！"
+    if kind == 1:
+        position = rng.randrange(1, len(body))
+        return body[:position] + rng.choice(" 　、") + body[position:] + "。"
+    return body.translate(str.maketrans(DIGITS, "０１２３４５６７８９")) + "。"
+
+
+def edit(rng, text):
+    """A different sentence one character away"""
+    body = text[:-1]
+    kind = rng.randrange(3)
+    if kind == 0:
+        return body + "？"
+    position = rng.randrange(len(body))
+    if kind == 1:
+        replacement = rng.choice(KANA.replace(body[position], ""))
+        return body[:position] + replacement + body[position + 1:] + "。"
+    return body[:position] + body[position + 1:] + "。"
+
+
+def store_bytes(texts):
+    return SentenceStore.build(np.arange(len(texts)), texts, [""] * len(texts),
+                               np.zeros(len(texts), dtype=np.int8)).nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=250_000)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="share of sentences added again as variants, and again as edits")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    originals = list(dict.fromkeys(sentence(rng) for _ in range(args.sentences)))
+    sources = rng.sample(range(len(originals)), int(len(originals) * args.duplicates))
+    variants = [variant(rng, originals[i]) for i in sources]
+    edits = [edit(rng, originals[i]) for i in sources]
+    texts = originals + variants + edits
+
+    start = time.perf_counter()
+    labels = cluster(texts)
+    elapsed = time.perf_counter() - start
+    sources = np.array(sources, dtype=np.int64)
+    folded = int(np.count_nonzero(labels[len(originals):len(originals) + len(variants)] == sources))
+    wrong = int(np.count_nonzero(labels[len(originals) + len(variants):] == sources))
+    print(f"{len(texts)} sentences clustered in {elapsed:.2f}s ({elapsed / len(texts) * 1e6:.1f} us per sentence)")
+    print(f"variants folded into their original: {folded}/{len(variants)}; "
+          f"meaning-changing edits folded by mistake: {wrong}/{len(edits)}")
+    deduplicated = [texts[i] for i in np.flatnonzero(labels[:len(originals) + len(variants)]
+                                                     == np.arange(len(originals) + len(variants)))]
+    before, after = store_bytes(originals + variants), store_bytes(deduplicated)
+    print(f"SentenceStore {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB ({1 - after / before:.1%} smaller)")
+
+    path = find_translation_file()
+    if path:
+        bundled = list({jp_id: jp_text for jp_id, jp_text, _, _ in read_translation_pairs(path)}.values())
+        bundled_labels = cluster(bundled)
+        dropped = len(bundled) - int(np.count_nonzero(bundled_labels == np.arange(len(bundled))))
+        print(f"bundled export: {dropped} of {len(bundled)} sentences are duplicates ({dropped / len(bundled):.1%})")
+
+
+if __name__ == "__main__":
+    main()
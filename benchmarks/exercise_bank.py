@@ -0,0 +1,67 @@
+"""Serving exercises from a pre-generated bank against running the generators.
+
+Run from the repository root:
+
+    python -m benchmarks.exercise_bank --per-partition 500
+
+Builds a bank with --per-partition exercises for every banked practice type
+and difficulty (fewer where a generator runs out of distinct exercises) and
+reports its size and build time. Then times generate_exercise per practice
+type without and with the bank attached, and serving the next exercise of
+a learner's own order through the partition (ExerciseBank.draw, what the
+API server and the app do), plain and with the learner's last 50 exercises
+excluded, checking that a pass repeats nothing.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.microbench import measure
+from modules.exercise_bank import ExerciseBank, generate_partitions, write_bank
+from modules.practice_manager import PracticeManager
+from modules.syllabary import JapaneseSyllabary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-partition", type=int, default=500)
+    args = parser.parse_args()
+
+    random.seed(0)
+    practice_manager = PracticeManager()
+    practice_manager.exercise_bank = None
+    syllabary = JapaneseSyllabary()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "exercises.bank")
+        start = time.perf_counter()
+        partitions = generate_partitions(practice_manager, syllabary, args.per_partition)
+        count = write_bank(path, partitions)
+        print(f"{count} exercises in {len(partitions)} partitions, {os.path.getsize(path) / 1e3:.0f} kB, "
+              f"built in {time.perf_counter() - start:.2f}s")
+        bank = ExerciseBank(path)
+        kana_tables = {"hiragana": syllabary.hiragana, "katakana": syllabary.katakana}
+
+        print(f"{'partition':<36}{'exercises':>10}{'generate us':>13}{'bank us':>9}{'draw us':>9}{'recent 50':>11}{'repeats':>9}")
+        rng = random.Random(0)
+        for key, rows in bank.partitions.items():
+            difficulty, practice_type = key.split(":", 1)
+            data = kana_tables if practice_type == "kana_matching" else None
+            practice_manager.exercise_bank = None
+            generated = measure(lambda: practice_manager.generate_exercise(practice_type, difficulty, data), 0.1, 3)
+            practice_manager.exercise_bank = bank
+            banked = measure(lambda: practice_manager.generate_exercise(practice_type, difficulty, data), 0.1, 3)
+            seed, positions = random.getrandbits(64), iter(range(1 << 62))
+            drawn = measure(lambda: bank.draw(practice_type, difficulty, seed, next(positions)), 0.1, 3)
+            fingerprints = bank.fingerprints[rows.start:rows.stop].tolist()
+            recent = set(rng.sample(fingerprints, min(50, len(fingerprints) - 1)))
+            excluded = measure(lambda: bank.draw(practice_type, difficulty, seed, next(positions), recent), 0.1, 3)
+            one_pass = {bank.draw(practice_type, difficulty, seed, position)[0]["fingerprint"]
+                        for position in range(len(rows))}
+            print(f"{key:<36}{len(rows):>10}{generated * 1e6:>13.1f}{banked * 1e6:>9.1f}"
+                  f"{drawn * 1e6:>9.1f}{excluded * 1e6:>11.1f}{len(rows) - len(one_pass):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark for "find 10 similar learners" on the HNSW learner index.
+
+Run from the repository root:
+
+    python -m benchmarks.learner_index --learners 100000
+
+Learners are inserted one at a time through LearnerIndex.upsert, the same
+path the app uses, then queried against an exact brute-force scan.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from modules.learner_index import LearnerIndex
+
+TOPICS = ["anime", "manga", "food", "travel", "music", "sports", "games", "history", "cooking",
+          "movies", "fashion", "nature", "science", "art", "cars", "photography", "reading", "tea"]
+KANA = [chr(code) for code in range(0x3042, 0x3093, 2)] + [chr(code) for code in range(0x30A2, 0x30F3, 2)]
+PRACTICE_TYPES = ["kana_recognition", "kana_matching", "simple_vocabulary", "listen_and_choose"]
+
+
+def synthetic_learner(rng):
+    """Random interests, mastered kana and practice accuracy for one learner"""
+    interests = list(rng.choice(TOPICS, size=rng.integers(1, 4), replace=False))
+    mastered = list(rng.choice(KANA, size=rng.integers(0, len(KANA)), replace=False))
+    stats = {t: {"attempts": 10, "correct": int(rng.integers(0, 11))} for t in PRACTICE_TYPES}
+    return interests, {"hiragana": {"mastered": mastered}, "practice_stats": {"beginner": stats}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--learners", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    index = LearnerIndex(directory="/nonexistent-learner-profiles")
+
+    start = time.perf_counter()
+    for i in range(args.learners):
+        interests, progress = synthetic_learner(rng)
+        index.upsert(f"learner{i}", interests, progress)
+    insert_seconds = time.perf_counter() - start
+    print(f"Inserted {args.learners} learners in {insert_seconds:.1f}s "
+          f"({insert_seconds * 1e6 / args.learners:.0f}us per insert)")
+
+    # Exact answers from a full scan over every profile vector
+    vectors = np.vstack([index.index.reconstruct(i) for i in range(args.learners)])
+    query_ids = rng.integers(0, args.learners, size=args.queries)
+    start = time.perf_counter()
+    exact = []
+    for user in query_ids:
+        scores = vectors @ vectors[user]
+        scores[user] = -np.inf
+        top = np.argpartition(-scores, args.k)[:args.k]
+        exact.append({f"learner{i}" for i in top})
+    scan_ms = (time.perf_counter() - start) * 1000 / args.queries
+    print(f"{'full scan':<16}{scan_ms:>10.3f} ms/query   recall@{args.k} 1.000")
+
+    for ef_search in args.ef_search:
+        start = time.perf_counter()
+        found = [{user for user, _ in index.find_similar(f"learner{u}", args.k, ef_search)} for u in query_ids]
+        hnsw_ms = (time.perf_counter() - start) * 1000 / args.queries
+        recall = np.mean([len(a & b) / args.k for a, b in zip(exact, found)])
+        print(f"{'hnsw ef=' + str(ef_search):<16}{hnsw_ms:>10.3f} ms/query   recall@{args.k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Synthetic learner load test for the whole practice loop.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --learners 200 --sessions 3 --accuracy 0.7
+    python -m benchmarks.load_test --learners 200 --processes 4
+
+Every simulated learner runs on its own thread and follows a session
+script: pick a difficulty, take the recommended (or a random) practice
+type, get an exercise, answer it correctly with probability --accuracy and
+record the result, asking the AI service for a learning tip at the start of
+each session. PracticeManager, UserProgressManager and the audio cache are
+the real ones, writing to a temporary directory; AIService is stubbed with
+a fixed-latency canned responder. With --processes the learners are split
+across worker processes, each with its own services.
+
+Reports throughput, latency percentiles per operation, storage growth and
+contention on the shared services' locks.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from modules.ai_service import AIService, FALLBACK_CONTENT
+from modules.audio_cache import AudioCache
+from modules.examples import ExampleStore
+from modules.practice_manager import PracticeManager
+from modules.syllabary import JapaneseSyllabary
+from modules.user_data import UserProgressManager
+
+DIFFICULTY_WEIGHTS = {"beginner": 0.5, "intermediate": 0.3, "advanced": 0.2}
+
+# The offline templates, except that example sentences must parse so the example store fills up
+CANNED_RESPONSES = dict(FALLBACK_CONTENT, generate_example_sentences="""
+    Japanese: {character}をれんしゅうします。
+    Romaji: renshuu shimasu.
+    English: I practice {character}.
+    """)
+
+
+class InstrumentedLock:
+    """Drop-in for threading.Lock that records how often and how long threads wait for it"""
+
+    def __init__(self, lock=None):
+        self._lock = lock or threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(False):
+            self.acquisitions += 1
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        if acquired:
+            # Counters are only updated while holding the lock
+            self.acquisitions += 1
+            self.contended += 1
+            self.wait_seconds += time.perf_counter() - start
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class StubAIService(AIService):
+    """AIService with the LLM replaced by a canned responder with fixed latency"""
+
+    def __init__(self, latency=0.05, example_store=None):
+        super().__init__(max_attempts=1, example_store=example_store, offline=True)
+        self.latency = latency
+
+    def _run_chain(self, method, prompt, on_success=None, **inputs):
+        time.sleep(self.latency)
+        response = CANNED_RESPONSES[method].format(**inputs)
+        self.breaker.record_success()
+        self._cache_response((method, tuple(sorted(inputs.items()))), response)
+        if on_success:
+            on_success(response)
+        return response
+
+
+def directory_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def build_services(directory, ai_latency):
+    """Shared services for one process, with their locks instrumented"""
+    example_store = ExampleStore(os.path.join(directory, "example_sentences.json"))
+    audio_cache = AudioCache(os.path.join(directory, "audio_cache"))
+    ai_service = StubAIService(ai_latency, example_store)
+    practice_manager = PracticeManager(example_store=example_store, audio_cache=audio_cache)
+    locks = {
+        "audio_cache": (audio_cache, "_lock"),
+        "audio_index": (audio_cache, "_save_lock"),
+        "example_store": (example_store, "_lock"),
+        "ai_breaker": (ai_service.breaker, "_lock"),
+    }
+    for owner, attribute in locks.values():
+        setattr(owner, attribute, InstrumentedLock())
+    return (practice_manager, ai_service, JapaneseSyllabary(),
+            {name: getattr(owner, attribute) for name, (owner, attribute) in locks.items()})
+
+
+def generate(practice_manager, syllabary, practice_type, difficulty, rng):
+    if practice_type == "kana_recognition":
+        syllabary_data = syllabary.hiragana if rng.random() > 0.5 else syllabary.katakana
+    elif practice_type == "kana_matching":
+        syllabary_data = {"hiragana": syllabary.hiragana, "katakana": syllabary.katakana}
+    else:
+        syllabary_data = None
+    return practice_manager.generate_exercise(practice_type, difficulty, syllabary_data)
+
+
+def run_learner(learner_id, args, directory, services, latencies):
+    practice_manager, ai_service, syllabary, _ = services
+    rng = random.Random(f"{args.seed}:{learner_id}")
+    timings = {"generate": [], "record": [], "ai": [], "exercise": []}
+    user_manager = UserProgressManager(db_path=os.path.join(directory, "progress", f"{learner_id}.json"),
+                                       user_id=learner_id)
+    kana = [entry["symbol"] for entry in syllabary.hiragana.values()]
+    for _ in range(args.sessions):
+        difficulty = rng.choices(list(DIFFICULTY_WEIGHTS), weights=list(DIFFICULTY_WEIGHTS.values()))[0]
+        start = time.perf_counter()
+        ai_service.get_learning_tips(rng.choice(kana))
+        timings["ai"].append(time.perf_counter() - start)
+
+        for _ in range(args.exercises):
+            exercise_start = time.perf_counter()
+            practice_type = (user_manager.get_recommended_practice(difficulty)
+                             or rng.choice(practice_manager.get_practice_activities(difficulty)))
+            exercise = generate(practice_manager, syllabary, practice_type, difficulty, rng)
+            generated = time.perf_counter()
+            if args.think_time:
+                time.sleep(rng.expovariate(1 / args.think_time))
+            correct = rng.random() < args.accuracy
+            record_start = time.perf_counter()
+            user_manager.record_practice_result(difficulty, practice_type, correct, exercise.get("question"))
+            done = time.perf_counter()
+            timings["generate"].append(generated - exercise_start)
+            timings["record"].append(done - record_start)
+            timings["exercise"].append((generated - exercise_start) + (done - record_start))
+    latencies.append(timings)
+
+
+def run_slice(args, directory, learner_ids, services_directory):
+    """Run a group of learners on threads against one set of services; returns raw stats"""
+    services = build_services(services_directory, args.ai_latency)
+    latencies = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(learner_ids)) as pool:
+        for future in [pool.submit(run_learner, learner_id, args, directory, services, latencies)
+                       for learner_id in learner_ids]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    merged = {name: [value for timings in latencies for value in timings[name]] for name in latencies[0]}
+    locks = {name: (lock.acquisitions, lock.contended, lock.wait_seconds) for name, lock in services[3].items()}
+    return merged, locks, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--learners", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=3, help="sessions per learner")
+    parser.add_argument("--exercises", type=int, default=10, help="exercises per session")
+    parser.add_argument("--accuracy", type=float, default=0.7, help="chance each answer is right")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean seconds spent answering")
+    parser.add_argument("--ai-latency", type=float, default=0.05, help="seconds per stubbed LLM call")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    learner_ids = [f"learner-{i}" for i in range(args.learners)]
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, "progress"))
+        start = time.perf_counter()
+        if args.processes > 1:
+            slices = [learner_ids[i::args.processes] for i in range(args.processes)]
+            with ProcessPoolExecutor(args.processes) as pool:
+                # Each process gets its own services, like separate app server workers
+                results = list(pool.map(run_slice, [args] * len(slices), [directory] * len(slices), slices,
+                                        [os.path.join(directory, f"worker-{i}") for i in range(len(slices))]))
+        else:
+            results = [run_slice(args, directory, learner_ids, directory)]
+        elapsed = time.perf_counter() - start
+        progress_bytes = directory_bytes(os.path.join(directory, "progress"))
+        audio_bytes = directory_bytes(directory) - progress_bytes
+
+    latencies = {name: np.concatenate([np.asarray(result[0][name]) for result in results]) for name in results[0][0]}
+    exercises = len(latencies["exercise"])
+    print(f"{args.learners} learners x {args.sessions} sessions x {args.exercises} exercises "
+          f"on {args.processes} process(es): {exercises} exercises in {elapsed:.2f}s "
+          f"({exercises / elapsed:.0f} exercises/s)")
+    print(f"{'operation':<12}{'count':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, samples in latencies.items():
+        samples = samples * 1000
+        print(f"{name:<12}{len(samples):>8}" + "".join(f"{np.percentile(samples, q):>9.2f}" for q in (50, 95, 99, 100)))
+
+    print(f"storage: progress {progress_bytes / 1e3:.0f} KB ({progress_bytes / args.learners:.0f} B/learner, "
+          f"{progress_bytes / exercises:.0f} B/result), audio cache and examples {audio_bytes / 1e3:.0f} KB")
+    print(f"{'lock':<14}{'acquired':>10}{'contended':>11}{'wait ms':>10}")
+    for name in results[0][1]:
+        acquired = sum(result[1][name][0] for result in results)
+        contended = sum(result[1][name][1] for result in results)
+        wait = sum(result[1][name][2] for result in results)
+        print(f"{name:<14}{acquired:>10}{contended:>11}{wait * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Microbenchmarks for the core hot paths, checked against stored baselines.
+
+Run from the repository root:
+
+    python -m benchmarks.microbench                  # compare with baselines
+    python -m benchmarks.microbench --update         # record new baselines
+    python -m benchmarks.microbench -k generate_     # only matching cases
+
+Each case is timed as the best of --repeat runs of enough calls to fill
+--min-time seconds. Baselines live in benchmarks/baselines.json together
+with a calibration time (a fixed pure-Python workload, timed before and
+after the run). Comparisons use raw times by default; with --normalize,
+times are scaled by calibration so baselines recorded on another machine
+still mean something, at the price of the calibration's own noise. The exit
+status is 1 when any case is still slower than its baseline by more than
+--threshold after --confirm re-measurements. A case must also be slower by
+more than --floor microseconds, so timer and scheduling noise on the
+cheapest cases is not read as a regression.
+"""
+import argparse
+import inspect
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Tuple
+
+from benchmarks.load_test import StubAIService
+from modules.audio_cache import AudioCache
+from modules.examples import ExampleSentence, ExampleStore
+from modules.practice_manager import PracticeManager
+from modules.syllabary import JapaneseSyllabary
+from modules.user_data import UserProgressManager
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+CORPUS_SIZES = [1_000, 10_000, 100_000]
+
+
+def calibrate() -> float:
+    """Seconds for a fixed pure-Python workload, used to normalize across machines"""
+    def workload():
+        table = {}
+        for i in range(200_000):
+            table[i % 1000] = table.get(i % 1000, 0) + i
+        return sorted(table.values())
+    return measure(workload, min_time=0.2, repeat=5)
+
+
+def regressed(seconds: float, baseline: float, threshold: float, floor: float) -> bool:
+    """Whether a time is slower than its baseline by more than threshold and by more than floor seconds"""
+    return seconds > baseline * (1 + threshold) and seconds - baseline > floor
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.05, repeat: int = 5) -> float:
+    """Best per-call time over repeat runs, each long enough to fill min_time"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+@contextmanager
+def working_directory(path: str) -> Iterator[None]:
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def write_corpus(directory: str, size: int) -> None:
+    """Tatoeba-shaped sentence and translation files with size rows each"""
+    rng = random.Random(size)
+    kana = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+    tsv_dir = os.path.join(directory, "jpn_sentences.tsv")
+    os.makedirs(tsv_dir, exist_ok=True)
+    with open(os.path.join(tsv_dir, "jpn_sentences.tsv"), "w", encoding="utf-8") as f:
+        for i in range(size):
+            text = "".join(rng.choice(kana) for _ in range(rng.randint(4, 40))) + "。"
+            f.write(f"{i}\tjpn\t{text}\n")
+    with open(os.path.join(tsv_dir, "jp-en - 2025-05-18.tsv"), "w", encoding="utf-8") as f:
+        for i in range(size):
+            f.write(f"{i}\t{size + i}\tSentence number {i}.\n")
+
+
+def large_history(syllabary: JapaneseSyllabary, practice_manager: PracticeManager) -> Dict:
+    """Progress data of a long-time learner: every kana seen, every practice type at its history cap"""
+    now = "2025-05-18T12:00:00"
+    stats = {
+        difficulty: {
+            practice_type: {
+                "attempts": 5000, "correct": 3500, "last_practiced": now,
+                "content_history": [{"content_id": i, "timestamp": now, "success": i % 3 > 0} for i in range(50)]
+            } for practice_type in types
+        } for difficulty, types in practice_manager.practice_types.items()
+    }
+    symbols = {name: [entry["symbol"] for entry in table.values()]
+               for name, table in (("hiragana", syllabary.hiragana), ("katakana", syllabary.katakana))}
+    return {
+        "hiragana": {"learned": symbols["hiragana"], "mastered": symbols["hiragana"][:60],
+                     "needs_review": symbols["hiragana"][60:]},
+        "katakana": {"learned": symbols["katakana"], "mastered": symbols["katakana"][:60],
+                     "needs_review": symbols["katakana"][60:]},
+        "statistics": {"correct_answers": 60000, "total_attempts": 85000, "last_active": now,
+                       "study_sessions": [{"date": now, "minutes": 15} for _ in range(2000)]},
+        "settings": {"daily_goal_minutes": 15, "difficulty": "intermediate"},
+        "practice_stats": stats
+    }
+
+
+def cases(directory: str) -> Iterator[Tuple[str, Callable[[], object]]]:
+    """Yield (name, zero-argument callable) for every benchmarked hot path"""
+    # load_sentences should time parsing the corpus, not mapping an already built shared segment
+    os.environ["TONEMASTER_SHARED_CORPUS"] = "0"
+    syllabary = JapaneseSyllabary()
+    audio_cache = AudioCache(os.path.join(directory, "audio_cache"))
+    with working_directory(directory):
+        practice_manager = PracticeManager(audio_cache=audio_cache)
+
+    for size in CORPUS_SIZES:
+        corpus = os.path.join(directory, f"corpus-{size}")
+        write_corpus(corpus, size)
+
+        def load(corpus=corpus, size=size):
+            # Parse the whole corpus rather than the app's first CORPUS_ROW_LIMIT rows
+            practice_manager.CORPUS_ROW_LIMIT = size
+            with working_directory(corpus):
+                return practice_manager._load_sentences()
+        yield f"load_sentences[{size}]", load
+
+    examples = [ExampleSentence("あ", f"あさ{i}です。", "asa desu", f"Morning {i}", "") for i in range(6)]
+    arguments = {
+        "syllabary_type": "hiragana", "syllabary_data": syllabary.hiragana,
+        "hiragana_data": syllabary.hiragana, "katakana_data": syllabary.katakana,
+        "difficulty": "intermediate", "examples": examples
+    }
+    for name, method in inspect.getmembers(practice_manager, inspect.ismethod):
+        # Every generator, but not the generate_exercise dispatcher in front of them
+        if name.startswith("generate_") and name != "generate_exercise":
+            parameters = inspect.signature(method).parameters
+            kwargs = {parameter: arguments[parameter] for parameter in parameters}
+            for _ in range(200):
+                method(**kwargs)  # render the audio clips up front, as a warm cache would have them
+            yield name, lambda method=method, kwargs=kwargs: method(**kwargs)
+
+    for label, progress_data in (("small", None), ("large", large_history(syllabary, practice_manager))):
+        path = os.path.join(directory, f"progress-{label}.json")
+        if progress_data is not None:
+            with open(path, "w") as f:
+                json.dump(progress_data, f)
+        user_manager = UserProgressManager(db_path=path)
+        yield (f"record_practice_result[{label}]",
+               lambda user_manager=user_manager: user_manager.record_practice_result(
+                   "beginner", "kana_recognition", True, "Select the correct hiragana for: ka"))
+
+    for syllabary_type in ("hiragana", "katakana"):
+        yield f"get_chart[{syllabary_type}]", lambda t=syllabary_type: syllabary.get_chart(t)
+    yield "get_random_character", lambda: syllabary.get_random_character("hiragana")
+
+    ai_service = StubAIService(latency=0, example_store=ExampleStore())
+    ai_service.generate_example_sentences("あ", ["anime"])  # first call fills the example store
+    yield "ai.generate_example_sentences", lambda: ai_service.generate_example_sentences("あ", ["anime"])
+    yield "ai.get_learning_tips", lambda: ai_service.get_learning_tips("か")
+    yield "ai.create_personalized_learning_path", lambda: ai_service.create_personalized_learning_path(["travel"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", default="", help="only run cases whose name contains this")
+    parser.add_argument("--update", action="store_true", help="store this run as the new baselines")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--floor", type=float, default=1.0, help="smallest slowdown that counts, in microseconds")
+    parser.add_argument("--min-time", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--confirm", type=int, default=2, help="re-measurements before a slowdown counts")
+    parser.add_argument("--baselines", default=BASELINE_PATH)
+    parser.add_argument("--normalize", action="store_true", help="scale baselines by machine calibration")
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+    results = {}
+    calibration = calibrate()
+    with tempfile.TemporaryDirectory() as directory:
+        for name, fn in cases(directory):
+            if args.pattern not in name:
+                continue
+            random.seed(0)
+            results[name] = measure(fn, args.min_time, args.repeat)
+            baseline = baselines.get("cases", {}).get(name)
+            # A slow reading is measured again before it counts, one noisy run is not a regression
+            for _ in range(args.confirm if baseline and not args.update else 0):
+                if not regressed(results[name], baseline, args.threshold, args.floor * 1e-6):
+                    break
+                results[name] = min(results[name], measure(fn, args.min_time, args.repeat))
+    # Calibrate on both sides of the run, the quieter reading is the truer one
+    calibration = min(calibration, calibrate())
+    scale = calibration / baselines["calibration_seconds"] if baselines and args.normalize else 1.0
+
+    regressions = []
+    print(f"calibration {calibration * 1000:.1f} ms (x{scale:.2f} of baseline machine)")
+    print(f"{'case':<44}{'baseline us':>13}{'current us':>13}{'ratio':>8}")
+    for name, seconds in results.items():
+        baseline = baselines.get("cases", {}).get(name)
+        if baseline is None:
+            print(f"{name:<44}{'-':>13}{seconds * 1e6:>13.1f}{'new':>8}")
+            continue
+        ratio = seconds / (baseline * scale)
+        flag = "  REGRESSED" if regressed(seconds, baseline * scale, args.threshold, args.floor * 1e-6) else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<44}{baseline * scale * 1e6:>13.1f}{seconds * 1e6:>13.1f}{ratio:>8.2f}{flag}")
+
+    if args.update:
+        # Keep baselines for cases filtered out of this run
+        merged = {name: seconds * scale for name, seconds in baselines.get("cases", {}).items()}
+        merged.update(results)
+        with open(args.baselines, "w", encoding="utf-8") as f:
+            json.dump({"calibration_seconds": calibration, "cases": dict(sorted(merged.items()))}, f, indent=2)
+            f.write("\n")
+        print(f"Wrote {len(merged)} baselines to {args.baselines}")
+    elif regressions:
+        print(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%} "
+              f"and {args.floor:g} us: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
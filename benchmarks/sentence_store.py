@@ -0,0 +1,78 @@
+"""Memory per sentence and sampling speed: list-of-dict tiers vs SentenceStore.
+
+Run from the repository root:
+
+    python -m benchmarks.sentence_store --rows 200000
+
+Builds both layouts from the same synthetic Tatoeba-shaped sentences (kana
+text with an English translation) and reports the bytes each holds per
+sentence, measured with tracemalloc, and the time to draw a random sentence
+from a tier.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from benchmarks.microbench import measure
+from modules.sentence_store import SentenceStore, TIERS
+
+
+def synthetic(rows, seed=0):
+    rng = random.Random(seed)
+    kana = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+    texts = ["".join(rng.choice(kana) for _ in range(rng.randint(4, 40))) + "。" for _ in range(rows)]
+    translations = [f"Sentence number {i}." for i in range(rows)]
+    return list(range(rows)), texts, translations
+
+
+def tier_of(text):
+    return 0 if len(text) < 10 and "。" not in text and "、" not in text else 1 if len(text) < 20 else 2
+
+
+def as_dicts(ids, texts, translations):
+    """The layout _load_sentences used to return"""
+    sentences = {tier: [] for tier in TIERS}
+    for sentence_id, text, translation in zip(ids, texts, translations):
+        sentences[TIERS[tier_of(text)]].append({"text": text, "id": sentence_id, "translation": translation,
+                                                 "tags": []})
+    return sentences
+
+
+def allocated(build):
+    """(result, bytes still allocated by it)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    ids, texts, translations = synthetic(args.rows)
+    # Fresh copies of the strings, so the dict layout is charged for the ones it keeps
+    dicts, dict_bytes = allocated(lambda: as_dicts(ids, [t[:-1] + t[-1] for t in texts],
+                                                   [t[:-1] + t[-1] for t in translations]))
+    start = time.perf_counter()
+    store, store_bytes = allocated(lambda: SentenceStore.build(ids, texts, translations, map(tier_of, texts)))
+    build_seconds = time.perf_counter() - start
+    text_bytes = sum(len(text.encode("utf-8")) + len(translation) for text, translation in zip(texts, translations))
+
+    print(f"{args.rows} sentences, {text_bytes / args.rows:.0f} B of UTF-8 text per sentence")
+    print(f"{'layout':<16}{'B/sentence':>12}{'overhead B/sentence':>21}{'sample us':>11}")
+    for name, size, sample in (
+            ("list of dicts", dict_bytes, lambda: random.choice(dicts["advanced"])["text"]),
+            ("SentenceStore", store_bytes, lambda: store.sample("advanced").text)):
+        per_sentence = size / args.rows
+        print(f"{name:<16}{per_sentence:>12.0f}{per_sentence - text_bytes / args.rows:>21.0f}"
+              f"{measure(sample) * 1e6:>11.2f}")
+    print(f"SentenceStore.build: {build_seconds:.2f}s (columns: {store.nbytes / args.rows:.0f} B/sentence)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Per-process memory with the corpus private to each worker vs shared through mmap.
+
+Run from the repository root (Linux, reads /proc):
+
+    python -m benchmarks.shared_corpus --rows 200000 --workers 4
+
+Writes a synthetic Tatoeba export of --rows sentences, then for 1..--workers
+concurrent worker processes (spawned fresh, like separate Streamlit servers)
+loads a PracticeManager in each, touches every sentence, and reads RSS and
+PSS (proportional set size: shared pages split between the processes mapping
+them) from /proc/self/smaps_rollup while all workers are alive. Growth per
+worker is the increase in total PSS for every worker added beyond the first.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+
+from benchmarks.microbench import working_directory, write_corpus
+
+
+def memory_kb():
+    """(RSS, PSS) of this process in KB"""
+    values = {}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+def worker(directory, rows, shared, barrier, results):
+    os.environ["TONEMASTER_SHARED_CORPUS"] = "1" if shared else "0"
+    from modules.practice_manager import PracticeManager
+
+    PracticeManager.CORPUS_ROW_LIMIT = rows
+    with working_directory(directory):
+        practice_manager = PracticeManager()
+    # Fault in every page of the corpus, as a long-running server eventually would
+    characters = sum(len(sentence["text"]) for tier in practice_manager.sentences.values() for sentence in tier)
+    barrier.wait()
+    results.put((characters,) + memory_kb())
+    barrier.wait()  # nobody exits before everyone has measured
+
+
+def run(context, directory, rows, shared, workers):
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(directory, rows, shared, barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(directory, args.rows)
+        os.environ["TONEMASTER_CORPUS_SEGMENTS"] = os.path.join(directory, "segments")
+        # Build the segment up front so the shared runs measure attaching, not building
+        run(context, directory, args.rows, True, 1)
+
+        print(f"{args.rows} sentences")
+        print(f"{'corpus':<9}{'workers':>8}{'RSS MB/worker':>15}{'PSS MB total':>14}{'growth MB/worker':>18}")
+        for shared in (False, True):
+            first_total = None
+            for workers in range(1, args.workers + 1):
+                measured = run(context, directory, args.rows, shared, workers)
+                rss = sum(m[1] for m in measured) / len(measured) / 1024
+                total = sum(m[2] for m in measured) / 1024
+                first_total = total if first_total is None else first_total
+                growth = f"{(total - first_total) / (workers - 1):>18.1f}" if workers > 1 else f"{'-':>18}"
+                print(f"{'shared' if shared else 'private':<9}{workers:>8}{rss:>15.1f}{total:>14.1f}{growth}")
+
+
+if __name__ == "__main__":
+    main()
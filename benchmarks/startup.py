@@ -0,0 +1,86 @@
+"""Cold-start benchmark: import cost of app modules and time to the first rendered page.
+
+Run from the repository root:
+
+    python -m benchmarks.startup --runs 3
+
+Import cost is measured with ``python -X importtime`` in a fresh interpreter.
+Time to first page renders app.py headlessly with Streamlit's AppTest in a
+fresh interpreter, with background warm-up disabled, and reports the wall time
+from interpreter start until the default page has been produced.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules app.py imports at startup, plus the heavy ones that should now be deferred
+IMPORT_TARGETS = [
+    "streamlit",
+    "dotenv",
+    "modules.service_container",
+    "modules.ai_service",
+    "modules.practice_manager",
+    "modules.syllabary",
+    "modules.user_data",
+    "modules.content_recommender",
+]
+
+FIRST_PAGE_SCRIPT = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=120)
+app.run()
+if app.exception:
+    raise SystemExit(str(app.exception))
+print(f"{time.perf_counter() - start:.4f}")
+"""
+
+
+def import_times(module):
+    """Return {imported module: cumulative microseconds} for importing module in a fresh process"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.getcwd()
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def time_to_first_page():
+    """Seconds from interpreter start to the first rendered page of app.py"""
+    env = dict(os.environ, TONEMASTER_WARM_UP="0")
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_PAGE_SCRIPT], capture_output=True, text=True, cwd=os.getcwd(), env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--skip-render", action="store_true", help="only measure import times")
+    args = parser.parse_args()
+
+    print(f"{'module':<32}{'import ms':>12}")
+    for module in IMPORT_TARGETS:
+        samples = [import_times(module).get(module, 0) / 1000 for _ in range(args.runs)]
+        print(f"{module:<32}{statistics.median(samples):>12.1f}")
+
+    if not args.skip_render:
+        samples = [time_to_first_page() for _ in range(args.runs)]
+        print(f"\nTime to first rendered page: median {statistics.median(samples):.3f}s "
+              f"(min {min(samples):.3f}s, max {max(samples):.3f}s over {args.runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
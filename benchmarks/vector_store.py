@@ -0,0 +1,79 @@
+"""Recall versus latency benchmark for the compressed corpus vector stores.
+
+Run from the repository root:
+
+    python -m benchmarks.vector_store --vectors 200000 --dimension 1024
+
+Synthetic clustered vectors stand in for mistral-embed output so the benchmark
+runs without an API key. Every compressed layout is compared with the exact
+float32 flat index on recall@k, per-query latency and bytes per vector.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from modules.vector_store import CorpusVectorStore, INDEX_TYPES
+
+
+def make_vectors(count, dimension, clusters=256, seed=0):
+    """Generate clustered float32 vectors that roughly mimic sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    noise = rng.standard_normal((count, dimension)).astype(np.float32) * 0.6
+    return centers[labels] + noise
+
+
+def recall_at_k(exact_ids, approx_ids):
+    """Fraction of the exact top-k neighbours found by the approximate search"""
+    hits = 0
+    for exact_row, approx_row in zip(exact_ids, approx_ids):
+        hits += len(set(exact_row.tolist()) & set(approx_row.tolist()))
+    return hits / exact_ids.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dimension", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pq-m", type=int, default=64)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 32])
+    args = parser.parse_args()
+
+    corpus = make_vectors(args.vectors, args.dimension)
+    queries = make_vectors(args.queries, args.dimension, seed=1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configs = [(index_type, None) for index_type in INDEX_TYPES if index_type != "ivfpq"]
+        configs += [("ivfpq", nprobe) for nprobe in args.nprobe]
+
+        exact_ids = None
+        print(f"{'index':<14}{'build s':>10}{'bytes/vec':>11}{'file MB':>10}{'ms/query':>10}{'recall@' + str(args.k):>11}")
+        for index_type, nprobe in configs:
+            store = CorpusVectorStore(args.dimension, index_type, pq_m=args.pq_m, nprobe=nprobe or 16)
+            start = time.perf_counter()
+            store.build(corpus)
+            build_seconds = time.perf_counter() - start
+
+            path = os.path.join(tmp_dir, f"{index_type}.faiss")
+            store.save(path)
+            store = CorpusVectorStore.load(path, mmap=True)
+
+            start = time.perf_counter()
+            _, ids = store.search(queries, args.k)
+            ms_per_query = (time.perf_counter() - start) * 1000 / args.queries
+
+            if exact_ids is None:
+                exact_ids = ids
+            label = index_type if nprobe is None else f"{index_type}/{nprobe}"
+            print(f"{label:<14}{build_seconds:>10.2f}{store.code_size() + 8:>11}"
+                  f"{os.path.getsize(path) / 1e6:>10.1f}{ms_per_query:>10.3f}{recall_at_k(exact_ids, ids):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
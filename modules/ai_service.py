@@ -1,22 +1,80 @@
 import os
-from langchain_mistralai.chat_models import ChatMistralAI
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain_mistralai import MistralAIEmbeddings
-from langchain_community.vectorstores import FAISS
 import logging
+from collections import OrderedDict
+from modules import metrics
+from modules.resilience import CircuitBreaker, CircuitOpenError, call_with_retry
+from modules.examples import ExampleStore, parse_example_sentences
+from modules.semantic_cache import normalize_interests
+from modules.transliteration import Transliterator
+
+# Template content served when the LLM is unavailable and nothing is cached
+FALLBACK_CONTENT = {
+    "generate_example_sentences": """
+            Japanese: これは{character}です。
+            Romaji: kore wa {romaji} desu.
+            English: This is {character}.
+            """,
+    "get_learning_tips": """
+            1. Write '{character}' several times while saying its sound out loud.
+            2. Look for a shape in '{character}' that reminds you of its sound.
+            3. Compare it with similar-looking characters so you don't mix them up.
+            """,
+    "create_personalized_learning_path": """
+            1. Learn hiragana row by row (a, ka, sa, ta, na, ha, ma, ya, ra, wa), then katakana.
+            2. Collect words about {interests} in each row you finish.
+            3. Week 1: all hiragana rows with daily review. Week 2: katakana and themed vocabulary.
+            """
+}
+
+# Successful responses kept for fallback, least recently used dropped first
+MAX_CACHED_RESPONSES = 1024
+
+class FallbackContent(str):
+    """Content served in place of a failed LLM call, so callers can avoid caching it"""
+    __slots__ = ()
 
 class AIService:
-    def __init__(self):
-        """Initialize the AI service with Mistral AI models"""
+    def __init__(self, timeout=15.0, deadline=30.0, max_attempts=3, example_store=None, offline=False):
+        """Initialize the AI service with Mistral AI models
+        
+        With offline=True no models are created and every call serves cached or
+        template content, e.g. for harnesses that replace _run_chain.
+        """
+        # Per-call timeout, total deadline across retries, and a shared breaker
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.breaker = CircuitBreaker("mistral")
+        
+        # Most recent successful response per (method, arguments)
+        self.response_cache = OrderedDict()
+        self.fallback_count = 0
+        
+        # Parsed example sentences, so each character only needs generating once
+        self.example_store = example_store if example_store is not None else ExampleStore()
+        
+        # Spells characters out in the offline templates, created on the first fallback
+        self.transliterator = None
+        
+        self.llm = None
+        self.embeddings = None
+        if offline:
+            return
+        
         self.api_key = os.getenv("MISTRAL_API_KEY")
         if not self.api_key:
             logging.warning("MISTRAL_API_KEY not found in environment variables")
+        
+        # LangChain is imported here rather than at module level to keep app startup fast
+        from langchain_mistralai.chat_models import ChatMistralAI
+        from langchain_mistralai import MistralAIEmbeddings
             
         try:
             self.llm = ChatMistralAI(
                 model="mistral-small-latest", 
-                mistral_api_key=self.api_key
+                mistral_api_key=self.api_key,
+                timeout=max(1, int(timeout)),
+                max_retries=0  # Retries are handled by call_with_retry
             )
             self.embeddings = MistralAIEmbeddings(
                 model="mistral-embed",
@@ -27,10 +85,92 @@ class AIService:
             logging.error(f"Error initializing AI Service: {e}")
             raise
             
-    def generate_example_sentences(self, character, interests=None):
-        """Generate example sentences using the character based on user interests"""
-        interests_text = ", ".join(interests) if interests else "general topics"
+    def _run_chain(self, method, prompt, on_success=None, **inputs):
+        """Run an LLM chain with deadlines and retries, falling back when the upstream fails"""
+        key = (method, tuple(sorted(inputs.items())))
+        if self.llm is None:
+            return self._fallback(method, key, inputs)
+        from langchain.chains import LLMChain
+        try:
+            with metrics.span("ai_request", method=method):
+                response = call_with_retry(
+                    lambda: LLMChain(llm=self.llm, prompt=prompt).run(**inputs),
+                    self.breaker,
+                    timeout=self.timeout,
+                    attempts=self.max_attempts,
+                    deadline=self.deadline
+                )
+        except CircuitOpenError:
+            return self._fallback(method, key, inputs)
+        except Exception as e:
+            logging.error(f"{method} failed, serving fallback content: {e}")
+            return self._fallback(method, key, inputs)
         
+        self._cache_response(key, response)
+        if on_success:
+            on_success(response)
+        return response
+        
+    def _cache_response(self, key, response):
+        """Keep a response for fallback, evicting the least recently used past the cap"""
+        self.response_cache[key] = response
+        self.response_cache.move_to_end(key)
+        while len(self.response_cache) > MAX_CACHED_RESPONSES:
+            self.response_cache.popitem(last=False)
+        
+    def _fallback(self, method, key, inputs):
+        """Serve cached content for the same request, otherwise the offline template"""
+        self.fallback_count += 1
+        metrics.increment("ai_fallbacks_total", method=method)
+        if key in self.response_cache:
+            self.response_cache.move_to_end(key)
+            return FallbackContent(self.response_cache[key])
+        fields = dict(inputs)
+        if "character" in inputs:
+            # Templates carry the character's romaji so their examples pass validation
+            if self.transliterator is None:
+                self.transliterator = Transliterator()
+            fields["romaji"] = self.transliterator.to_romaji(inputs["character"])
+        return FallbackContent(FALLBACK_CONTENT[method].format(**fields))
+        
+    def embed_query(self, text):
+        """Embed text with the same timeout, retries and breaker as the LLM calls"""
+        if self.embeddings is None:
+            raise RuntimeError("Embeddings are unavailable offline")
+        with metrics.span("ai_request", method="embed_query"):
+            return call_with_retry(
+                lambda: self.embeddings.embed_query(text),
+                self.breaker,
+                timeout=self.timeout,
+                attempts=self.max_attempts,
+                deadline=self.deadline
+            )
+        
+    def seed_cache(self, method, response, **inputs):
+        """Preload precomputed content to serve while the LLM is unavailable"""
+        self._cache_response((method, tuple(sorted(inputs.items()))), response)
+        
+    def get_breaker_metrics(self):
+        """Get circuit breaker state and fallback counters"""
+        metrics = self.breaker.get_metrics()
+        metrics["fallbacks_served"] = self.fallback_count
+        metrics["cached_responses"] = len(self.response_cache)
+        return metrics
+            
+    def generate_example_sentences(self, character, interests=None, count=3):
+        """Generate example sentences using the character based on user interests
+        
+        Returns a list of ExampleSentence records. Parsed records are cached by
+        character and normalized interests, so the LLM is only asked once for each.
+        """
+        topic = normalize_interests(interests) if interests else ""
+        cached = self.example_store.get(character, topic)
+        if cached:
+            return cached[:count]
+        
+        interests_text = topic or "general topics"
+        
+        from langchain.prompts import PromptTemplate
         prompt = PromptTemplate(
             input_variables=["character", "interests"],
             template="""
@@ -48,12 +188,17 @@ class AIService:
             """
         )
         
-        chain = LLMChain(llm=self.llm, prompt=prompt)
-        response = chain.run(character=character, interests=interests_text)
-        return response
+        response = self._run_chain(
+            "generate_example_sentences", prompt,
+            on_success=lambda text: self.example_store.add(parse_example_sentences(text, character, topic)),
+            character=character, interests=interests_text
+        )
+        records = self.example_store.get(character, topic)
+        return records[:count] if records else parse_example_sentences(response, character, topic)
         
     def get_learning_tips(self, character):
         """Generate tips for memorizing the given character"""
+        from langchain.prompts import PromptTemplate
         prompt = PromptTemplate(
             input_variables=["character"],
             template="""
@@ -62,14 +207,14 @@ class AIService:
             """
         )
         
-        chain = LLMChain(llm=self.llm, prompt=prompt)
-        response = chain.run(character=character)
+        response = self._run_chain("get_learning_tips", prompt, character=character)
         return response
         
     def create_personalized_learning_path(self, interests):
         """Create a personalized learning path based on user interests"""
         interests_text = ", ".join(interests)
         
+        from langchain.prompts import PromptTemplate
         prompt = PromptTemplate(
             input_variables=["interests"],
             template="""
@@ -84,6 +229,5 @@ class AIService:
             """
         )
         
-        chain = LLMChain(llm=self.llm, prompt=prompt)
-        response = chain.run(interests=interests_text)
+        response = self._run_chain("create_personalized_learning_path", prompt, interests=interests_text)
         return response
@@ -0,0 +1,195 @@
+import re
+import itertools
+from typing import List, Iterable, Optional, Tuple
+from dataclasses import dataclass
+
+from modules.transliteration import SYSTEMS, Transliterator
+
+# Kana read differently as particles; every combination is accepted, up to a cap
+PARTICLE_READINGS = {"は": "わ", "へ": "え", "を": "お"}
+MAX_PARTICLE_SLOTS = 6
+
+# Long vowels that simplified Hepburn drops (Tokyo for Toukyou, ramen for raamen)
+COLLAPSED_LONG_VOWELS = [("ou", "o"), ("oo", "o"), ("uu", "u"), ("aa", "a"), ("ii", "i"), ("ee", "e")]
+
+# Long vowels written with a macron (kōhī); a circumflex reads the same way when normalized
+MACRON_LONG_VOWELS = [("ou", "ō"), ("oo", "ō"), ("uu", "ū"), ("aa", "ā"), ("ii", "ī"), ("ee", "ē")]
+
+# Loanword spellings of the IME-style forms to_romaji writes (paatii for paathii)
+LOANWORD_SPELLINGS = [("thi", "ti"), ("dhi", "di"), ("twu", "tu"), ("dwu", "du")]
+
+# Spaces, apostrophes and punctuation never decide whether an answer is right
+_IGNORED = re.compile(r"[^a-z]")
+
+
+@dataclass(frozen=True)
+class CheckResult:
+    """Outcome of checking one answer"""
+    __slots__ = ("correct", "distance", "expected")
+
+    correct: bool
+    distance: Optional[int]  # edit distance to the nearest accepted form, if within range
+    expected: str
+
+    @property
+    def close(self) -> bool:
+        return not self.correct and self.distance is not None
+
+
+class LevenshteinAutomaton:
+    """Bounded edit-distance automaton over one target string
+
+    States are the sparse column of the Levenshtein table, keeping only
+    positions within max_distance, so stepping is O(max_distance) per character.
+    """
+
+    def __init__(self, target: str, max_distance: int = 1):
+        self.target = target
+        self.max_distance = max_distance
+
+    def start(self) -> Tuple[List[int], List[int]]:
+        positions = list(range(min(self.max_distance, len(self.target)) + 1))
+        return positions, list(positions)
+
+    def step(self, state: Tuple[List[int], List[int]], char: str) -> Tuple[List[int], List[int]]:
+        positions, costs = state
+        new_positions, new_costs = [], []
+        if positions and positions[0] == 0 and costs[0] < self.max_distance:
+            new_positions.append(0)
+            new_costs.append(costs[0] + 1)
+        for j, (position, cost) in enumerate(zip(positions, costs)):
+            if position == len(self.target):
+                break
+            value = cost + (self.target[position] != char)
+            if new_positions and new_positions[-1] == position:
+                value = min(value, new_costs[-1] + 1)
+            if j + 1 < len(positions) and positions[j + 1] == position + 1:
+                value = min(value, costs[j + 1] + 1)
+            if value <= self.max_distance:
+                new_positions.append(position + 1)
+                new_costs.append(value)
+        return new_positions, new_costs
+
+    def distance(self, text: str) -> Optional[int]:
+        """Get the edit distance to text, or None if it exceeds max_distance"""
+        state = self.start()
+        for char in text:
+            state = self.step(state, char)
+            if not state[0]:
+                return None
+        positions, costs = state
+        if positions and positions[-1] == len(self.target):
+            return costs[-1]
+        return None
+
+
+class AnswerChecker:
+    """Romaji answer checking against precomputed sets of accepted forms"""
+
+    def __init__(self, transliterator: Transliterator = None, max_distance: int = 1):
+        """Initialize the checker; max_distance bounds "close" feedback, 0 disables it"""
+        self.transliterator = transliterator or Transliterator()
+        self.max_distance = max_distance
+        self.accepted = {}  # (kana, romaji) -> frozenset of normalized forms
+        self._automata = {}  # normalized form -> LevenshteinAutomaton
+
+    def normalize(self, answer: str) -> str:
+        """Reduce any romaji or kana spelling to lowercase Hepburn letters
+
+        Going through kana maps Kunrei, Nihon-shiki, IME-style and macron
+        spellings onto the same Hepburn string.
+        """
+        kana = self.transliterator.to_kana(answer.strip().lower())
+        return _IGNORED.sub("", self.transliterator.to_romaji(kana))
+
+    def accepted_forms(self, kana: str = None, romaji: str = None) -> frozenset:
+        """Get (and cache) every normalized answer accepted for an item"""
+        cache_key = (kana, romaji)
+        forms = self.accepted.get(cache_key)
+        if forms is not None:
+            return forms
+
+        # Every spelling of the reading goes through normalize, the same path as the answer
+        spellings = set()
+        if kana:
+            for reading in self._particle_variants(kana):
+                spellings.update(self.transliterator.to_romaji(reading, system) for system in SYSTEMS)
+        if romaji:
+            spellings.update(self._romaji_variants(romaji))
+
+        forms = set()
+        for spelling in spellings:
+            for variant in self._spelling_variants(spelling.lower()):
+                forms.add(self.normalize(variant))
+        forms = frozenset(forms)
+        self.accepted[cache_key] = forms
+        return forms
+
+    @staticmethod
+    def _particle_variants(kana: str) -> List[str]:
+        # A lone は or へ is being drilled as a kana, so only を keeps both readings there
+        slots = [i for i, char in enumerate(kana) if char in PARTICLE_READINGS and (len(kana) > 1 or char == "を")]
+        slots = slots[:MAX_PARTICLE_SLOTS]
+        variants = []
+        for choice in itertools.product((False, True), repeat=len(slots)):
+            chars = list(kana)
+            for slot, use_particle in zip(slots, choice):
+                if use_particle:
+                    chars[slot] = PARTICLE_READINGS[chars[slot]]
+            variants.append("".join(chars))
+        return variants
+
+    @staticmethod
+    def _spelling_variants(spelling: str) -> List[str]:
+        """The spelling with loanword spellings, and with its long vowels shortened or marked"""
+        variants = [spelling]
+        loanword = spelling
+        for ime, common in LOANWORD_SPELLINGS:
+            loanword = loanword.replace(ime, common)
+        if loanword != spelling:
+            variants.append(loanword)
+        for variant in list(variants):
+            if len(_IGNORED.sub("", variant)) > 3:
+                collapsed = macron = variant
+                for long_vowel, short_vowel in COLLAPSED_LONG_VOWELS:
+                    collapsed = collapsed.replace(long_vowel, short_vowel)
+                for long_vowel, marked in MACRON_LONG_VOWELS:
+                    macron = macron.replace(long_vowel, marked)
+                variants.extend((collapsed, macron))
+        return variants
+
+    @staticmethod
+    def _romaji_variants(romaji: str) -> List[str]:
+        # Only standalone words can be particles, e.g. 'watashi wa' / 'watashi ha'
+        alternatives = {"wa": ("wa", "ha"), "ha": ("ha", "wa"), "e": ("e", "he"), "he": ("he", "e"),
+                        "o": ("o", "wo"), "wo": ("wo", "o")}
+        words = romaji.lower().split()
+        options = [alternatives.get(word, (word,)) for word in words]
+        if sum(len(option) > 1 for option in options) > MAX_PARTICLE_SLOTS:
+            return [romaji]
+        return [" ".join(words) for words in itertools.product(*options)]
+
+    def precompute(self, items: Iterable[str]) -> None:
+        """Build accepted forms ahead of time for kana items, e.g. a whole syllabary"""
+        for kana in items:
+            self.accepted_forms(kana=kana)
+
+    def check(self, answer: str, kana: str = None, romaji: str = None) -> CheckResult:
+        """Check an answer for an item given by its kana, its romaji or both"""
+        forms = self.accepted_forms(kana, romaji)
+        expected = romaji or (self.transliterator.to_romaji(kana) if kana else "")
+        normalized = self.normalize(answer)
+        if normalized in forms:
+            return CheckResult(True, 0, expected)
+        if self.max_distance <= 0 or not normalized:
+            return CheckResult(False, None, expected)
+
+        best = None
+        for form in forms:
+            automaton = self._automata.get(form)
+            if automaton is None:
+                automaton = self._automata[form] = LevenshteinAutomaton(form, self.max_distance)
+            distance = automaton.distance(normalized)
+            if distance is not None and (best is None or distance < best):
+                best = distance
+        return CheckResult(False, best, expected)
@@ -0,0 +1,356 @@
+"""Headless JSON API over the practice and progress services.
+
+Serves the same service objects the Streamlit app uses (built through
+ServiceContainer) to mobile clients or anything behind a load balancer:
+
+    python -m modules.api_server --port 8080 --progress-dir progress
+
+Endpoints:
+
+    GET  /health
+    GET  /activities/{difficulty}
+    POST /learners/{learner_id}/exercises        {"difficulty", "practice_type"}
+    POST /learners/{learner_id}/answers          {"exercise_id", "answer"}
+    GET  /learners/{learner_id}/progress
+    GET  /learners/{learner_id}/recommendations  ?difficulty=beginner
+    GET  /metrics                                 Prometheus text format, see modules/metrics.py
+
+Each learner has a progress file in --progress-dir, the layout the batch job
+in modules/collaborative.py reads. Progress is kept in memory once loaded and
+written back by a background task, so request handlers never wait on disk.
+"""
+import os
+import re
+import json
+import uuid
+import random
+import atexit
+import asyncio
+import logging
+import argparse
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from aiohttp import web
+
+from modules import metrics
+from modules.exercise_bank import partition_key
+from modules.service_container import ServiceContainer
+from modules.user_data import UserProgressManager
+
+LEARNER_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Generators that render pronunciation audio, which may hit the disk
+AUDIO_PRACTICE_TYPES = {"listen_and_choose", "listening_comprehension", "speech_practice"}
+
+# Fields that give the answer away; they are returned with the graded answer instead
+HIDDEN_FIELDS = ("answer", "answers", "explanation", "example")
+
+# Exercises waiting for an answer, oldest dropped first
+MAX_PENDING_EXERCISES = 100_000
+
+SERVICES_KEY = web.AppKey("services", ServiceContainer)
+
+
+class _BufferedProgressManager(UserProgressManager):
+    """Progress manager whose saves are queued for the store's background writer"""
+
+    def __init__(self, store: "LearnerStore", db_path: str, user_id: str, recommender=None):
+        self._store = store
+        super().__init__(db_path=db_path, user_id=user_id, recommender=recommender)
+
+    def save_progress(self):
+        self._store.mark_dirty(self.user_id)
+
+
+class LearnerStore:
+    """Per-learner progress managers with non-blocking, coalesced writes"""
+
+    def __init__(self, directory: str, recommender=None, flush_interval: float = 1.0):
+        """Initialize the store; each dirty learner is written at most once per flush_interval"""
+        self.directory = directory
+        self.recommender = recommender
+        self.flush_interval = flush_interval
+        self._managers = {}  # learner_id -> _BufferedProgressManager
+        self._loading = {}  # learner_id -> future, so concurrent first requests load once
+        self._dirty = set()
+        self._writer = None
+        self.writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, learner_id: str) -> str:
+        return os.path.join(self.directory, f"{learner_id}.json")
+
+    async def get(self, learner_id: str) -> UserProgressManager:
+        """Get a learner's progress manager, loading the file off the event loop on first use"""
+        manager = self._managers.get(learner_id)
+        if manager is not None:
+            return manager
+        loading = self._loading.get(learner_id)
+        if loading is None:
+            loading = self._loading[learner_id] = asyncio.ensure_future(asyncio.to_thread(
+                _BufferedProgressManager, self, self.path(learner_id), learner_id, self.recommender))
+            loading.add_done_callback(lambda _: self._loading.pop(learner_id, None))
+        manager = await loading
+        self._managers.setdefault(learner_id, manager)
+        return self._managers[learner_id]
+
+    def mark_dirty(self, learner_id: str) -> None:
+        """Queue a learner's progress for the next background write"""
+        self._dirty.add(learner_id)
+
+    def start(self) -> None:
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    async def close(self) -> None:
+        """Stop the background writer and write everything still pending"""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write every dirty learner's progress now"""
+        dirty, self._dirty = self._dirty, set()
+        # Serialize on the loop, where the data is modified, then write in worker threads
+        snapshots = [(self.path(learner_id), json.dumps(self._managers[learner_id].progress_data))
+                     for learner_id in dirty if learner_id in self._managers]
+        await asyncio.gather(*(asyncio.to_thread(_write_file, path, text) for path, text in snapshots))
+        self.writes += len(snapshots)
+
+    async def _write_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.warning(f"Writing learner progress failed: {e}")
+
+
+def _write_file(path: str, text: str) -> None:
+    # Write then rename, so a crash mid-write never leaves a truncated progress file
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+def grade(exercise: Dict[str, Any], answer: Any) -> Tuple[bool, Any]:
+    """Grade an answer the way the Streamlit practice page does; returns (correct, expected)"""
+    if "answers" in exercise:
+        answers = answer if isinstance(answer, list) else [answer]
+        return set(answers) == set(exercise["answers"]), exercise["answers"]
+    if "answer" in exercise:
+        return answer == exercise["answer"], exercise["answer"]
+    if "vocabulary" in exercise:
+        # Sentence creation: a sentence using at least two of the given words
+        used = sum(word in str(answer) for word in exercise["vocabulary"])
+        return used >= 2, exercise.get("example")
+    # Speech practice is self-assessed on a 1-5 scale
+    try:
+        return int(answer) >= 4, None
+    except (TypeError, ValueError):
+        return False, None
+
+
+def exercise_content(exercise: Dict[str, Any]) -> Optional[str]:
+    """The text identifying an exercise in the learner's content history"""
+    for field in ("question", "japanese_text", "scenario", "text"):
+        if exercise.get(field):
+            return exercise[field]
+    return None
+
+
+class PracticeAPI:
+    """Request handlers sharing one set of services across all learners"""
+
+    def __init__(self, services: ServiceContainer, progress_dir: str = "progress", flush_interval: float = 1.0):
+        """Initialize the API over built-on-demand services"""
+        self.services = services
+        self.learners = LearnerStore(progress_dir, services.practice_recommender, flush_interval)
+        self.pending = OrderedDict()  # exercise_id -> (learner_id, difficulty, practice_type, exercise)
+
+    def routes(self):
+        return [
+            web.get("/health", self.health),
+            web.get("/metrics", self.metrics_text),
+            web.get("/activities/{difficulty}", self.activities),
+            web.post("/learners/{learner_id}/exercises", self.create_exercise),
+            web.post("/learners/{learner_id}/answers", self.submit_answer),
+            web.get("/learners/{learner_id}/progress", self.progress),
+            web.get("/learners/{learner_id}/recommendations", self.recommendations),
+        ]
+
+    async def on_startup(self, app: web.Application) -> None:
+        self.learners.start()
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        await self.learners.close()
+
+    @staticmethod
+    def _learner_id(request: web.Request) -> str:
+        learner_id = request.match_info["learner_id"]
+        if not LEARNER_ID.match(learner_id):
+            raise web.HTTPBadRequest(text="Learner ids are 1-64 letters, digits, '-' or '_'")
+        return learner_id
+
+    @staticmethod
+    async def _body(request: web.Request) -> Dict[str, Any]:
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text="Request body must be JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="Request body must be a JSON object")
+        return body
+
+    def _difficulty(self, difficulty: str) -> str:
+        difficulty = (difficulty or "beginner").lower()
+        if difficulty not in self.services.practice_manager.practice_types:
+            raise web.HTTPNotFound(text=f"Unknown difficulty '{difficulty}'")
+        return difficulty
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "pending_exercises": len(self.pending)})
+
+    async def metrics_text(self, request: web.Request) -> web.Response:
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    async def activities(self, request: web.Request) -> web.Response:
+        difficulty = self._difficulty(request.match_info["difficulty"])
+        return web.json_response(self.services.practice_manager.get_practice_activities(difficulty))
+
+    def _generate(self, practice_type: str, difficulty: str, cursor: Dict[str, Any] = None,
+                  exclude: Set[int] = None) -> Dict[str, Any]:
+        practice_manager = self.services.practice_manager
+        syllabary = self.services.syllabary
+        if practice_type == "kana_recognition":
+            syllabary_data = syllabary.hiragana if random.random() > 0.5 else syllabary.katakana
+        elif practice_type == "kana_matching":
+            syllabary_data = {"hiragana": syllabary.hiragana, "katakana": syllabary.katakana}
+        else:
+            syllabary_data = None
+        return practice_manager.generate_exercise(practice_type, difficulty, syllabary_data, cursor, exclude)
+
+    async def create_exercise(self, request: web.Request) -> web.Response:
+        learner_id = self._learner_id(request)
+        body = await self._body(request)
+        difficulty = self._difficulty(body.get("difficulty"))
+        available = self.services.practice_manager.get_practice_activities(difficulty)
+        practice_type = body.get("practice_type") or random.choice(available)
+        if practice_type not in available:
+            raise web.HTTPNotFound(text=f"Unknown {difficulty} practice type '{practice_type}'")
+
+        # The learner's place in the exercise bank is part of their progress, so it survives restarts
+        user_manager = await self.learners.get(learner_id)
+        cursor = user_manager.exercise_cursor()
+        exclude = user_manager.recent_fingerprints(difficulty, practice_type)
+        # Add the partition's position on the loop, so a worker thread only replaces its value
+        cursor["positions"].setdefault(partition_key(practice_type, difficulty), 0)
+        if practice_type in AUDIO_PRACTICE_TYPES:
+            exercise = await asyncio.to_thread(self._generate, practice_type, difficulty, cursor, exclude)
+        else:
+            exercise = self._generate(practice_type, difficulty, cursor, exclude)
+        self.learners.mark_dirty(learner_id)
+
+        exercise_id = uuid.uuid4().hex
+        self.pending[exercise_id] = (learner_id, difficulty, practice_type, exercise)
+        while len(self.pending) > MAX_PENDING_EXERCISES:
+            self.pending.popitem(last=False)
+        return web.json_response({
+            "exercise_id": exercise_id,
+            "difficulty": difficulty,
+            "practice_type": practice_type,
+            "exercise": {key: value for key, value in exercise.items() if key not in HIDDEN_FIELDS}
+        })
+
+    async def submit_answer(self, request: web.Request) -> web.Response:
+        learner_id = self._learner_id(request)
+        body = await self._body(request)
+        pending = self.pending.get(body.get("exercise_id"))
+        if pending is None or pending[0] != learner_id:
+            raise web.HTTPNotFound(text="Unknown or already answered exercise")
+        del self.pending[body["exercise_id"]]
+
+        _, difficulty, practice_type, exercise = pending
+        correct, expected = grade(exercise, body.get("answer"))
+        user_manager = await self.learners.get(learner_id)
+        user_manager.record_practice_result(difficulty, practice_type, correct, exercise_content(exercise),
+                                            exercise.get("fingerprint"))
+        return web.json_response({
+            "correct": correct,
+            "expected": expected,
+            "explanation": exercise.get("explanation")
+        })
+
+    async def progress(self, request: web.Request) -> web.Response:
+        user_manager = await self.learners.get(self._learner_id(request))
+        return web.json_response({
+            "summary": user_manager.get_progress_summary(),
+            "practice_stats": user_manager.get_practice_stats()
+        })
+
+    async def recommendations(self, request: web.Request) -> web.Response:
+        learner_id = self._learner_id(request)
+        difficulty = self._difficulty(request.query.get("difficulty"))
+        user_manager = await self.learners.get(learner_id)
+        # Learners without enough history get a pick from the practice manager instead
+        practice_type = (user_manager.get_recommended_practice(difficulty)
+                         or self.services.practice_manager.get_recommended_practice(learner_id, difficulty))
+        return web.json_response({"difficulty": difficulty, "practice_type": practice_type})
+
+
+@web.middleware
+async def _time_requests(request: web.Request, handler):
+    route = request.match_info.route.resource.canonical if request.match_info.route.resource else "unmatched"
+    with metrics.span("api_request", method=request.method, route=route):
+        return await handler(request)
+
+
+def create_app(services: ServiceContainer = None, progress_dir: str = "progress",
+               flush_interval: float = 1.0) -> web.Application:
+    """Build the aiohttp application; services default to a fresh ServiceContainer"""
+    services = services or ServiceContainer()
+    api = PracticeAPI(services, progress_dir, flush_interval)
+    # Request timing only costs anything when metrics are on
+    app = web.Application(middlewares=[_time_requests] if metrics.enabled() else [])
+    app[SERVICES_KEY] = services
+    app.add_routes(api.routes())
+    app.on_startup.append(api.on_startup)
+    app.on_cleanup.append(api.on_cleanup)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve practice and progress over a JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--progress-dir", default="progress")
+    parser.add_argument("--audio-cache", default="audio_cache")
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    services = ServiceContainer()
+    if args.audio_cache != "audio_cache":
+        from modules.audio_cache import AudioCache
+
+        def build_audio_cache(_):
+            audio_cache = AudioCache(args.audio_cache)
+            atexit.register(audio_cache.flush)  # the index is written on a timer, keep the last clips
+            return audio_cache
+        services.register("audio_cache", build_audio_cache)
+    # Build everything before accepting connections, so no request pays for it
+    for name in ("practice_manager", "syllabary", "practice_recommender"):
+        services.get(name)
+    web.run_app(create_app(services, args.progress_dir, args.flush_interval),
+                host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""Content-addressed pronunciation audio cache.
+
+Clips are keyed by a hash of (text, voice, speed) and stored as chunked,
+losslessly compressed WAV files (second-order sample prediction, then zlib
+over separated low and high bytes), so any byte range can be read by
+inflating only the chunks it covers. An LRU index keeps the cache within a
+byte budget.
+
+Until a real TTS engine is wired in, clips come from OfflineSynthesizer.
+Pre-render every kana and vocabulary item from the repository root with:
+
+    python -m modules.audio_cache --directory audio_cache
+"""
+import io
+import os
+import json
+import wave
+import zlib
+import struct
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from modules.pitch_accent import split_morae
+
+CLIP_MAGIC = b"TMAZ"
+CLIP_VERSION = 1
+CLIP_HEADER = struct.Struct("<4sHIQI")  # magic, version, chunk size, raw length, chunk count
+DEFAULT_CHUNK_SIZE = 64 * 1024  # must be even, chunks are coded as int16 samples
+
+VOICES = {"female": 220.0, "male": 120.0}
+
+
+def clip_key(text: str, voice: str = "female", speed: float = 1.0) -> str:
+    """Content address of a clip: the same request always maps to the same key"""
+    payload = json.dumps({"text": text.strip(), "voice": voice, "speed": round(float(speed), 3)},
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def encode_clip(raw: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE, level: int = 6) -> bytes:
+    """Compress WAV bytes into independently decodable chunks with an offset table"""
+    chunks = []
+    for start in range(0, len(raw), chunk_size):
+        piece = raw[start:start + chunk_size]
+        padded = piece + b"\0" * (len(piece) % 2)
+        # Residuals of a linear prediction from the two previous samples are small,
+        # and keeping their low and high bytes apart lets zlib find the runs
+        samples = np.frombuffer(padded, dtype="<i2")
+        residuals = np.diff(np.diff(samples, prepend=np.int16(0)), prepend=np.int16(0)).astype("<i2")
+        planes = residuals.view(np.uint8).reshape(-1, 2)
+        chunks.append(zlib.compress(planes[:, 0].tobytes() + planes[:, 1].tobytes(), level))
+
+    offsets = np.zeros(len(chunks) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(chunk) for chunk in chunks])
+    header = CLIP_HEADER.pack(CLIP_MAGIC, CLIP_VERSION, chunk_size, len(raw), len(chunks))
+    return header + offsets.tobytes() + b"".join(chunks)
+
+
+class ClipReader(io.RawIOBase):
+    """Seekable file object over a compressed clip that inflates chunks on demand"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        magic, version, self.chunk_size, self.length, count = CLIP_HEADER.unpack(self._file.read(CLIP_HEADER.size))
+        if magic != CLIP_MAGIC or version != CLIP_VERSION:
+            self._file.close()
+            raise ValueError(f"Not a compressed audio clip: {path}")
+        self._offsets = np.frombuffer(self._file.read(8 * (count + 1)), dtype="<u8")
+        self._data_start = CLIP_HEADER.size + 8 * (count + 1)
+        self._position = 0
+        self._cached_chunk = (-1, b"")
+
+    def _chunk(self, index: int) -> bytes:
+        if self._cached_chunk[0] != index:
+            self._file.seek(self._data_start + int(self._offsets[index]))
+            compressed = self._file.read(int(self._offsets[index + 1] - self._offsets[index]))
+            planes = np.frombuffer(zlib.decompress(compressed), dtype=np.uint8).reshape(2, -1)
+            residuals = np.ascontiguousarray(planes.T).view("<i2").ravel()
+            # int16 sums wrap around exactly like the int16 differences did
+            raw = np.cumsum(np.cumsum(residuals, dtype=np.int16), dtype=np.int16).astype("<i2").tobytes()
+            size = min(self.chunk_size, self.length - index * self.chunk_size)
+            self._cached_chunk = (index, raw[:size])
+        return self._cached_chunk[1]
+
+    def read_range(self, start: int, stop: int) -> bytes:
+        """Read decoded bytes [start, stop), inflating only the chunks involved"""
+        start, stop = max(0, start), min(stop, self.length)
+        if start >= stop:
+            return b""
+        parts = []
+        for index in range(start // self.chunk_size, (stop - 1) // self.chunk_size + 1):
+            chunk_start = index * self.chunk_size
+            chunk = self._chunk(index)
+            parts.append(chunk[max(start - chunk_start, 0):stop - chunk_start])
+        return b"".join(parts)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self.length}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def readall(self) -> bytes:
+        # One ranged read instead of RawIOBase's loop of small ones
+        data = self.read_range(self._position, self.length)
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read_range(self._position, self._position + len(buffer))
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+class OfflineSynthesizer:
+    """Local stand-in for a TTS engine: one harmonic tone per mora
+
+    Pitch follows the Tokyo heiban pattern (first mora low, the rest high),
+    so the clips are usable as pitch-accent references until real recordings
+    or a TTS service replace them.
+    """
+
+    def __init__(self, sample_rate: int = 16000, mora_seconds: float = 0.16):
+        self.sample_rate = sample_rate
+        self.mora_seconds = mora_seconds
+
+    def render(self, text: str, voice: str = "female", speed: float = 1.0) -> Tuple[bytes, List[float]]:
+        """Render text to 16-bit mono WAV bytes plus mora boundaries in seconds"""
+        base_f0 = VOICES.get(voice, VOICES["female"])
+        morae = split_morae(text) or [text]
+        mora_samples = int(self.sample_rate * self.mora_seconds / max(speed, 0.1))
+
+        # Semitone target per mora, glided between morae
+        targets = np.array([0.0] + [3.0] * (len(morae) - 1)) if len(morae) > 1 else np.array([2.0])
+        mora_positions = (np.arange(len(morae)) + 0.5) * mora_samples
+        positions = np.arange(len(morae) * mora_samples)
+        semitones = np.interp(positions, mora_positions, targets)
+        f0 = base_f0 * 2 ** (semitones / 12)
+
+        phase = 2 * np.pi * np.cumsum(f0) / self.sample_rate
+        signal = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 6))
+        # Each mora fades in and out so morae stay audibly separate
+        envelope = np.sin(np.pi * (positions % mora_samples) / mora_samples) ** 0.5
+        samples = (0.25 * signal * envelope * 32767).astype("<i2")
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(samples.tobytes())
+        boundaries = [i * mora_samples / self.sample_rate for i in range(len(morae) + 1)]
+        return buffer.getvalue(), boundaries
+
+
+class AudioCache:
+    """Compressed clips on disk with an LRU index bounded by max_bytes"""
+
+    def __init__(self, directory: str = "audio_cache", max_bytes: int = 256 * 1024 * 1024,
+                 synthesizer: OfflineSynthesizer = None, save_interval: float = 1.0):
+        """Initialize the cache, loading the index from directory if present
+
+        New clips are written at once, but the index is rewritten at most once per
+        save_interval seconds by a background timer; call flush() before exiting.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.save_interval = save_interval
+        self.synthesizer = synthesizer or OfflineSynthesizer()
+        self.entries = OrderedDict()  # key -> metadata, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one index writer at a time, they share a temp file
+        self._dirty = False
+        self._save_timer = None
+        self.load_index()
+
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "index.json")
+
+    def clip_path(self, key: str) -> str:
+        # Two-character fan-out keeps directories small
+        return os.path.join(self.directory, key[:2], f"{key}.wavz")
+
+    def load_index(self) -> None:
+        """Load the LRU index, dropping entries whose clip file has gone"""
+        if not os.path.exists(self._index_path()):
+            return
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception as e:
+            logging.error(f"Error loading audio cache index: {e}")
+            return
+        # Entries are saved least recently used first
+        for entry in entries:
+            if os.path.exists(self.clip_path(entry["key"])):
+                self.entries[entry["key"]] = entry
+                self.total_bytes += entry["stored_bytes"]
+
+    def save_index(self) -> None:
+        """Write the LRU index next to the clips"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._save_lock:
+            with self._lock:
+                entries = list(self.entries.values())
+            temp_path = self._index_path() + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(temp_path, self._index_path())
+
+    def flush(self) -> None:
+        """Write the index now if clips were added since the last write"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, False
+        if dirty:
+            self.save_index()
+
+    def _schedule_save(self) -> None:
+        # Coalesce the index writes of many new clips into one per save_interval
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_interval, self._scheduled_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _scheduled_save(self) -> None:
+        with self._lock:
+            self._save_timer = None
+        if not os.path.isdir(self.directory):
+            return  # the cache directory was removed, e.g. a temporary one
+        try:
+            self.flush()
+        except Exception as e:
+            logging.warning(f"Writing audio cache index failed: {e}")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def put(self, text: str, wav: bytes, voice: str = "female", speed: float = 1.0,
+            boundaries: List[float] = None, persist: bool = True) -> str:
+        """Store a rendered clip and return its key"""
+        key = clip_key(text, voice, speed)
+        encoded = encode_clip(wav)
+        path = self.clip_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(encoded)
+
+        # Clip files change only under the lock, so a file exists exactly while its entry does
+        with self._lock:
+            os.replace(temp_path, path)
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old["stored_bytes"]
+            self.entries[key] = {
+                "key": key, "text": text.strip(), "voice": voice, "speed": speed,
+                "raw_bytes": len(wav), "stored_bytes": len(encoded),
+                "boundaries": boundaries or []
+            }
+            self.total_bytes += len(encoded)
+            self._evict()
+        if persist:
+            self._schedule_save()
+        return key
+
+    def _evict(self) -> None:
+        # Called with the lock held; readers opened before keep their file until they close it
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry["stored_bytes"]
+            try:
+                os.remove(self.clip_path(key))
+            except OSError:
+                pass
+
+    def _touch(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def get_or_render(self, text: str, voice: str = "female", speed: float = 1.0, persist: bool = True) -> str:
+        """Get the key of a clip, synthesizing and storing it on a miss"""
+        key = clip_key(text, voice, speed)
+        if self._touch(key) is not None:
+            self.hits += 1
+            return key
+        self.misses += 1
+        wav, boundaries = self.synthesizer.render(text, voice, speed)
+        return self.put(text, wav, voice, speed, boundaries, persist)
+
+    def metadata(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get the index entry of a clip (text, voice, sizes, mora boundaries)"""
+        return self.entries.get(key)
+
+    def open(self, key: str) -> Optional[ClipReader]:
+        """Open a clip as a seekable WAV file object, or None if it is not cached"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return ClipReader(self.clip_path(key))
+
+    def read_range(self, key: str, start: int = 0, stop: int = None) -> Optional[bytes]:
+        """Read a byte range of a clip's WAV data without inflating the whole clip"""
+        reader = self.open(key)
+        if reader is None:
+            return None
+        with reader:
+            return reader.read_range(start, reader.length if stop is None else stop)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get clip count, sizes and hit rate"""
+        raw_bytes = sum(entry["raw_bytes"] for entry in self.entries.values())
+        requests = self.hits + self.misses
+        return {
+            "clips": len(self.entries),
+            "stored_bytes": self.total_bytes,
+            "raw_bytes": raw_bytes,
+            "compression_ratio": raw_bytes / self.total_bytes if self.total_bytes else 0.0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0
+        }
+
+
+def prerender_texts() -> List[str]:
+    """Every kana and vocabulary item the practice pages can ask audio for"""
+    from modules.syllabary import JapaneseSyllabary
+    from modules.practice_manager import PracticeManager
+
+    syllabary = JapaneseSyllabary()
+    practice_manager = PracticeManager()
+    texts = [entry["symbol"] for table in (syllabary.hiragana, syllabary.katakana) for entry in table.values()]
+    texts += [word for category in practice_manager.vocabulary.values() for word in category]
+    texts += list(practice_manager.common_phrases)
+    return list(dict.fromkeys(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render pronunciation clips for kana and vocabulary")
+    parser.add_argument("--directory", default="audio_cache")
+    parser.add_argument("--voice", choices=sorted(VOICES), default="female")
+    parser.add_argument("--speed", type=float, default=1.0)
+    args = parser.parse_args()
+
+    cache = AudioCache(args.directory)
+    texts = prerender_texts()
+    for text in texts:
+        cache.get_or_render(text, args.voice, args.speed, persist=False)
+    cache.save_index()
+    stats = cache.get_stats()
+    print(f"{len(texts)} items: {stats['misses']} rendered, {stats['hits']} already cached; "
+          f"{stats['clips']} clips, {stats['stored_bytes'] / 1e6:.1f} MB on disk "
+          f"({stats['compression_ratio']:.1f}x compression)")
+
+
+if __name__ == "__main__":
+    main()
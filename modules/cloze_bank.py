@@ -0,0 +1,342 @@
+"""Cloze exercises mined from the corpus with an Aho-Corasick automaton.
+
+One automaton holds the surface forms of every pattern: particles and
+grammar markers such as 〜てください or 〜たことがある. A single scan over
+the joined corpus finds every occurrence. Particles only count after a
+kanji, katakana, digit or closing bracket, because without a tokenizer a
+は or に after hiragana is usually part of a word (はし, きれいに). Some
+matches are ruled out by what follows them: the で of です, でした,
+でしょう, である, ではない and できる, and the ので of のです or のである, are
+not the particle or the connective. Distractors leave out patterns that would also fit the
+blank, such as に for と in 原因＿なった, へ for から in 空港＿の行き方, or one te-form
+ending for another after 食べ＿. The bank
+keeps each match as (sentence row, offset, length), sorted by pattern and
+tier, with the bounds of every (pattern, tier) cell. Sampling a cloze is a
+couple of random indexes, whatever the corpus size.
+
+Corpus builds and refreshes write the bank into the corpus directory (see
+modules/corpus_refresh.py). To mine it again, e.g. after CLOZE_VERSION
+changes, from the repository root:
+
+    python -m modules.cloze_bank --corpus-dir corpus_store
+"""
+import os
+import time
+import random
+import logging
+import argparse
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from modules.sentence_store import TIERS, SentenceStore, codepoints
+
+# Bumped whenever patterns or matching rules change, so older banks are mined again
+CLOZE_VERSION = 2
+
+# key -> (family, surface forms, what the pattern expresses); distractors come from the same family
+PATTERNS = {
+    "particle_wa": ("particle", ["は"], "marks the topic of the sentence"),
+    "particle_ga": ("particle", ["が"], "marks the subject"),
+    "particle_wo": ("particle", ["を"], "marks the direct object"),
+    "particle_ni": ("particle", ["に"], "marks a destination, time or indirect object"),
+    "particle_de": ("particle", ["で"], "marks the place or means of an action"),
+    "particle_e": ("particle", ["へ"], "marks a direction"),
+    "particle_to": ("particle", ["と"], "means 'and' or 'with'"),
+    "particle_mo": ("particle", ["も"], "means 'also' or 'too'"),
+    "particle_kara": ("particle", ["から"], "means 'from'"),
+    "particle_made": ("particle", ["まで"], "means 'until' or 'as far as'"),
+    "particle_yori": ("particle", ["より"], "compares: 'than'"),
+    "te_kudasai": ("ending", ["てください", "でください"], "makes a polite request: 'please do'"),
+    "te_iru": ("ending", ["ています", "ている", "でいます", "でいる"], "describes an ongoing action or state"),
+    "mashou": ("ending", ["ましょう"], "suggests doing something together: 'let's'"),
+    "tai": ("ending", ["たいです", "たいと思", "たくない"], "expresses a wish: 'want to'"),
+    "te_mo_ii": ("ending", ["てもいい", "でもいい"], "gives or asks permission: 'may'"),
+    "te_wa_ikenai": ("ending", ["てはいけない", "てはいけません", "ではいけない", "ではいけません"],
+                     "forbids: 'must not'"),
+    "nakereba": ("ending", ["なければならない", "なければなりません"], "expresses obligation: 'must'"),
+    "ta_koto_ga_aru": ("ending", ["たことがある", "たことがあります", "だことがある", "だことがあります"],
+                       "talks about experience: 'have done before'"),
+    "koto_ga_dekiru": ("ending", ["ことができる", "ことができます", "ことができない", "ことができません"],
+                       "expresses ability: 'can do'"),
+    "kamoshirenai": ("ending", ["かもしれない", "かもしれません"], "expresses possibility: 'might'"),
+    "tsumori": ("ending", ["つもり"], "expresses intention: 'plan to'"),
+    "hou_ga_ii": ("ending", ["ほうがいい", "方がいい"], "gives advice: 'had better'"),
+    "sugiru": ("ending", ["すぎる", "すぎた", "すぎます"], "means 'too much'"),
+    "nagara": ("connective", ["ながら"], "joins two simultaneous actions: 'while'"),
+    "node": ("connective", ["ので"], "gives a reason: 'because'"),
+    "noni": ("connective", ["のに"], "expresses contrast: 'although'"),
+}
+
+# Codepoints a particle may follow: kanji, katakana (with ー), digits and closing brackets
+PARTICLE_CONTEXT = ((0x3400, 0x9FFF), (0x3005, 0x3005), (0x30A1, 0x30FF), (0xFF10, 0xFF19), (0x30, 0x39),
+                    (0x300D, 0x300D), (0x300F, 0x300F), (0xFF09, 0xFF09))
+
+# Kanji + particle pairs that are one word (adverbs), not a noun and its particle
+PARTICLE_EXCEPTIONS = ("最も", "共に", "特に", "既に", "更に", "遂に", "正に", "実に", "殊に")
+
+# Pattern -> text that may not follow its match: the で of です/でした/でしょう/である/ではない/
+# ではありません is the copula and that of できる a verb; ので before these is の + the copula
+FOLLOWER_EXCEPTIONS = {"particle_de": ("す", "し", "あ", "き", "はな", "はあ", "な"),
+                       "node": ("す", "し", "あ", "き", "はな", "はあ", "な")}
+
+# Patterns that can fill the same blank, so none is offered as a distractor for another of its group:
+# particles that often swap, endings that all follow the te/ta stem, and the two connectives after の
+INTERCHANGEABLE_GROUPS = (("particle_wa", "particle_ga", "particle_mo"), ("particle_wo", "particle_ga"),
+                          ("particle_wo", "particle_mo"), ("particle_ni", "particle_e"), ("particle_ni", "particle_to"),
+                          ("particle_e", "particle_kara", "particle_made"), ("particle_kara", "particle_yori"),
+                          ("te_kudasai", "te_iru", "te_mo_ii", "te_wa_ikenai", "ta_koto_ga_aru"), ("node", "noni"))
+INTERCHANGEABLE = {key: {other for group in INTERCHANGEABLE_GROUPS if key in group for other in group} - {key}
+                   for key in PATTERNS}
+
+# Separates sentences in the scan; no pattern contains it, so no match spans two sentences
+SEPARATOR = "\x00"
+
+
+class AhoCorasick:
+    """Finds every occurrence of many keys in one pass
+
+    The trie and its failure links are compiled into a full transition dict per
+    state over the characters that occur in keys, so the scan is one dict lookup
+    per character; any other character returns to the root.
+    """
+
+    def __init__(self, keys: List[str]):
+        self.keys = list(keys)
+        self.transitions = [{}]
+        outputs = [[]]
+        for index, key in enumerate(self.keys):
+            state = 0
+            for char in key:
+                next_state = self.transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][char] = next_state
+                    self.transitions.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(index)
+
+        alphabet = sorted({char for key in self.keys for char in key})
+        goto = [dict(edges) for edges in self.transitions]
+        fail = [0] * len(goto)
+        queue = [0]
+        # Breadth first, so the failure state of every state is complete before it is used
+        for state in queue:
+            for char in alphabet:
+                child = self.transitions[state].get(char)
+                if child is not None:
+                    fail[child] = goto[fail[state]].get(char, 0) if state else 0
+                    outputs[child] = outputs[child] + outputs[fail[child]]
+                    queue.append(child)
+                elif state:
+                    target = goto[fail[state]].get(char, 0)
+                    if target:
+                        goto[state][char] = target
+        self.transitions = goto
+        self.outputs = [tuple(found) for found in outputs]
+
+    def __len__(self) -> int:
+        return len(self.transitions)
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (end, key index) of every occurrence, ordered by end"""
+        transitions, outputs = self.transitions, self.outputs
+        state = 0
+        for end, char in enumerate(text, 1):
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                for index in outputs[state]:
+                    yield end, index
+
+
+def _surfaces() -> Tuple[List[str], List[int]]:
+    surfaces, owners = [], []
+    for pattern, (_, forms, _) in enumerate(PATTERNS.values()):
+        surfaces.extend(forms)
+        owners.extend([pattern] * len(forms))
+    return surfaces, owners
+
+
+class ClozeBank:
+    """Corpus matches grouped by (pattern, tier): cell c = pattern * len(TIERS) + tier
+
+    Entries of cell c are rows[bounds[c]:bounds[c + 1]] (with the same slice
+    of offsets and lengths), rows being SentenceStore rows.
+    """
+
+    def __init__(self, rows: np.ndarray, offsets: np.ndarray, lengths: np.ndarray, bounds: np.ndarray):
+        self.rows = rows
+        self.offsets = offsets
+        self.lengths = lengths
+        self.bounds = bounds
+        self.patterns = list(PATTERNS)
+        counts = np.diff(bounds).reshape(len(self.patterns), len(TIERS))
+        # Patterns worth sampling, overall and per tier
+        self._present = {None: [p for p in range(len(self.patterns)) if counts[p].sum()]}
+        for index, tier in enumerate(TIERS):
+            self._present[tier] = [p for p in range(len(self.patterns)) if counts[p, index]]
+
+    @classmethod
+    def mine(cls, texts: List[str], tiers: np.ndarray) -> "ClozeBank":
+        """Mine texts (SentenceStore rows in order) with their tier indexes"""
+        surfaces, owners = _surfaces()
+        automaton = AhoCorasick(surfaces)
+        ends, found = [], []
+        for end, index in automaton.find_all(SEPARATOR.join(texts)):
+            ends.append(end)
+            found.append(index)
+        ends = np.array(ends, dtype=np.int64)
+        found = np.array(found, dtype=np.int64)
+        surface_lengths = np.array([len(surface) for surface in surfaces], dtype=np.int64)
+        starts = ends - surface_lengths[found]
+
+        # Sentence starts in the joined text, one separator after every sentence
+        points, text_starts = codepoints(texts)
+        joined_starts = text_starts[:-1] + np.arange(len(texts))
+        rows = np.searchsorted(joined_starts, starts, side="right") - 1
+        offsets = starts - joined_starts[rows]
+
+        # Particles need a word before them (see PARTICLE_CONTEXT)
+        is_particle = np.array([PATTERNS[key][0] == "particle" for key in PATTERNS])[np.array(owners)[found]]
+        before = np.where(offsets > 0, points[np.maximum(text_starts[rows] + offsets - 1, 0)], 0) \
+            if len(points) else np.zeros(len(rows), dtype=np.uint32)
+        context = np.zeros(len(rows), dtype=bool)
+        for low, high in PARTICLE_CONTEXT:
+            context |= (before >= low) & (before <= high)
+        first_points = np.array([ord(surface[0]) for surface in surfaces], dtype=np.uint32)[found]
+        for word in PARTICLE_EXCEPTIONS:
+            context &= ~((before == ord(word[0])) & (first_points == ord(word[1])))
+        keep = ~is_particle | (context & (offsets > 0))
+
+        # Matches continuing into another word (see FOLLOWER_EXCEPTIONS)
+        match_ends = text_starts[rows] + offsets + surface_lengths[found]
+        for key, followers in FOLLOWER_EXCEPTIONS.items():
+            matched = np.array(owners)[found] == list(PATTERNS).index(key)
+            for follower in followers:
+                follows = matched.copy()
+                for position, char in enumerate(follower):
+                    inside = match_ends + position < text_starts[rows + 1]
+                    follows &= inside & (points[np.minimum(match_ends + position, len(points) - 1)] == ord(char))
+                keep &= ~follows
+
+        patterns = np.array(owners, dtype=np.int64)[found[keep]]
+        rows, offsets, lengths = rows[keep], offsets[keep], surface_lengths[found[keep]]
+        cells = patterns * len(TIERS) + np.asarray(tiers, dtype=np.int64)[rows]
+        order = np.lexsort((offsets, rows, cells))
+        bounds = np.searchsorted(cells[order], np.arange(len(PATTERNS) * len(TIERS) + 1))
+        return cls(rows[order].astype(np.int32), offsets[order].astype(np.int32),
+                   lengths[order].astype(np.int8), bounds.astype(np.int64))
+
+    @classmethod
+    def from_store(cls, store: SentenceStore) -> "ClozeBank":
+        return cls.mine([store.string(row) for row in range(len(store))], store.tiers)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def count(self, pattern: str, tier: str = None) -> int:
+        low, high = self._cell_range(self.patterns.index(pattern), tier)
+        return high - low
+
+    def _cell_range(self, pattern: int, tier: Optional[str]) -> Tuple[int, int]:
+        width = len(TIERS)
+        if tier is None:
+            return int(self.bounds[pattern * width]), int(self.bounds[(pattern + 1) * width])
+        cell = pattern * width + TIERS.index(tier)
+        return int(self.bounds[cell]), int(self.bounds[cell + 1])
+
+    def sample(self, tier: str = None, pattern: str = None,
+               rng: random.Random = random) -> Optional[Tuple[str, int, int, int]]:
+        """(pattern, row, offset, length) of a random cloze, or None when there is none
+
+        Without a pattern, every pattern present is equally likely, so rare grammar
+        shows up as often as the particles.
+        """
+        if pattern is None:
+            present = self._present[tier]
+            if not present:
+                return None
+            index = present[rng.randrange(len(present))]
+        else:
+            index = self.patterns.index(pattern)
+        low, high = self._cell_range(index, tier)
+        if low == high:
+            return None
+        entry = rng.randrange(low, high)
+        return (self.patterns[index], int(self.rows[entry]), int(self.offsets[entry]), int(self.lengths[entry]))
+
+    def options(self, pattern: str, answer: str, count: int = 4, rng: random.Random = random) -> List[str]:
+        """The answer and count - 1 forms of other patterns of the same family, shuffled
+
+        Patterns interchangeable with the answer's (see INTERCHANGEABLE) are left out.
+        """
+        family = PATTERNS[pattern][0]
+        candidates = [PATTERNS[key][1][0] for key in PATTERNS
+                      if key != pattern and PATTERNS[key][0] == family and PATTERNS[key][1][0] != answer
+                      and key not in INTERCHANGEABLE[pattern]]
+        options = [answer] + rng.sample(candidates, min(count - 1, len(candidates)))
+        rng.shuffle(options)
+        return options
+
+    def save(self, path: str, store: SentenceStore) -> None:
+        from modules.corpus_refresh import _save_npz
+        _save_npz(path, rows=self.rows, offsets=self.offsets, lengths=self.lengths, bounds=self.bounds,
+                  ids=store.ids[self.rows], version=np.int64(CLOZE_VERSION))
+
+    @classmethod
+    def load(cls, path: str, store: SentenceStore) -> "ClozeBank":
+        """Load a saved bank; ValueError when it was mined by another version or from another store"""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != CLOZE_VERSION:
+                raise ValueError("Cloze bank was mined by another version")
+            bank = cls(data["rows"], data["offsets"], data["lengths"], data["bounds"])
+            ids = data["ids"]
+        if len(bank) and (bank.rows.max() >= len(store) or not np.array_equal(store.ids[bank.rows], ids)):
+            raise ValueError("Cloze bank was mined from another corpus")
+        return bank
+
+
+def load_or_mine(store: SentenceStore, path: str = None) -> ClozeBank:
+    """The saved bank at path when it matches the store, else one mined now"""
+    if path and os.path.exists(path):
+        try:
+            return ClozeBank.load(path, store)
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Mining the cloze bank again: {e}")
+    return ClozeBank.from_store(store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mine cloze exercises from the corpus")
+    parser.add_argument("--corpus-dir", default=None, help="Corpus directory to write the bank into; "
+                                                           "defaults to only reporting on the newest jp-zh export")
+    args = parser.parse_args()
+
+    from modules import shared_corpus
+    from modules.corpus_refresh import CLOZE_BANK_FILE, SENTENCES_FILE, read_export
+    from modules.corpus_files import find_translation_file
+    from modules.difficulty import APP_TIERS, DifficultyClassifier
+
+    if args.corpus_dir:
+        store = shared_corpus.map_segment(os.path.join(args.corpus_dir, SENTENCES_FILE))
+    else:
+        path = find_translation_file()
+        if path is None:
+            parser.error("No corpus pair file found")
+        ids, texts, translations = read_export(path)
+        store = SentenceStore.build(ids, texts, translations, DifficultyClassifier(APP_TIERS).fit_predict(texts))
+    start = time.perf_counter()
+    bank = ClozeBank.from_store(store)
+    elapsed = time.perf_counter() - start
+    if args.corpus_dir:
+        bank.save(os.path.join(args.corpus_dir, CLOZE_BANK_FILE), store)
+
+    print(f"{len(bank)} clozes from {len(store)} sentences in {elapsed:.2f}s")
+    print(f"{'pattern':<18}" + "".join(f"{tier:>14}" for tier in TIERS))
+    for pattern in bank.patterns:
+        print(f"{pattern:<18}" + "".join(f"{bank.count(pattern, tier):>14}" for tier in TIERS))
+
+
+if __name__ == "__main__":
+    main()
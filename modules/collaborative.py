@@ -0,0 +1,294 @@
+"""Item-item collaborative filtering over every learner's practice stats.
+
+The batch job reads all learner progress files, builds a sparse
+learner x (practice type, character) matrix, computes item-item cosine
+similarity and precomputes a top-k recommendation table per learner:
+
+    python -m modules.collaborative --progress-dir progress --output recommendations.npz
+
+The Streamlit app's own learner (user_progress.json) is read along with the
+directory, so it gets a row too.
+"""
+import os
+import glob
+import json
+import argparse
+from typing import List, Dict, Any, Iterable, Tuple
+
+import numpy as np
+
+# Interaction weights: how strongly an item signals "this learner needs practice here"
+NEEDS_REVIEW_WEIGHT = 1.0
+LEARNED_WEIGHT = 0.5
+MASTERED_WEIGHT = 0.1
+
+
+def practice_item(difficulty: str, practice_type: str) -> str:
+    return f"practice:{difficulty}:{practice_type}"
+
+
+def character_item(syllabary_type: str, character: str) -> str:
+    return f"{syllabary_type}:{character}"
+
+
+def progress_interactions(progress_data: Dict[str, Any]) -> Dict[str, float]:
+    """Turn one learner's progress data into weighted (item -> strength) interactions"""
+    interactions = {}
+    for syllabary_type in ("hiragana", "katakana"):
+        status = progress_data.get(syllabary_type, {})
+        for character in status.get("learned", []):
+            interactions[character_item(syllabary_type, character)] = LEARNED_WEIGHT
+        for character in status.get("mastered", []):
+            interactions[character_item(syllabary_type, character)] = MASTERED_WEIGHT
+        for character in status.get("needs_review", []):
+            interactions[character_item(syllabary_type, character)] = NEEDS_REVIEW_WEIGHT
+
+    for difficulty, types in progress_data.get("practice_stats", {}).items():
+        for practice_type, stats in types.items():
+            if stats.get("attempts", 0) > 0:
+                # Low accuracy means a strong signal, but any practice counts a little
+                error_rate = 1 - stats["correct"] / stats["attempts"]
+                interactions[practice_item(difficulty, practice_type)] = max(error_rate, MASTERED_WEIGHT)
+    return interactions
+
+
+class InteractionMatrix:
+    """Sparse learner x item matrix in CSR form"""
+
+    def __init__(self, user_ids: List[str], items: List[str], indptr: np.ndarray,
+                 indices: np.ndarray, data: np.ndarray):
+        self.user_ids = user_ids
+        self.items = items
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def from_interactions(cls, interactions: Iterable[Tuple[str, Dict[str, float]]],
+                          items: List[str] = None) -> "InteractionMatrix":
+        """Build the matrix from (user_id, {item: weight}) pairs"""
+        item_ids = {item: i for i, item in enumerate(items or [])}
+        items = list(items or [])
+        user_ids, indptr, indices, data = [], [0], [], []
+        for user_id, user_items in interactions:
+            user_ids.append(user_id)
+            for item, weight in user_items.items():
+                if item not in item_ids:
+                    item_ids[item] = len(items)
+                    items.append(item)
+                indices.append(item_ids[item])
+                data.append(weight)
+            indptr.append(len(indices))
+        return cls(user_ids, items,
+                   np.asarray(indptr, dtype=np.int64),
+                   np.asarray(indices, dtype=np.int32),
+                   np.asarray(data, dtype=np.float32))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.user_ids), len(self.items)
+
+    def dense_rows(self, start: int, stop: int) -> np.ndarray:
+        """Densify a block of learner rows"""
+        block = np.zeros((stop - start, len(self.items)), dtype=np.float32)
+        lo, hi = self.indptr[start], self.indptr[stop]
+        rows = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+        block[rows, self.indices[lo:hi]] = self.data[lo:hi]
+        return block
+
+
+class ItemItemRecommender:
+    """Item-item cosine similarity with precomputed per-learner top-k tables"""
+
+    def __init__(self, k: int = 10, block_size: int = 8192):
+        """Initialize the recommender; block_size bounds the dense working set"""
+        self.k = k
+        self.block_size = block_size
+        self.items = []
+        self.item_ids = {}
+        self.similarity = None  # (items, items) cosine similarity, diagonal zeroed
+        self.user_rows = {}  # user id -> row in the top-k tables
+        self.groups = []
+        self.tables = {}  # item group -> (top item ids, top scores), one row per learner
+
+    def fit(self, matrix: InteractionMatrix) -> None:
+        """Compute item-item similarity with a blocked X^T X"""
+        num_users, num_items = matrix.shape
+        gram = np.zeros((num_items, num_items), dtype=np.float64)
+        for start in range(0, num_users, self.block_size):
+            block = matrix.dense_rows(start, min(start + self.block_size, num_users))
+            gram += block.T @ block
+
+        norms = np.sqrt(np.diag(gram))
+        norms[norms == 0] = 1.0
+        similarity = (gram / norms[:, None] / norms[None, :]).astype(np.float32)
+        np.fill_diagonal(similarity, 0.0)
+
+        self.items = list(matrix.items)
+        self.item_ids = {item: i for i, item in enumerate(self.items)}
+        self.similarity = similarity
+
+    def precompute(self, matrix: InteractionMatrix) -> None:
+        """Score every item for every learner and keep the top k unmastered ones per item group
+
+        Groups are item prefixes such as 'practice:beginner' or 'hiragana', so a
+        page asking for beginner practice types never gets crowded out by kana.
+        """
+        num_users, num_items = matrix.shape
+        item_groups = np.array([item.rsplit(":", 1)[0] for item in self.items])
+        self.groups = sorted(set(item_groups.tolist()))
+        group_items = {group: np.flatnonzero(item_groups == group) for group in self.groups}
+        self.tables = {
+            group: (np.zeros((num_users, min(self.k, len(ids))), dtype=np.int32),
+                    np.zeros((num_users, min(self.k, len(ids))), dtype=np.float32))
+            for group, ids in group_items.items()
+        }
+
+        for start in range(0, num_users, self.block_size):
+            stop = min(start + self.block_size, num_users)
+            block = matrix.dense_rows(start, stop)
+            scores = block @ self.similarity
+            # Items a learner has mastered are not worth recommending
+            scores[(block > 0) & (block <= MASTERED_WEIGHT)] = -np.inf
+
+            for group, ids in group_items.items():
+                top_items, top_scores = self.tables[group]
+                k = top_items.shape[1]
+                group_scores = scores[:, ids]
+                top = np.argpartition(-group_scores, k - 1, axis=1)[:, :k]
+                best = np.take_along_axis(group_scores, top, axis=1)
+                order = np.argsort(-best, axis=1)
+                top_items[start:stop] = ids[np.take_along_axis(top, order, axis=1)]
+                top_scores[start:stop] = np.take_along_axis(best, order, axis=1)
+
+        self.user_rows = {user_id: row for row, user_id in enumerate(matrix.user_ids)}
+
+    def recommend(self, user_id: str, group: str, count: int = None,
+                  progress_data: Dict[str, Any] = None) -> List[Tuple[str, float]]:
+        """Get precomputed (item, score) recommendations from one item group
+
+        A learner the last batch run did not see gets the same scoring applied to
+        progress_data on the fly, when it is given.
+        """
+        row = self.user_rows.get(user_id)
+        if group not in self.tables:
+            return []
+        if row is None:
+            return self._score_progress(progress_data, group, count) if progress_data else []
+        top_items, top_scores = self.tables[group]
+        results = [
+            (self.items[item_id], float(score))
+            for item_id, score in zip(top_items[row], top_scores[row])
+            if np.isfinite(score) and score > 0
+        ]
+        return results[:count] if count else results
+
+    def _score_progress(self, progress_data: Dict[str, Any], group: str, count: int = None) -> List[Tuple[str, float]]:
+        """Score one group's items for a learner outside the tables, as precompute does"""
+        row = np.zeros(len(self.items), dtype=np.float32)
+        for item, weight in progress_interactions(progress_data).items():
+            item_id = self.item_ids.get(item)
+            if item_id is not None:
+                row[item_id] = weight
+        ids = np.array([i for i, item in enumerate(self.items) if item.rsplit(":", 1)[0] == group], dtype=np.int64)
+        scores = row @ self.similarity[:, ids]
+        scores[(row[ids] > 0) & (row[ids] <= MASTERED_WEIGHT)] = -np.inf
+        order = np.argsort(-scores, kind="stable")[:count or self.k]
+        return [(self.items[ids[i]], float(scores[i])) for i in order if np.isfinite(scores[i]) and scores[i] > 0]
+
+    def similar_items(self, item: str, count: int = 5) -> List[Tuple[str, float]]:
+        """Get the items most similar to one item, for learners without a precomputed row"""
+        item_id = self.item_ids.get(item)
+        if item_id is None or self.similarity is None:
+            return []
+        row = self.similarity[item_id]
+        top = np.argsort(-row)[:count]
+        return [(self.items[i], float(row[i])) for i in top if row[i] > 0]
+
+    def save(self, path: str) -> None:
+        """Save the similarity matrix and top-k tables"""
+        user_ids = sorted(self.user_rows, key=self.user_rows.get)
+        tables = {}
+        for i, group in enumerate(self.groups):
+            tables[f"top_items_{i}"], tables[f"top_scores_{i}"] = self.tables[group]
+        np.savez(
+            path,
+            k=np.int64(self.k),
+            items=np.array(self.items, dtype=str),
+            similarity=self.similarity,
+            user_ids=np.array(user_ids, dtype=str),
+            groups=np.array(self.groups, dtype=str),
+            **tables
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ItemItemRecommender":
+        """Load a recommender saved by the batch job"""
+        with np.load(path, allow_pickle=False) as data:
+            recommender = cls(k=int(data["k"]))
+            recommender.items = data["items"].tolist()
+            recommender.item_ids = {item: i for i, item in enumerate(recommender.items)}
+            recommender.similarity = data["similarity"]
+            recommender.user_rows = {user_id: row for row, user_id in enumerate(data["user_ids"].tolist())}
+            recommender.groups = data["groups"].tolist()
+            recommender.tables = {
+                group: (data[f"top_items_{i}"], data[f"top_scores_{i}"])
+                for i, group in enumerate(recommender.groups)
+            }
+        return recommender
+
+
+def load_progress_directory(progress_dir: str) -> Iterable[Tuple[str, Dict[str, float]]]:
+    """Yield (user_id, interactions) for every learner progress file in a directory"""
+    return load_progress_files(sorted(glob.glob(os.path.join(progress_dir, "*.json"))))
+
+
+def load_progress_files(paths: Iterable[str]) -> Iterable[Tuple[str, Dict[str, float]]]:
+    """Yield (user_id, interactions) for progress files, named by user id like UserProgressManager's"""
+    seen = set()
+    for path in paths:
+        user_id = os.path.splitext(os.path.basename(path))[0]
+        if user_id in seen or not os.path.exists(path):
+            continue
+        seen.add(user_id)
+        try:
+            with open(path, "r") as f:
+                progress_data = json.load(f)
+        except Exception as e:
+            print(f"Skipping unreadable progress file {path}: {e}")
+            continue
+        yield user_id, progress_interactions(progress_data)
+
+
+def build_recommendations(progress_dir: str, output: str, k: int = 10,
+                          progress_files: Iterable[str] = ()) -> ItemItemRecommender:
+    """Batch job: rebuild similarities and top-k tables from all learners' progress
+
+    progress_files are read along with the directory, such as the Streamlit app's user_progress.json.
+    """
+    paths = sorted(glob.glob(os.path.join(progress_dir, "*.json"))) + list(progress_files)
+    matrix = InteractionMatrix.from_interactions(load_progress_files(paths))
+    recommender = ItemItemRecommender(k=k)
+    recommender.fit(matrix)
+    recommender.precompute(matrix)
+    recommender.save(output)
+    return recommender
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild collaborative-filtering practice recommendations")
+    parser.add_argument("--progress-dir", default="progress")
+    parser.add_argument("--output", default="recommendations.npz")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--progress-file", action="append", default=None,
+                        help="Extra learner progress file, repeatable; defaults to the app's user_progress.json")
+    args = parser.parse_args()
+
+    progress_files = args.progress_file if args.progress_file is not None else ["user_progress.json"]
+    recommender = build_recommendations(args.progress_dir, args.output, args.k, progress_files)
+    print(f"Precomputed top-{args.k} recommendations for {len(recommender.user_rows)} learners "
+          f"over {len(recommender.items)} items into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,68 @@
+import os
+import logging
+from modules.ai_service import FallbackContent
+from modules.semantic_cache import SemanticCache, normalize_interests
+
 class ContentRecommender:
-    def __init__(self, ai_service):
+    def __init__(self, ai_service, similarity_threshold=0.9, theme_index_path="theme_index.npz"):
         """Initialize the content recommender with AI service"""
         self.ai_service = ai_service
         
+        # Offline-built themed vocabulary index, loaded on first use
+        self.theme_index_path = theme_index_path
+        self._theme_index = None
+        
+        # Semantic cache for learning paths, keyed by the embedded interest set
+        self.path_cache = SemanticCache(
+            self.ai_service.embed_query,
+            threshold=similarity_threshold
+        )
+        
     def generate_recommendation(self, interests):
         """Generate personalized learning recommendations based on user interests"""
         if not interests:
             return "Please add some interests to get personalized recommendations."
             
-        # Use the AI service to create a personalized learning path
-        recommendation = self.ai_service.create_personalized_learning_path(interests)
+        # Reuse a learning path generated for a similar interest set when possible,
+        # and only ask the AI service to create one on a true miss. Fallback content
+        # isn't cached, so an outage doesn't pin the offline path for that interest set
+        key = normalize_interests(interests)
+        recommendation = self.path_cache.get_or_create(
+            key, lambda: self.ai_service.create_personalized_learning_path(interests),
+            cacheable=lambda value: not isinstance(value, FallbackContent)
+        )
         return recommendation
         
+    def get_cache_stats(self):
+        """Get hit rate and similarity distribution of the learning path cache"""
+        return self.path_cache.get_stats()
+        
+    @property
+    def theme_index(self):
+        """The themed vocabulary index, or None if it hasn't been built"""
+        if self._theme_index is None and self.theme_index_path and os.path.exists(self.theme_index_path):
+            from modules.theme_index import ThemeIndex
+            try:
+                self._theme_index = ThemeIndex.load(self.theme_index_path)
+            except Exception as e:
+                logging.error(f"Error loading theme index: {e}")
+                self.theme_index_path = None
+        return self._theme_index
+        
     def get_themed_vocabulary(self, theme, count=10):
         """Get vocabulary words related to a specific theme"""
-        # This would use the AI service to generate themed vocabulary
-        # For MVP, we'll just return sample data
+        # Ranked vocabulary mined from the corpus (see modules/theme_index.py)
+        index = self.theme_index
+        if index is not None:
+            terms = index.top_k(theme, count)
+            if terms:
+                return [index.format_term(term) for term, _ in terms]
+        
+        # Fall back to sample data when the index is missing or doesn't know the theme
         themes = {
             "anime": ["まんが (manga)", "アニメ (anime)", "キャラクター (character)"],
             "food": ["すし (sushi)", "ラーメン (ramen)", "おちゃ (tea)"],
             "travel": ["でんしゃ (train)", "ホテル (hotel)", "りょこう (trip)"]
         }
         
-        return themes.get(theme.lower(), ["No vocabulary found for this theme"])
+        return themes.get(theme.lower(), ["No vocabulary found for this theme"])[:count]
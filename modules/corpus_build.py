@@ -0,0 +1,237 @@
+"""Parallel full build of a corpus directory from a Tatoeba export.
+
+The export is a jp-zh style pair file (jp_id, jp_text, id, text) or a
+sentences file (id, language, text) such as jpn_sentences.tsv.bz2, whose
+sentences get no translations. Plain or bz2-compressed, it is cut into
+line-aligned blocks that a process pool parses, hashing each sentence's
+canonical form on the way (see modules/duplicates.py). Rows are then grouped
+by sentence id in the parent, duplicate sentences are dropped, and the rest
+are split into fixed-size chunks for the per-sentence stages: content
+hashes and kanji counts. Tiering needs corpus-wide kanji ranks, so the summed counts go back to the pool with the chunks to
+score them, and the tier cut points are quantiles of all scores. The
+segment, distractor, cloze bank and manifest writes run in the parent (see modules/corpus_refresh.py for the directory layout).
+
+Blocks and chunks are sized in bytes and sentences, never by worker count,
+and every merge keeps input order, so the output is byte-identical for any
+number of workers and matches a first modules/corpus_refresh.py build of the
+same pair export. Later pair exports can be applied to the directory with a
+refresh. From the repository root:
+
+    python -m modules.corpus_build --input "jpn_sentences.tsv/jp-zh - 2025-05-18.tsv" --workers 8
+    python -m modules.corpus_build --input jpn_sentences.tsv.bz2
+"""
+import io
+import os
+import bz2
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from modules.corpus_files import find_translation_file, parse_sentences, parse_translation_pairs
+from modules.corpus_refresh import (TRANSLATION_SEPARATOR, DistractorIndex, clear_embeddings, content_hashes,
+                                    write_artifacts)
+from modules.difficulty import APP_TIERS, DifficultyClassifier, kanji_counts
+from modules.duplicates import canonical_keys, cluster_keys
+from modules.sentence_store import SentenceStore
+
+BLOCK_BYTES = 4 << 20  # export bytes parsed per task
+CHUNK_SENTENCES = 16384  # sentences analyzed per task
+
+
+def _open_export(path: str):
+    return bz2.open(path, "rt", encoding="utf-8-sig") if path.endswith(".bz2") else open(path, encoding="utf-8-sig")
+
+
+def is_sentences_export(path: str) -> bool:
+    """Whether the export holds bare sentences (id, language, text) rather than translation pairs
+
+    Decided by the first row; raises ValueError for a file that is neither. An empty file is an
+    empty pair export.
+    """
+    with _open_export(path) as f:
+        line = next((line for line in f if line.strip()), "")
+    columns = len(line.rstrip("\r\n").split("\t"))
+    if not line or columns >= 4:
+        return False
+    if columns == 3:
+        return True
+    raise ValueError(f"{path} is neither a Tatoeba pair export (jp_id, jp_text, id, text) "
+                     f"nor a sentences export (id, language, text)")
+
+
+def input_blocks(path: str, block_bytes: int = BLOCK_BYTES) -> Iterator[Tuple]:
+    """Blocks covering the export: (path, start, end) byte ranges, or decompressed bytes for bz2
+
+    A bz2 stream cannot be entered at an arbitrary offset, so it is decompressed here and cut at
+    line ends; a plain file is only split, and each worker reads its own range.
+    """
+    if path.endswith(".bz2"):
+        with bz2.open(path, "rb") as f:
+            carry = b""
+            while True:
+                data = f.read(block_bytes)
+                if not data:
+                    break
+                data = carry + data
+                cut = data.rfind(b"\n") + 1
+                if cut == 0:
+                    carry = data
+                    continue
+                carry = data[cut:]
+                yield (data[:cut],)
+            if carry:
+                yield (carry,)
+        return
+    size = os.path.getsize(path)
+    for start in range(0, size, block_bytes):
+        yield (path, start, min(start + block_bytes, size))
+
+
+def _read_range(path: str, start: int, end: int) -> bytes:
+    # The block holds every line that starts inside [start, end)
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        begin = f.tell()
+        if begin >= end:
+            return b""
+        data = f.read(end - begin)
+        if not data.endswith(b"\n"):
+            data += f.readline()
+        return data
+
+
+def _parse_block(task: Tuple[bool, Tuple]) -> Tuple[np.ndarray, List[str], List[str], np.ndarray]:
+    """(ids, texts, translations, duplicate keys) of every row of a block, in file order
+
+    Sentences exports have no translations.
+    """
+    sentences, block = task
+    data = _read_range(*block) if len(block) == 3 else block[0]
+    first = len(block) == 1 or block[1] == 0
+    # Only the start of the file can carry a byte order mark
+    lines = io.StringIO(data.decode("utf-8-sig" if first else "utf-8"), newline="")
+    ids, texts, translations = [], [], []
+    if sentences:
+        for jp_id, jp_text in parse_sentences(lines):
+            ids.append(jp_id)
+            texts.append(jp_text)
+        translations = [""] * len(texts)
+    else:
+        for jp_id, jp_text, _, translation in parse_translation_pairs(lines):
+            ids.append(jp_id)
+            texts.append(jp_text)
+            translations.append(translation)
+    return np.array(ids, dtype=np.int64), texts, translations, canonical_keys(texts)
+
+
+def group_rows(blocks: List[Tuple[np.ndarray, List[str], List[str], np.ndarray]]
+               ) -> Tuple[np.ndarray, List[str], List[str], np.ndarray]:
+    """Merge parsed blocks like corpus_refresh.read_export: one row per id, sorted, translations in file order"""
+    row_ids = np.concatenate([ids for ids, _, _, _ in blocks]) if blocks else np.zeros(0, dtype=np.int64)
+    row_texts = [text for _, texts, _, _ in blocks for text in texts]
+    row_translations = [translation for _, _, translations, _ in blocks for translation in translations]
+    row_keys = np.concatenate([keys for _, _, _, keys in blocks]) if blocks else canonical_keys([])
+    order = np.argsort(row_ids, kind="stable")
+    sorted_ids = row_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]]) if len(order) else np.zeros(0, np.int64)
+    ends = np.r_[starts[1:], len(order)]
+    firsts = order[starts].tolist()
+    translations = [row_translations[row] for row in firsts]
+    for group in np.flatnonzero(ends - starts > 1).tolist():
+        translations[group] = TRANSLATION_SEPARATOR.join(row_translations[row]
+                                                         for row in order[starts[group]:ends[group]].tolist())
+    return sorted_ids[starts], [row_texts[row] for row in firsts], translations, row_keys[order[starts]]
+
+
+def _analyze_chunk(chunk: Tuple[List[str], List[str]]) -> Dict[str, object]:
+    """Everything about a chunk of sentences that does not depend on the rest of the corpus"""
+    texts, translations = chunk
+    return {
+        "hashes": content_hashes(texts, translations),
+        "kanji_counts": kanji_counts(texts),
+    }
+
+
+def _score_chunk(chunk: Tuple[List[str], np.ndarray]) -> np.ndarray:
+    texts, counts = chunk
+    classifier = DifficultyClassifier(APP_TIERS).fit_kanji(counts)
+    return classifier.score(classifier.features(texts))
+
+
+def build(corpus_dir: str, export_path: str, workers: int = None) -> Dict[str, float]:
+    """Build every artifact of a corpus directory from an export, replacing what is there"""
+    workers = workers or os.cpu_count() or 1
+    sentences = is_sentences_export(export_path)
+    timings = {}
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    run = pool.map if pool is not None else map
+    try:
+        start = time.perf_counter()
+        blocks = list(run(_parse_block, ((sentences, block) for block in input_blocks(export_path))))
+        ids, texts, translations, keys = group_rows(blocks)
+        del blocks
+        timings["parse_seconds"] = time.perf_counter() - start
+
+        # One sentence per duplicate cluster, the lowest id, as a refresh keeps
+        start = time.perf_counter()
+        keep = np.flatnonzero(cluster_keys(keys) == np.arange(len(ids)))
+        duplicates = len(ids) - len(keep)
+        ids, texts, translations = ids[keep], [texts[row] for row in keep], [translations[row] for row in keep]
+        timings["cluster_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bounds = list(range(0, len(texts), CHUNK_SENTENCES))
+        parts = list(run(_analyze_chunk, ((texts[low:low + CHUNK_SENTENCES], translations[low:low + CHUNK_SENTENCES])
+                                          for low in bounds)))
+        counts = np.sum([part["kanji_counts"] for part in parts], axis=0) if parts else kanji_counts([])
+        classifier = DifficultyClassifier(APP_TIERS).fit_kanji(counts)
+        scores = list(run(_score_chunk, ((texts[low:low + CHUNK_SENTENCES], counts) for low in bounds)))
+        scores = np.concatenate(scores) if scores else np.zeros(0)
+        tiers = classifier.fit_cut_points(scores).tiers(scores)
+        timings["analyze_seconds"] = time.perf_counter() - start
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    start = time.perf_counter()
+    store = SentenceStore.build(ids, texts, translations, tiers)
+    distractors = DistractorIndex().apply(np.zeros(0, dtype=np.int64), store.ids,
+                                          DistractorIndex.key(store.tiers, store.lengths))
+    os.makedirs(corpus_dir, exist_ok=True)
+    clear_embeddings(corpus_dir)  # vectors of a previous build may not match these sentences
+    hashes = np.concatenate([part["hashes"] for part in parts]) if parts else np.zeros(0, dtype="<u8")
+    write_artifacts(corpus_dir, store, distractors, ids, hashes, export_path, classifier)
+    timings["write_seconds"] = time.perf_counter() - start
+
+    return dict(timings, sentences=len(store), workers=workers, duplicates=duplicates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the corpus artifacts from an export with a process pool")
+    parser.add_argument("--corpus-dir", default="corpus_store")
+    parser.add_argument("--input", default=None,
+                        help="Pair or sentences export (.tsv or .tsv.bz2), defaults to the newest jp-zh file")
+    parser.add_argument("--workers", type=int, default=None, help="processes, defaults to the CPU count")
+    args = parser.parse_args()
+
+    path = args.input or find_translation_file()
+    if path is None:
+        parser.error("No corpus pair file found")
+    try:
+        is_sentences_export(path)
+    except ValueError as e:
+        parser.error(str(e))
+    stats = build(args.corpus_dir, path, args.workers)
+    print(f"{os.path.basename(path)}: {stats['sentences']} sentences with {stats['workers']} workers; "
+          f"parsed {stats['parse_seconds']:.2f}s, analyzed {stats['analyze_seconds']:.2f}s, "
+          f"clustered {stats['cluster_seconds']:.2f}s, wrote {stats['write_seconds']:.2f}s; "
+          f"{stats['duplicates']} duplicates dropped")
+
+
+if __name__ == "__main__":
+    main()
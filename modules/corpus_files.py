@@ -0,0 +1,46 @@
+import os
+import csv
+import glob
+from typing import Iterable, Iterator, Optional, Tuple
+
+# Tatoeba exports live next to the app, in the jpn_sentences.tsv directory
+TSV_DIR_NAME = "jpn_sentences.tsv"
+
+
+def corpus_dir(base_dir: str = None) -> str:
+    """Get the directory holding the Tatoeba exports"""
+    return os.path.join(base_dir or os.getcwd(), TSV_DIR_NAME)
+
+
+def find_translation_file(language: str = "zh", base_dir: str = None) -> Optional[str]:
+    """Find the newest dated Japanese-to-language pair file, e.g. 'jp-zh - 2025-05-18.tsv'"""
+    candidates = sorted(glob.glob(os.path.join(corpus_dir(base_dir), f"jp-{language} - *.tsv")))
+    return candidates[-1] if candidates else None
+
+
+def read_translation_pairs(path: str) -> Iterator[Tuple[int, str, int, str]]:
+    """Yield (jp_id, jp_text, translation_id, translation_text) rows from a pair file"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        yield from parse_translation_pairs(f)
+
+
+def parse_translation_pairs(lines: Iterable[str]) -> Iterator[Tuple[int, str, int, str]]:
+    """read_translation_pairs() for lines already read, e.g. one block of a larger export"""
+    for row in csv.reader(lines, delimiter="\t", quoting=csv.QUOTE_NONE):
+        if len(row) < 4:
+            continue
+        try:
+            yield int(row[0]), row[1], int(row[2]), row[3]
+        except ValueError:
+            continue
+
+
+def parse_sentences(lines: Iterable[str], language: str = "jpn") -> Iterator[Tuple[int, str]]:
+    """Yield (id, text) rows of one language from a sentences export (id, language, text)"""
+    for row in csv.reader(lines, delimiter="\t", quoting=csv.QUOTE_NONE):
+        if len(row) != 3 or row[1] != language:
+            continue
+        try:
+            yield int(row[0]), row[2]
+        except ValueError:
+            continue
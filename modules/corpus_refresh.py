@@ -0,0 +1,313 @@
+"""Incremental refresh of the corpus artifacts from a new Tatoeba pair export.
+
+A corpus directory holds everything derived from one export:
+
+    sentences.seg     SentenceStore segment (modules/shared_corpus.py format); translations by id,
+                      one sentence per duplicate cluster (modules/duplicates.py)
+    distractors.npz   sentence ids grouped by tier and length, for distractors of matching difficulty
+    embeddings/       optional CorpusVectorStore shards, SHARD_SPAN consecutive sentence ids each
+    manifest.npz      sorted ids of the kept sentences with content hashes, the tiering and
+                      deduplication versions and the source name
+    cloze_bank.npz    cloze exercises mined from sentences.seg (modules/cloze_bank.py)
+
+A full build with modules/corpus_build.py writes the same files in parallel.
+
+A refresh diffs the new export against the manifest by sentence id and
+content hash. Only inserted, updated and deleted sentences are tiered,
+embedded and re-indexed; untouched rows are carried over as whole blocks.
+Reading, deduplicating and hashing the export and mining the cloze bank are
+still linear passes, but everything else, embedding calls included, scales
+with the size of the change. Point the app at the directory with
+TONEMASTER_CORPUS_DIR; running app processes keep the corpus they attached
+until they restart. From the repository root:
+
+    python -m modules.corpus_refresh --corpus-dir corpus_store        # newest jp-zh export
+    python -m modules.corpus_refresh --corpus-dir corpus_store --input "jpn_sentences.tsv/jp-zh - 2025-06-01.tsv"
+"""
+import os
+import time
+import bisect
+import hashlib
+import argparse
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from modules import cloze_bank, shared_corpus
+from modules.corpus_files import find_translation_file, read_translation_pairs
+from modules.difficulty import APP_TIERS, DifficultyClassifier
+from modules.duplicates import DEDUP_VERSION, representatives
+from modules.sentence_store import TIERS, SentenceStore
+
+SENTENCES_FILE = "sentences.seg"
+DISTRACTORS_FILE = "distractors.npz"
+EMBEDDINGS_DIR = "embeddings"
+MANIFEST_FILE = "manifest.npz"
+CLOZE_BANK_FILE = "cloze_bank.npz"
+# Written by earlier builds but never read; removed whenever the artifacts are written
+RETIRED_FILES = ("kana_masks.npz", "romaji.npz", "clusters.npz")
+
+TRANSLATION_SEPARATOR = " / "  # between several translations of one sentence
+SHARD_SPAN = 100_000
+LENGTH_BUCKETS = np.array([8, 12, 16, 24, 32, 48])  # upper bounds (exclusive) of distractor length buckets
+_LENGTH_BOUNDS = LENGTH_BUCKETS.tolist()
+
+
+def read_export(path: str) -> Tuple[np.ndarray, List[str], List[str]]:
+    """(ids, texts, translations) with one row per Japanese sentence, sorted by id"""
+    texts, translations = {}, {}
+    for jp_id, jp_text, _, translation in read_translation_pairs(path):
+        if jp_id in texts:
+            translations[jp_id].append(translation)
+        else:
+            texts[jp_id] = jp_text
+            translations[jp_id] = [translation]
+    ids = sorted(texts)
+    return (np.array(ids, dtype=np.int64), [texts[i] for i in ids],
+            [TRANSLATION_SEPARATOR.join(translations[i]) for i in ids])
+
+
+def content_hashes(texts: List[str], translations: List[str]) -> np.ndarray:
+    """64-bit hash of every (text, translation) row"""
+    digests = b"".join(hashlib.blake2b(f"{text}\t{translation}".encode("utf-8"), digest_size=8).digest()
+                       for text, translation in zip(texts, translations))
+    return np.frombuffer(digests, dtype="<u8")
+
+
+@dataclass(frozen=True)
+class CorpusDiff:
+    """Sentence ids that differ between two exports"""
+    inserted: np.ndarray
+    updated: np.ndarray
+    deleted: np.ndarray
+
+    @property
+    def removed(self) -> np.ndarray:
+        """Ids whose current rows go away: deletions, and the old versions of updates"""
+        return np.concatenate([self.deleted, self.updated])
+
+    def __len__(self) -> int:
+        return len(self.inserted) + len(self.updated) + len(self.deleted)
+
+
+def diff_export(old_ids: np.ndarray, old_hashes: np.ndarray,
+                new_ids: np.ndarray, new_hashes: np.ndarray) -> CorpusDiff:
+    """Compare two id-sorted (ids, content hashes) manifests"""
+    positions = np.minimum(np.searchsorted(old_ids, new_ids), max(len(old_ids) - 1, 0))
+    found = (old_ids[positions] == new_ids) if len(old_ids) else np.zeros(len(new_ids), dtype=bool)
+    changed = found & (old_hashes[positions] != new_hashes) if len(old_ids) else found
+    return CorpusDiff(inserted=new_ids[~found], updated=new_ids[changed],
+                      deleted=old_ids[~np.isin(old_ids, new_ids, assume_unique=True)])
+
+
+class DistractorIndex:
+    """Sentence ids (or store rows) grouped by (tier, length bucket), sorted so each group is one contiguous slice"""
+
+    def __init__(self, keys: np.ndarray = None, ids: np.ndarray = None):
+        self.keys = keys if keys is not None else np.zeros(0, dtype=np.int32)
+        self.ids = ids if ids is not None else np.zeros(0, dtype=np.int64)
+        self._groups = None  # key -> (start, stop), built on the first lookup
+
+    @staticmethod
+    def key(tiers: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        return (np.asarray(tiers, dtype=np.int32) * (len(LENGTH_BUCKETS) + 1)
+                + np.searchsorted(LENGTH_BUCKETS, lengths, side="right"))
+
+    def apply(self, removed_ids: np.ndarray, added_ids: np.ndarray, added_keys: np.ndarray) -> "DistractorIndex":
+        keep = ~np.isin(self.ids, removed_ids)
+        keys = np.concatenate([self.keys[keep], np.asarray(added_keys, dtype=np.int32)])
+        ids = np.concatenate([self.ids[keep], np.asarray(added_ids, dtype=np.int64)])
+        order = np.lexsort((ids, keys))
+        return DistractorIndex(keys[order], ids[order])
+
+    def candidates(self, tier: str, length: int) -> np.ndarray:
+        """Ids of sentences in the same tier and length bucket"""
+        if self._groups is None:
+            starts = np.flatnonzero(np.r_[True, self.keys[1:] != self.keys[:-1]]) if len(self.keys) else []
+            stops = np.r_[starts[1:], len(self.keys)] if len(self.keys) else []
+            self._groups = {int(self.keys[start]): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+        # Same key as key(), in plain Python since this runs once per exercise
+        key = TIERS.index(tier) * (len(LENGTH_BUCKETS) + 1) + bisect.bisect_right(_LENGTH_BOUNDS, length)
+        start, stop = self._groups.get(key, (0, 0))
+        return self.ids[start:stop]
+
+    def save(self, path: str) -> None:
+        _save_npz(path, keys=self.keys, ids=self.ids)
+
+    @classmethod
+    def load(cls, path: str) -> "DistractorIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["keys"], data["ids"])
+
+
+class EmbeddingShards:
+    """Sentence embeddings in CorpusVectorStore shards of SHARD_SPAN consecutive ids
+
+    Only shards holding a changed id are loaded and rewritten. Index types
+    that need training (ivfpq) cannot be updated in place and are not offered.
+    """
+
+    def __init__(self, directory: str, dimension: int, index_type: str = "fp16"):
+        if index_type not in ("flat", "fp16", "sq8"):
+            raise ValueError("Embedding shards must use an untrained index type: flat, fp16 or sq8")
+        self.directory = directory
+        self.dimension = dimension
+        self.index_type = index_type
+
+    def path(self, shard: int) -> str:
+        return os.path.join(self.directory, f"shard-{shard:05d}.faiss")
+
+    def apply(self, removed_ids: np.ndarray, added_ids: np.ndarray, vectors: np.ndarray) -> List[int]:
+        """Remove and add vectors by sentence id; returns the shards that were rewritten"""
+        from modules.vector_store import CorpusVectorStore  # FAISS is only needed when embeddings are kept
+
+        rewritten = []
+        for shard in sorted(set((removed_ids // SHARD_SPAN).tolist()) | set((added_ids // SHARD_SPAN).tolist())):
+            path = self.path(shard)
+            removing = removed_ids[removed_ids // SHARD_SPAN == shard]
+            adding = added_ids // SHARD_SPAN == shard
+            if os.path.exists(path):
+                store = CorpusVectorStore.load(path, mmap=False)
+                if len(removing):
+                    store.index.remove_ids(removing.astype(np.int64))
+                if adding.any():
+                    store.add(vectors[adding], added_ids[adding])
+            elif adding.any():
+                store = CorpusVectorStore(self.dimension, self.index_type)
+                store.build(vectors[adding], added_ids[adding])
+            else:
+                continue
+            store.save(path)
+            rewritten.append(shard)
+        return rewritten
+
+
+def _save_npz(path: str, **arrays) -> None:
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(temp_path, path)
+
+
+def load_manifest(corpus_dir: str) -> Optional[Dict[str, np.ndarray]]:
+    path = os.path.join(corpus_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def clear_embeddings(corpus_dir: str) -> None:
+    embeddings_dir = os.path.join(corpus_dir, EMBEDDINGS_DIR)
+    for name in os.listdir(embeddings_dir) if os.path.isdir(embeddings_dir) else []:
+        os.remove(os.path.join(embeddings_dir, name))
+
+
+def write_artifacts(corpus_dir: str, store: SentenceStore, distractors: DistractorIndex, ids: np.ndarray,
+                    hashes: np.ndarray, export_path: str, classifier: DifficultyClassifier) -> None:
+    """Write the sentence segment, distractor index, cloze bank and manifest of a corpus directory"""
+    shared_corpus.write_segment(os.path.join(corpus_dir, SENTENCES_FILE), store)
+    distractors.save(os.path.join(corpus_dir, DISTRACTORS_FILE))
+    # Mined here rather than by the app, whose first grammar exercise would otherwise wait for it
+    cloze_bank.ClozeBank.from_store(store).save(os.path.join(corpus_dir, CLOZE_BANK_FILE), store)
+    # The manifest goes last: until it is replaced, the next refresh diffs against the previous export
+    # again, and since refresh removes every id it writes, it rewrites the same rows instead of adding them twice
+    _save_npz(os.path.join(corpus_dir, MANIFEST_FILE), ids=ids, hashes=hashes,
+              source=np.array(os.path.basename(export_path)), dedup_version=np.int64(DEDUP_VERSION),
+              **classifier.get_state())
+    for name in RETIRED_FILES:
+        if os.path.exists(os.path.join(corpus_dir, name)):
+            os.remove(os.path.join(corpus_dir, name))
+
+
+def refresh(corpus_dir: str, export_path: str, embed_fn: Callable[[List[str]], np.ndarray] = None,
+            index_type: str = "fp16") -> Dict[str, float]:
+    """Bring the corpus directory up to date with an export; builds it from scratch the first time
+
+    embed_fn maps a list of sentences to a float32 matrix and is only called for changed sentences.
+    """
+    timings = {}
+    start = time.perf_counter()
+    ids, texts, translations = read_export(export_path)
+    # One sentence per duplicate cluster, the lowest id; the others are never stored or diffed
+    keep = representatives(texts)
+    ids, texts, translations = ids[keep], [texts[row] for row in keep], [translations[row] for row in keep]
+    hashes = content_hashes(texts, translations)
+    timings["read_seconds"] = time.perf_counter() - start
+
+    manifest = load_manifest(corpus_dir)
+    classifier = DifficultyClassifier(APP_TIERS)
+    try:
+        if manifest is None:
+            raise ValueError("no manifest")
+        if int(manifest.get("dedup_version", 0)) != DEDUP_VERSION:
+            raise ValueError("artifacts were deduplicated by another version")
+        classifier.set_state(manifest)
+        changes = diff_export(manifest["ids"], manifest["hashes"], ids, hashes)
+        store = shared_corpus.map_segment(os.path.join(corpus_dir, SENTENCES_FILE))
+        distractors = DistractorIndex.load(os.path.join(corpus_dir, DISTRACTORS_FILE))
+    except (OSError, ValueError, KeyError):
+        # First build, or artifacts from another tiering or deduplication version: everything is an insert
+        classifier.fit(texts)
+        changes = CorpusDiff(inserted=ids, updated=np.zeros(0, np.int64), deleted=np.zeros(0, np.int64))
+        store, distractors = None, DistractorIndex()
+        clear_embeddings(corpus_dir)
+
+    apply_start = time.perf_counter()
+    rows = np.searchsorted(ids, np.sort(np.concatenate([changes.inserted, changes.updated])))
+    changed_texts = [texts[row] for row in rows]
+    added = SentenceStore.build(ids[rows], changed_texts, [translations[row] for row in rows],
+                                classifier.predict(changed_texts))
+    # Every id being written is removed first, inserts included: after a refresh that stopped before
+    # its manifest write, the artifacts already hold rows the manifest does not, and a re-run must
+    # replace them rather than add them twice
+    removed = np.concatenate([changes.removed, changes.inserted])
+    store = store.apply(removed, added) if store is not None else added
+    distractors = distractors.apply(removed, added.ids, DistractorIndex.key(added.tiers, added.lengths))
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    shards = []
+    if embed_fn is not None and (len(added) or len(removed)):
+        # SentenceStore.build groups rows by tier, so embed in the store's row order
+        texts_to_embed = [added.string(row) for row in range(len(added))]
+        vectors = (np.asarray(embed_fn(texts_to_embed), dtype=np.float32) if texts_to_embed
+                   else np.zeros((0, 0), dtype=np.float32))
+        shards = EmbeddingShards(os.path.join(corpus_dir, EMBEDDINGS_DIR), vectors.shape[1],
+                                 index_type).apply(removed, added.ids, vectors)
+    write_artifacts(corpus_dir, store, distractors, ids, hashes, export_path, classifier)
+    timings["apply_seconds"] = time.perf_counter() - apply_start
+
+    return dict(timings, sentences=len(store), inserted=len(changes.inserted), updated=len(changes.updated),
+                deleted=len(changes.deleted), embedded=len(added) if embed_fn else 0, shards_rewritten=len(shards))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or incrementally refresh the corpus artifacts")
+    parser.add_argument("--corpus-dir", default="corpus_store")
+    parser.add_argument("--input", default=None, help="Pair export, defaults to the newest jp-zh file")
+    parser.add_argument("--embeddings", action="store_true", help="keep embedding shards (calls the embedding API)")
+    parser.add_argument("--index-type", choices=["flat", "fp16", "sq8"], default="fp16")
+    args = parser.parse_args()
+
+    path = args.input or find_translation_file()
+    if path is None:
+        parser.error("No corpus pair file found")
+    embed_fn = None
+    if args.embeddings:
+        from modules.ai_service import AIService
+        from modules.vector_store import embed_texts
+        service = AIService()
+        if getattr(service, "embeddings", None) is None:
+            parser.error("Embeddings need a working AI service (MISTRAL_API_KEY)")
+        embed_fn = lambda texts: embed_texts(service.embeddings, texts)
+
+    stats = refresh(args.corpus_dir, path, embed_fn, args.index_type)
+    print(f"{os.path.basename(path)}: {stats['sentences']} sentences, {stats['inserted']} inserted, "
+          f"{stats['updated']} updated, {stats['deleted']} deleted; read {stats['read_seconds']:.2f}s, "
+          f"applied {stats['apply_seconds']:.2f}s, {stats['embedded']} embedded, "
+          f"{stats['shards_rewritten']} shards rewritten")
+
+
+if __name__ == "__main__":
+    main()
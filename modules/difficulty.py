@@ -0,0 +1,189 @@
+"""Vectorized difficulty tiering for corpus sentences.
+
+Every sentence is scored from features computed in one NumPy pass over the
+codepoints of the whole corpus: length, kana and kanji ratios, punctuation
+(clause) count and the frequency rank of its rarest kanji within the corpus.
+Tiers are score quantiles, so a scheme is just tier names with the share of
+the corpus each should hold. The app's three tiers and the five JLPT levels
+are predefined.
+
+See how a corpus splits, and how long it takes, from the repository root:
+
+    python -m modules.difficulty --scheme jlpt
+"""
+import time
+import argparse
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from modules.sentence_store import codepoints, segment_sums
+
+# (tier name, share of the corpus), easiest first
+APP_TIERS = (("beginner", 0.3), ("intermediate", 0.4), ("advanced", 0.3))
+JLPT_TIERS = (("N5", 0.15), ("N4", 0.2), ("N3", 0.25), ("N2", 0.25), ("N1", 0.15))
+SCHEMES = {"app": APP_TIERS, "jlpt": JLPT_TIERS}
+
+# Bumped whenever features, weights or schemes change, so artifacts tiered by an older version are rebuilt
+CLASSIFIER_VERSION = 1
+
+# Contribution of each normalized feature (all in [0, 1]) to the difficulty score
+DEFAULT_WEIGHTS = {"length": 0.35, "kanji_ratio": 0.2, "kanji_rarity": 0.35, "clauses": 0.1}
+
+PUNCTUATION = np.array([ord(c) for c in "。、！？!?,.「」『』（）()・…：:；;"], dtype=np.uint32)
+HIRAGANA = (0x3041, 0x309F)
+KATAKANA = (0x30A0, 0x30FF)
+KANJI = (0x3400, 0x9FFF)  # CJK extension A and unified ideographs
+ITERATION_MARK = 0x3005  # 々 repeats the previous kanji
+
+# Normalization scales: a 40-character sentence or 4 punctuation marks count as maximal
+LENGTH_SCALE = 40.0
+CLAUSE_SCALE = 4.0
+
+
+def _between(points: np.ndarray, bounds: Tuple[int, int]) -> np.ndarray:
+    return (points >= bounds[0]) & (points <= bounds[1])
+
+
+def _kanji_counts(points: np.ndarray, is_kanji: np.ndarray) -> np.ndarray:
+    return np.bincount(points[is_kanji].clip(KANJI[0], KANJI[1]) - KANJI[0], minlength=KANJI[1] - KANJI[0] + 1)
+
+
+def kanji_counts(texts: List[str]) -> np.ndarray:
+    """Occurrences of every codepoint in KANJI; counts of corpus parts add up to the corpus counts"""
+    points, _ = codepoints(texts)
+    return _kanji_counts(points, _between(points, KANJI) | (points == ITERATION_MARK))
+
+
+class DifficultyClassifier:
+    """Scores sentences and cuts the scores into tiers at corpus quantiles"""
+
+    def __init__(self, tiers: Sequence[Tuple[str, float]] = APP_TIERS, weights: Dict[str, float] = None):
+        self.names = [name for name, _ in tiers]
+        shares = np.array([share for _, share in tiers], dtype=np.float64)
+        self.cumulative_shares = np.cumsum(shares / shares.sum())[:-1]
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.kanji_ranks = None  # rank of each codepoint in KANJI by corpus frequency, 1 = most common
+        self.known_kanji = 0
+        self.cut_points = None
+
+    def features(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Per-sentence feature columns"""
+        points, starts = codepoints(texts)
+        length = np.diff(starts)
+        is_kanji = _between(points, KANJI) | (points == ITERATION_MARK)
+        kana = segment_sums(_between(points, HIRAGANA) | _between(points, KATAKANA), starts)
+        kanji = segment_sums(is_kanji, starts)
+        punctuation = segment_sums(np.isin(points, PUNCTUATION), starts)
+
+        if self.kanji_ranks is None:
+            self.fit_kanji(_kanji_counts(points, is_kanji))
+        # Rarest kanji per sentence: rank 0 for non-kanji, then a max over each sentence's span
+        ranks = np.zeros(len(points) + 1, dtype=np.int32)
+        kanji_points = points[is_kanji].clip(KANJI[0], KANJI[1]) - KANJI[0]
+        ranks[:-1][is_kanji] = self.kanji_ranks[kanji_points]
+        rarest = np.maximum.reduceat(ranks, np.minimum(starts[:-1], len(points)))
+        rarest[length == 0] = 0
+
+        safe_length = np.maximum(length, 1)
+        return {
+            "length": length,
+            "kana_ratio": kana / safe_length,
+            "kanji_ratio": kanji / safe_length,
+            "punctuation": punctuation,
+            "rarest_kanji_rank": rarest,
+        }
+
+    def fit_kanji(self, counts: np.ndarray) -> "DifficultyClassifier":
+        """Rank kanji by corpus frequency from kanji_counts(), without scanning the corpus again"""
+        order = np.argsort(-counts, kind="stable")
+        self.kanji_ranks = np.empty(len(counts), dtype=np.int32)
+        self.kanji_ranks[order] = np.arange(1, len(counts) + 1, dtype=np.int32)
+        self.kanji_ranks[counts == 0] = np.count_nonzero(counts) + 1  # unseen kanji rank as rarest
+        self.known_kanji = int(np.count_nonzero(counts))
+        return self
+
+    def score(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        """Difficulty in [0, 1] as a weighted sum of normalized features"""
+        rarity = np.log1p(features["rarest_kanji_rank"]) / np.log1p(self.known_kanji + 1)
+        normalized = {
+            "length": np.minimum(features["length"] / LENGTH_SCALE, 1.0),
+            "kanji_ratio": features["kanji_ratio"],
+            "kanji_rarity": np.minimum(rarity, 1.0),
+            # Sentence-final punctuation does not make a sentence harder, the marks between clauses do
+            "clauses": np.minimum(np.maximum(features["punctuation"] - 1, 0) / CLAUSE_SCALE, 1.0),
+        }
+        return sum(weight * normalized[name] for name, weight in self.weights.items())
+
+    def fit(self, texts: List[str]) -> "DifficultyClassifier":
+        """Learn kanji frequency ranks and tier cut points from a corpus"""
+        self._fit_scores(texts)
+        return self
+
+    def _fit_scores(self, texts: List[str]) -> np.ndarray:
+        self.kanji_ranks = None
+        scores = self.score(self.features(texts))
+        self.fit_cut_points(scores)
+        return scores
+
+    def fit_cut_points(self, scores: np.ndarray) -> "DifficultyClassifier":
+        """Place the tier boundaries at quantiles of the scores of the whole corpus"""
+        self.cut_points = np.quantile(scores, self.cumulative_shares) if len(scores) else self.cumulative_shares
+        return self
+
+    def tiers(self, scores: np.ndarray) -> np.ndarray:
+        """Tier index of every score, once the cut points are fitted"""
+        return np.searchsorted(self.cut_points, scores, side="right").astype(np.int8)
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        """Tier index (into self.names) of every text"""
+        if self.cut_points is None:
+            raise ValueError("DifficultyClassifier must be fitted before predict")
+        return self.tiers(self.score(self.features(texts)))
+
+    def fit_predict(self, texts: List[str]) -> np.ndarray:
+        return self.tiers(self._fit_scores(texts))
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """Fitted parameters as arrays, to tier later additions the same way (see set_state)"""
+        return {"kanji_ranks": self.kanji_ranks, "known_kanji": np.int64(self.known_kanji),
+                "cut_points": self.cut_points, "classifier_version": np.int64(CLASSIFIER_VERSION)}
+
+    def set_state(self, state: Dict[str, np.ndarray]) -> "DifficultyClassifier":
+        if int(state["classifier_version"]) != CLASSIFIER_VERSION:
+            raise ValueError("Classifier state was saved by another classifier version")
+        self.kanji_ranks = np.asarray(state["kanji_ranks"])
+        self.known_kanji = int(state["known_kanji"])
+        self.cut_points = np.asarray(state["cut_points"])
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tier corpus sentences by difficulty and report the split")
+    parser.add_argument("--corpus", default=None, help="Pair file, defaults to the newest jp-zh export")
+    parser.add_argument("--scheme", choices=sorted(SCHEMES), default="app")
+    parser.add_argument("--examples", type=int, default=2, help="sentences to show per tier")
+    args = parser.parse_args()
+
+    from modules.corpus_files import find_translation_file, read_translation_pairs
+
+    path = args.corpus or find_translation_file()
+    if path is None:
+        parser.error("No corpus pair file found")
+    start = time.perf_counter()
+    texts = list({jp_id: jp_text for jp_id, jp_text, _, _ in read_translation_pairs(path)}.values())
+    loaded = time.perf_counter()
+    classifier = DifficultyClassifier(SCHEMES[args.scheme])
+    tiers = classifier.fit_predict(texts)
+    tiered = time.perf_counter()
+
+    print(f"{len(texts)} sentences read in {loaded - start:.2f}s, tiered in {tiered - loaded:.2f}s "
+          f"({classifier.known_kanji} distinct kanji)")
+    counts = np.bincount(tiers, minlength=len(classifier.names))
+    for index, name in enumerate(classifier.names):
+        examples = [texts[i] for i in np.flatnonzero(tiers == index)[:args.examples]]
+        print(f"{name:<14}{counts[index]:>9}  {' / '.join(examples)}")
+
+
+if __name__ == "__main__":
+    main()
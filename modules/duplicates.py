@@ -0,0 +1,92 @@
+"""Duplicate sentence detection by canonical form.
+
+Two sentences are duplicates when they are the same once character width
+is folded (NFKC), whitespace is dropped and punctuation other than question
+marks is dropped. "はい。", "はい！" and "は い" are one sentence;
+"トムは死んだ？" and "トムは死んだ。" are not. Matching is exact on that
+form rather than fuzzy, so sentences that differ by a single character are
+kept apart: in Japanese one character is often the whole difference
+(愛しています/愛していません, 起きた/起きる, 日本人ですか/日本人です).
+Every sentence is reduced to a 64-bit hash of its canonical form, and
+sentences sharing a hash form a cluster. The lowest row of a cluster is its
+representative, and corpus builds keep only those.
+
+See what a corpus would collapse, from the repository root:
+
+    python -m modules.duplicates
+"""
+import os
+import hashlib
+import argparse
+import unicodedata
+from typing import List
+
+import numpy as np
+
+from modules.difficulty import PUNCTUATION
+
+# Bumped whenever the canonical form or its hash change, so deduplicated artifacts are rebuilt
+DEDUP_VERSION = 2
+
+# Question marks turn a statement into a question, so they are part of the canonical form
+KEPT_PUNCTUATION = "?？"
+# str.translate table deleting whitespace and the rest of the punctuation, as it reads after NFKC
+IGNORED = dict.fromkeys(ord(c) for c in set(unicodedata.normalize("NFKC", "".join(map(chr, PUNCTUATION.tolist()))))
+                        | set(" \t\n") if c not in KEPT_PUNCTUATION)
+
+
+def canonical(text: str) -> str:
+    """The form two duplicate sentences share"""
+    return unicodedata.normalize("NFKC", text).translate(IGNORED)
+
+
+def canonical_keys(texts: List[str]) -> np.ndarray:
+    """64-bit hash of every text's canonical form"""
+    return np.fromiter((int.from_bytes(hashlib.blake2b(canonical(text).encode("utf-8"), digest_size=8).digest(),
+                                       "little") for text in texts), dtype=np.uint64, count=len(texts))
+
+
+def cluster_keys(keys: np.ndarray) -> np.ndarray:
+    """cluster() for precomputed keys, e.g. stacked from canonical_keys() over parts of a corpus"""
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return first[inverse.ravel()]
+
+
+def cluster(texts: List[str]) -> np.ndarray:
+    """Cluster label of every text: the index of the first text in its duplicate cluster"""
+    return cluster_keys(canonical_keys(texts))
+
+
+def representatives(texts: List[str]) -> np.ndarray:
+    """Indexes of the texts to keep: the first of every duplicate cluster, in order"""
+    labels = cluster(texts)
+    return np.flatnonzero(labels == np.arange(len(texts)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate sentences in the corpus")
+    parser.add_argument("--input", default=None, help="Pair file, defaults to the newest jp-zh export")
+    parser.add_argument("--examples", type=int, default=10, help="clusters to show")
+    args = parser.parse_args()
+
+    import time
+    from modules.corpus_files import find_translation_file, read_translation_pairs
+
+    path = args.input or find_translation_file()
+    if path is None:
+        parser.error("No corpus pair file found")
+    texts = list({jp_id: jp_text for jp_id, jp_text, _, _ in read_translation_pairs(path)}.values())
+    start = time.perf_counter()
+    labels = cluster(texts)
+    elapsed = time.perf_counter() - start
+    kept = int(np.count_nonzero(labels == np.arange(len(texts))))
+    print(f"{os.path.basename(path)}: {len(texts)} sentences, {kept} after collapsing duplicates "
+          f"({len(texts) - kept} dropped) in {elapsed:.2f}s")
+    sizes = np.bincount(labels, minlength=len(texts))
+    for label in np.argsort(-sizes, kind="stable")[:args.examples]:
+        if sizes[label] > 1:
+            print("  " + " | ".join(texts[i] for i in np.flatnonzero(labels == label)[:4]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import os
+import re
+import json
+import logging
+import threading
+from dataclasses import dataclass, asdict
+from typing import List, Optional
+
+# "Japanese:", "1. Japanese:", "**Japanese:**", "- Romaji -" and similar LLM variations
+_FIELD_PATTERN = re.compile(
+    r"^\s*(?:[-*\d.)]+\s*)?\**\s*(japanese|romaji|english)\s*\**\s*[:：-]\s*\**\s*(.*?)\s*$",
+    re.IGNORECASE
+)
+_JAPANESE_PATTERN = re.compile(r"[぀-ヿ一-鿿]")
+_ROMAJI_PATTERN = re.compile(r"^[A-Za-zāīūēōĀĪŪĒŌâîûêô'’ .,!?~\-]+$")
+
+
+@dataclass(frozen=True)
+class ExampleSentence:
+    """A validated example sentence produced for a character and topic"""
+    __slots__ = ("character", "japanese", "romaji", "english", "topic")
+    character: str
+    japanese: str
+    romaji: str
+    english: str
+    topic: str  # normalized interests the sentence was written for, "" for general topics
+
+    def is_valid(self) -> bool:
+        """Check that every field looks like what it claims to be"""
+        return (
+            bool(_JAPANESE_PATTERN.search(self.japanese))
+            and self.character in self.japanese
+            and bool(_ROMAJI_PATTERN.match(self.romaji))
+            and bool(self.english.strip())
+        )
+
+
+def parse_example_sentences(text: str, character: str, topic: str = "") -> List[ExampleSentence]:
+    """Parse a "Japanese:/Romaji:/English:" response into validated records"""
+    records = []
+    current = {}
+    for line in str(text).splitlines():
+        match = _FIELD_PATTERN.match(line)
+        if not match:
+            continue
+        field, value = match.group(1).lower(), match.group(2).strip("*[] ")
+        if field == "japanese" and current:
+            current = {}
+        current[field] = value
+        if len(current) == 3:
+            record = ExampleSentence(character, current["japanese"], current["romaji"], current["english"], topic)
+            if record.is_valid():
+                records.append(record)
+            else:
+                logging.warning(f"Discarding invalid example sentence: {record}")
+            current = {}
+    return records
+
+
+def format_example_sentences(records: List[ExampleSentence]) -> str:
+    """Format records back into the plain text layout used by the prompt"""
+    return "\n\n".join(
+        f"Japanese: {r.japanese}\nRomaji: {r.romaji}\nEnglish: {r.english}" for r in records
+    )
+
+
+class ExampleStore:
+    """Deduplicated example sentences indexed by character and topic, optionally persisted to JSON"""
+
+    def __init__(self, path: Optional[str] = None):
+        """Initialize the store, loading previously generated examples from path"""
+        self.path = path
+        self.by_character = {}  # character -> list of records, across topics
+        self.seen = set()  # (topic, normalized Japanese text), used for deduplication
+        self._lock = threading.Lock()
+
+        if self.path and os.path.exists(self.path):
+            self.load()
+
+    @staticmethod
+    def _normalize(japanese: str) -> str:
+        return re.sub(r"[\s。、．，！？!?.,]", "", japanese)
+
+    def add(self, records: List[ExampleSentence], persist: bool = True) -> int:
+        """Add records, skipping duplicates; returns the number added"""
+        added = 0
+        with self._lock:
+            for record in records:
+                key = (record.topic, self._normalize(record.japanese))
+                if key in self.seen:
+                    continue
+                self.seen.add(key)
+                self.by_character.setdefault(record.character, []).append(record)
+                added += 1
+        if added and persist and self.path:
+            self.save()
+        return added
+
+    def get(self, character: str, topic: str = "") -> List[ExampleSentence]:
+        """Get the stored examples for a character written for a topic"""
+        return [record for record in self.by_character.get(character, []) if record.topic == topic]
+
+    def all(self) -> List[ExampleSentence]:
+        """Get every stored example"""
+        return [record for records in self.by_character.values() for record in records]
+
+    def __len__(self) -> int:
+        return len(self.seen)
+
+    def save(self) -> None:
+        """Save the store to its JSON file"""
+        try:
+            with self._lock:
+                data = [asdict(record) for record in self.all()]
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"Error saving example sentences: {e}")
+
+    def load(self) -> None:
+        """Load the store from its JSON file"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Files written before topics were recorded hold general examples
+            records = [ExampleSentence(**{"topic": "", **item}) for item in data]
+            self.add([record for record in records if record.is_valid()], persist=False)
+        except Exception as e:
+            print(f"Error loading example sentences: {e}")
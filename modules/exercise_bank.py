@@ -0,0 +1,266 @@
+"""Pre-generated exercises served by random access into a memory-mapped file.
+
+A batch run calls the practice manager's generators many times per
+(practice type, difficulty) partition and keeps the distinct exercises.
+Each one is stored as a length-prefixed JSON record. Next to the records
+the file holds an offset index and a 64-bit content fingerprint per record,
+8-byte aligned after a small JSON table of contents (the layout of
+modules/shared_corpus.py segments). Partitions are contiguous index ranges.
+Serving an exercise is one index, one slice of the mapping and one JSON
+decode. A caller that tracks learners walks each of them through a
+partition in their own order (see ExerciseBank.draw), so nothing repeats
+until the learner has seen the whole partition, for the cost of a random
+sample. Fingerprints let callers also exclude exercises a learner has just
+seen, e.g. across the start of a new pass, without decoding anything.
+
+Exercises are stored without audio and with their options in a fixed
+order; the practice manager renders the clips and shuffles the options when
+it serves one. A bank keeps the content it was built from, so rebuild it
+after the corpus or the generators change. Build one from the repository
+root, then point the app at it with TONEMASTER_EXERCISE_BANK:
+
+    python -m modules.exercise_bank --output exercises.bank --per-partition 2000
+"""
+import os
+import json
+import mmap
+import time
+import random
+import struct
+import hashlib
+import argparse
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+BANK_MAGIC = b"TMEB"
+BANK_VERSION = 3
+BANK_HEADER = struct.Struct("<4sHI")  # magic, version, table-of-contents length
+RECORD_HEADER = struct.Struct("<I")  # length of the JSON record that follows
+ALIGNMENT = 8
+
+# Generated per call from arguments or session state, so they are never banked
+LIVE_PRACTICE_TYPES = {
+    "kana_recognition",  # the caller picks the syllabary
+    "listening_comprehension",  # built from the AI examples of the running session
+}
+
+# Fields holding text whose pronunciation clip is rendered when the exercise is served
+AUDIO_FIELDS = ("audio_word", "audio_sentence", "reference_audio")
+
+# Random draws before a mostly excluded partition is filtered as a whole
+SAMPLE_ATTEMPTS = 8
+
+_banks = {}  # path -> ExerciseBank over the mapping, one mapping per process
+_banks_lock = threading.Lock()
+
+
+def partition_key(practice_type: str, difficulty: str) -> str:
+    return f"{difficulty}:{practice_type}"
+
+
+def fingerprint(exercise: Dict[str, Any]) -> int:
+    """Stable 64-bit id of an exercise's content; the order of its options does not count"""
+    content = dict(exercise)
+    content.pop("fingerprint", None)
+    if isinstance(content.get("options"), list):
+        content["options"] = sorted(map(str, content["options"]))
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), "little")
+
+
+def _mix(value: int) -> int:
+    """splitmix64 finalizer: a cheap, well-spread 64-bit hash of an int"""
+    value = (value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def write_bank(path: str, partitions: Dict[str, List[Dict[str, Any]]]) -> int:
+    """Write partitions of exercises as a bank, atomically replacing any file at path; returns the record count"""
+    records, fingerprints, ranges = [], [], {}
+    for key, exercises in partitions.items():
+        low = len(records)
+        for exercise in exercises:
+            encoded = json.dumps(exercise, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            records.append(RECORD_HEADER.pack(len(encoded)) + encoded)
+            fingerprints.append(fingerprint(exercise))
+        ranges[key] = [low, len(records)]
+    lengths = np.fromiter(map(len, records), dtype=np.uint64, count=len(records))
+    offsets = np.zeros(len(records), dtype=np.uint64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    columns = {"offsets": offsets, "fingerprints": np.array(fingerprints, dtype=np.uint64),
+               "records": np.frombuffer(b"".join(records), dtype=np.uint8)}
+
+    toc, position = {"partitions": ranges, "columns": {}}, 0
+    for name, column in columns.items():
+        toc["columns"][name] = [column.dtype.str, position, len(column)]
+        position += _aligned(column.nbytes)
+    toc_bytes = json.dumps(toc).encode("utf-8")
+    data_start = _aligned(BANK_HEADER.size + len(toc_bytes))
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(BANK_HEADER.pack(BANK_MAGIC, BANK_VERSION, len(toc_bytes)) + toc_bytes)
+        for name, column in columns.items():
+            f.seek(data_start + toc["columns"][name][1])
+            f.write(column.tobytes())
+        f.truncate(data_start + position)
+    os.replace(temp_path, path)
+    return len(records)
+
+
+class ExerciseBank:
+    """Read-only view of a bank file; every column is a zero-copy view into the mapping"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, toc_length = BANK_HEADER.unpack_from(self._mapping)
+        if magic != BANK_MAGIC or version != BANK_VERSION:
+            raise ValueError(f"Not an exercise bank: {path}")
+        toc = json.loads(self._mapping[BANK_HEADER.size:BANK_HEADER.size + toc_length])
+        data_start = _aligned(BANK_HEADER.size + toc_length)
+        columns = {name: np.frombuffer(self._mapping, dtype=dtype, count=count, offset=data_start + offset)
+                   for name, (dtype, offset, count) in toc["columns"].items()}
+        # Plain ints for the per-request path, where NumPy scalar indexing would dominate
+        self._offsets = memoryview(columns["offsets"]).cast("B").cast("Q")
+        self.fingerprints = columns["fingerprints"]
+        self._fingerprints = memoryview(self.fingerprints).cast("B").cast("Q")
+        self._records_start = data_start + toc["columns"]["records"][1]
+        self.partitions = {key: range(low, high) for key, (low, high) in toc["partitions"].items()}
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def count(self, practice_type: str, difficulty: str) -> int:
+        return len(self.partitions.get(partition_key(practice_type, difficulty), ()))
+
+    def record(self, index: int) -> Dict[str, Any]:
+        start = self._records_start + self._offsets[index]
+        (length,) = RECORD_HEADER.unpack_from(self._mapping, start)
+        start += RECORD_HEADER.size
+        return json.loads(self._mapping[start:start + length])
+
+    def _served(self, index: int) -> Dict[str, Any]:
+        exercise = self.record(index)
+        exercise["fingerprint"] = self._fingerprints[index]
+        return exercise
+
+    def sample(self, practice_type: str, difficulty: str, exclude: Set[int] = None,
+               rng: random.Random = random) -> Optional[Dict[str, Any]]:
+        """A random exercise of the partition whose fingerprint is not in exclude, or None
+
+        The exercise carries its fingerprint, for the caller's next exclude set.
+        """
+        rows = self.partitions.get(partition_key(practice_type, difficulty))
+        if not rows:
+            return None
+        for _ in range(SAMPLE_ATTEMPTS):
+            index = rows.start + rng.randrange(len(rows))
+            if not exclude or self._fingerprints[index] not in exclude:
+                return self._served(index)
+        # Most of the partition is excluded: draw among what is left
+        excluded = np.fromiter(exclude, dtype=np.uint64, count=len(exclude))
+        allowed = np.flatnonzero(~np.isin(self.fingerprints[rows.start:rows.stop], excluded))
+        if not len(allowed):
+            return None
+        return self._served(rows.start + int(allowed[rng.randrange(len(allowed))]))
+
+    def draw(self, practice_type: str, difficulty: str, seed: int, position: int,
+             exclude: Set[int] = None) -> Tuple[Optional[Dict[str, Any]], int]:
+        """(exercise, next position) for position in the order seed gives the partition
+
+        Each pass of n positions maps position to (position * step + offset) mod n, step coprime
+        to n, which is a permutation of the partition; step and offset come from the seed and the
+        pass number. A learner who keeps a seed and counts positions sees every exercise of the
+        partition once before any repeats. Positions whose fingerprint is in exclude are skipped,
+        at most one pass of them; the exercise is None when the partition is empty.
+        """
+        rows = self.partitions.get(partition_key(practice_type, difficulty))
+        if not rows:
+            return None, position
+        size = len(rows)
+        for _ in range(size):
+            cycle, rank = divmod(position, size)
+            mixed = _mix(_mix(seed) + cycle)
+            step = 1 + (mixed >> 32) % max(size - 1, 1)
+            while math.gcd(step, size) != 1:
+                step += 1
+            index = rows.start + (rank * step + mixed) % size
+            position += 1
+            if not exclude or self._fingerprints[index] not in exclude:
+                break
+        return self._served(index), position
+
+
+def attach(path: str) -> ExerciseBank:
+    with _banks_lock:
+        bank = _banks.get(path)
+        if bank is None:
+            bank = _banks[path] = ExerciseBank(path)
+        return bank
+
+
+def generate_partitions(practice_manager, syllabary, per_partition: int,
+                        practice_types: Iterable[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Up to per_partition distinct exercises for every banked (practice type, difficulty)
+
+    Only practice types with a generator are banked; the others would bank the fallback
+    exercise of generate_exercise. A generator with a small pool stops early, once many
+    draws in a row bring nothing new.
+    """
+    kana_tables = {"hiragana": syllabary.hiragana, "katakana": syllabary.katakana}
+    partitions = {}
+    for difficulty, types in practice_manager.practice_types.items():
+        for practice_type in types:
+            if (practice_type in LIVE_PRACTICE_TYPES or practice_type not in practice_manager.GENERATED_PRACTICE_TYPES
+                    or (practice_types and practice_type not in practice_types)):
+                continue
+            exercises, seen, misses = [], set(), 0
+            while len(exercises) < per_partition and misses < max(100, per_partition // 10):
+                exercise = practice_manager.generate_exercise(
+                    practice_type, difficulty, kana_tables if practice_type == "kana_matching" else None)
+                key = fingerprint(exercise)
+                if key in seen:
+                    misses += 1
+                    continue
+                seen.add(key)
+                misses = 0
+                exercises.append(exercise)
+            partitions[partition_key(practice_type, difficulty)] = exercises
+    return partitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate exercises into a memory-mapped bank")
+    parser.add_argument("--output", default="exercises.bank")
+    parser.add_argument("--per-partition", type=int, default=2000, help="exercises per practice type and difficulty")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from modules.practice_manager import PracticeManager
+    from modules.syllabary import JapaneseSyllabary
+
+    random.seed(args.seed)
+    start = time.perf_counter()
+    # No audio cache and no bank: exercises keep the text behind their clips and come from the generators
+    practice_manager = PracticeManager()
+    practice_manager.exercise_bank = None
+    partitions = generate_partitions(practice_manager, JapaneseSyllabary(), args.per_partition)
+    count = write_bank(args.output, partitions)
+    print(f"Wrote {count} exercises in {len(partitions)} partitions to {args.output} "
+          f"({os.path.getsize(args.output) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+    for key, exercises in partitions.items():
+        print(f"  {key:<40}{len(exercises):>7}")
+
+
+if __name__ == "__main__":
+    main()
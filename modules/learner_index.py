@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import zlib
+import logging
+import threading
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+import numpy as np
+import faiss
+
+from modules.semantic_cache import normalize_interests
+
+# Kana bit positions come from code points, so they stay stable when kana tables grow
+HIRAGANA_RANGE = (0x3041, 0x3096)
+KATAKANA_RANGE = (0x30A1, 0x30FA)
+KANA_BITS = (HIRAGANA_RANGE[1] - HIRAGANA_RANGE[0] + 1) + (KATAKANA_RANGE[1] - KATAKANA_RANGE[0] + 1)
+
+INTEREST_DIMENSIONS = 64
+PRACTICE_DIMENSIONS = 32
+
+# Relative weight of each part of the profile vector
+INTEREST_WEIGHT = 0.6
+MASTERY_WEIGHT = 0.25
+PRACTICE_WEIGHT = 0.15
+
+# Rebuild the graph once stale vectors outnumber this share of it
+COMPACT_STALE_FRACTION = 0.25
+# Seconds between scheduled saves of a changed index
+SAVE_INTERVAL = 60.0
+
+
+def _stable_hash(text: str) -> int:
+    # Python's hash() is salted per process, which would break persisted vectors
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def kana_bit(character: str) -> Optional[int]:
+    """Get the bit position of a kana character in the mastery bitset"""
+    code = ord(character[0])
+    if HIRAGANA_RANGE[0] <= code <= HIRAGANA_RANGE[1]:
+        return code - HIRAGANA_RANGE[0]
+    if KATAKANA_RANGE[0] <= code <= KATAKANA_RANGE[1]:
+        return (HIRAGANA_RANGE[1] - HIRAGANA_RANGE[0] + 1) + code - KATAKANA_RANGE[0]
+    return None
+
+
+def mastery_bitset(progress_data: Dict[str, Any]) -> np.ndarray:
+    """Pack the mastered kana of a learner into a bitset"""
+    bits = np.zeros(KANA_BITS, dtype=np.uint8)
+    for syllabary_type in ("hiragana", "katakana"):
+        for character in progress_data.get(syllabary_type, {}).get("mastered", []):
+            bit = kana_bit(character)
+            if bit is not None:
+                bits[bit] = 1
+    return np.packbits(bits)
+
+
+def practice_accuracies(progress_data: Dict[str, Any]) -> Dict[str, float]:
+    """Get accuracy per (difficulty, practice type) from progress data"""
+    accuracies = {}
+    for difficulty, types in progress_data.get("practice_stats", {}).items():
+        for practice_type, stats in types.items():
+            if stats.get("attempts", 0) > 0:
+                accuracies[f"{difficulty}:{practice_type}"] = stats["correct"] / stats["attempts"]
+    return accuracies
+
+
+class LearnerIndex:
+    """Persisted learner profiles with an HNSW index for "find similar learners" queries"""
+
+    def __init__(self, directory: str = "learner_profiles",
+                 embed_fn: Callable[[str], List[float]] = None, hnsw_neighbors: int = 32):
+        """Initialize the index, loading saved profiles from directory if present
+
+        embed_fn can map the normalized interest text to a semantic embedding; by
+        default interests are hashed into a bag-of-words vector, which needs no API.
+        """
+        self.directory = directory
+        self.embed_fn = embed_fn
+        self.hnsw_neighbors = hnsw_neighbors
+        self.dimension = None
+        self.index = None
+        self.profiles = {}  # user id -> profile dict (interests, bitset, accuracies, vector id)
+        self.vector_owner = {}  # vector id -> user id, stale ids are dropped from this map
+        self.next_vector_id = 0
+        self.compactions = 0
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._compacted_since_save = False
+        self._lock = threading.Lock()
+
+        if os.path.exists(self._profiles_path()):
+            self.load()
+
+    def _profiles_path(self) -> str:
+        return os.path.join(self.directory, "profiles.json")
+
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "profiles.faiss")
+
+    def _interest_vector(self, interest_key: str) -> np.ndarray:
+        if self.embed_fn is not None:
+            vector = np.asarray(self.embed_fn(interest_key), dtype=np.float32)
+        else:
+            vector = np.zeros(INTEREST_DIMENSIONS, dtype=np.float32)
+            for term in interest_key.split(", "):
+                for word in term.split():
+                    vector[_stable_hash(word) % INTEREST_DIMENSIONS] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def profile_vector(self, interest_key: str, bitset: np.ndarray, accuracies: Dict[str, float]) -> np.ndarray:
+        """Combine interests, kana mastery and practice accuracy into one unit vector"""
+        mastery = np.unpackbits(bitset)[:KANA_BITS].astype(np.float32)
+        mastery_norm = np.linalg.norm(mastery)
+        if mastery_norm > 0:
+            mastery /= mastery_norm
+
+        practice = np.zeros(PRACTICE_DIMENSIONS, dtype=np.float32)
+        for key, accuracy in accuracies.items():
+            practice[_stable_hash(key) % PRACTICE_DIMENSIONS] += accuracy
+        practice_norm = np.linalg.norm(practice)
+        if practice_norm > 0:
+            practice /= practice_norm
+
+        vector = np.concatenate([
+            self._interest_vector(interest_key) * INTEREST_WEIGHT,
+            mastery * MASTERY_WEIGHT,
+            practice * PRACTICE_WEIGHT
+        ]).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _ensure_index(self, dimension: int) -> None:
+        if self.index is None:
+            self.dimension = dimension
+            hnsw = faiss.IndexHNSWFlat(dimension, self.hnsw_neighbors, faiss.METRIC_INNER_PRODUCT)
+            self.index = faiss.IndexIDMap2(hnsw)
+
+    def upsert(self, user_id: str, interests: List[str], progress_data: Dict[str, Any] = None) -> bool:
+        """Insert or refresh a learner profile; returns False when it has not changed
+
+        HNSW graphs cannot delete, so an update inserts a fresh vector and the
+        old one becomes stale. Searches skip stale ids, and the graph is rebuilt
+        once stale vectors pass COMPACT_STALE_FRACTION of it.
+        """
+        progress_data = progress_data or {}
+        interest_key = normalize_interests(interests)
+        bitset = mastery_bitset(progress_data)
+        accuracies = practice_accuracies(progress_data)
+        old = self.profiles.get(user_id)
+        if (old is not None and self.index is not None and old["interests"] == interest_key
+                and old["mastered_bitset"] == bitset.tobytes().hex() and old["accuracies"] == accuracies):
+            return False
+        vector = self.profile_vector(interest_key, bitset, accuracies)
+
+        with self._lock:
+            self._ensure_index(len(vector))
+            old = self.profiles.get(user_id)
+            if old is not None:
+                self.vector_owner.pop(old["vector_id"], None)
+
+            vector_id = self.next_vector_id
+            self.next_vector_id += 1
+            self.index.add_with_ids(vector.reshape(1, -1), np.array([vector_id], dtype=np.int64))
+            self.vector_owner[vector_id] = user_id
+            self.profiles[user_id] = {
+                "interests": interest_key,
+                "mastered_bitset": bitset.tobytes().hex(),
+                "accuracies": accuracies,
+                "vector_id": vector_id
+            }
+            self._dirty = True
+            if self.index.ntotal - len(self.vector_owner) > COMPACT_STALE_FRACTION * self.index.ntotal:
+                self._compact()
+        return True
+
+    def find_similar(self, user_id: str, k: int = 10, ef_search: int = 64) -> List[Tuple[str, float]]:
+        """Find the k learners most similar to a known learner"""
+        with self._lock:
+            profile = self.profiles.get(user_id)
+            if profile is None or self.index is None:
+                return []
+            vector = self.index.reconstruct(profile["vector_id"]).reshape(1, -1)
+            return [match for match in self._search(vector, k + 1, ef_search) if match[0] != user_id][:k]
+
+    def search(self, vector: np.ndarray, k: int = 10, ef_search: int = 64) -> List[Tuple[str, float]]:
+        """Find the k learners nearest to a profile vector"""
+        with self._lock:
+            return self._search(vector, k, ef_search)
+
+    def _search(self, vector: np.ndarray, k: int, ef_search: int) -> List[Tuple[str, float]]:
+        if self.index is None or self.index.ntotal == 0:
+            return []
+        faiss.downcast_index(self.index.index).hnsw.efSearch = max(ef_search, k)
+
+        # Over-fetch to make up for stale vectors left behind by updates
+        stale = self.index.ntotal - len(self.vector_owner)
+        scores, ids = self.index.search(np.asarray(vector, dtype=np.float32).reshape(1, -1), k + stale)
+        results = []
+        for score, vector_id in zip(scores[0], ids[0]):
+            owner = self.vector_owner.get(int(vector_id))
+            if owner is not None:
+                results.append((owner, float(score)))
+        return results[:k]
+
+    def shared_interests(self, user_id: str, other_id: str) -> List[str]:
+        """Get the interests two learners have in common"""
+        mine = set(self.profiles.get(user_id, {}).get("interests", "").split(", "))
+        theirs = set(self.profiles.get(other_id, {}).get("interests", "").split(", "))
+        return sorted((mine & theirs) - {""})
+
+    def compact(self) -> None:
+        """Rebuild the graph from live profiles, dropping stale vectors"""
+        with self._lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        if self.index is None:
+            return
+        live = sorted(self.vector_owner)
+        vectors = np.vstack([self.index.reconstruct(vector_id) for vector_id in live]) if live else None
+        self.index = None
+        self._ensure_index(self.dimension)
+        if vectors is not None:
+            self.index.add_with_ids(vectors, np.asarray(live, dtype=np.int64))
+        self.compactions += 1
+        self._compacted_since_save = True
+
+    def save(self) -> None:
+        """Save profiles and the HNSW graph to the store directory"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            # Write then rename, so a crash mid-save leaves the previous files whole
+            with open(self._profiles_path() + ".tmp", "w") as f:
+                json.dump({"next_vector_id": self.next_vector_id, "profiles": self.profiles}, f)
+            if self.index is not None:
+                faiss.write_index(self.index, self._index_path() + ".tmp")
+                os.replace(self._index_path() + ".tmp", self._index_path())
+            os.replace(self._profiles_path() + ".tmp", self._profiles_path())
+            self._dirty = False
+            self._compacted_since_save = False
+            self._saved_at = time.monotonic()
+
+    def save_if_due(self, interval: float = SAVE_INTERVAL) -> bool:
+        """Save unsaved changes after a compaction or once interval seconds have passed since the last save"""
+        if not self._dirty or not (self._compacted_since_save or time.monotonic() - self._saved_at >= interval):
+            return False
+        self.save()
+        return True
+
+    def flush(self) -> None:
+        """Save any unsaved changes now"""
+        if self._dirty:
+            self.save()
+
+    def load(self) -> None:
+        """Load profiles and the HNSW graph from the store directory
+
+        Vectors are rebuilt from the saved profiles when the graph file is missing or
+        does not hold every profile's vector.
+        """
+        try:
+            with open(self._profiles_path(), "r") as f:
+                data = json.load(f)
+            self.profiles = data["profiles"]
+            self.next_vector_id = data["next_vector_id"]
+            self.vector_owner = {p["vector_id"]: user_id for user_id, p in self.profiles.items()}
+            self.index = None
+            if os.path.exists(self._index_path()):
+                self.index = faiss.read_index(self._index_path())
+                self.dimension = self.index.d
+                saved_ids = set(faiss.vector_to_array(self.index.id_map).tolist())
+                if not saved_ids.issuperset(self.vector_owner):
+                    self.index = None
+            if self.index is None and self.profiles:
+                self._rebuild_vectors()
+        except Exception as e:
+            logging.error(f"Error loading learner profiles: {e}")
+
+    def _rebuild_vectors(self) -> None:
+        live = sorted(self.vector_owner)
+        vectors = np.vstack([
+            self.profile_vector(profile["interests"], np.frombuffer(bytes.fromhex(profile["mastered_bitset"]), np.uint8),
+                                profile["accuracies"])
+            for profile in (self.profiles[self.vector_owner[vector_id]] for vector_id in live)
+        ])
+        self.index = None
+        self._ensure_index(vectors.shape[1])
+        self.index.add_with_ids(vectors, np.asarray(live, dtype=np.int64))
+        self._dirty = True
+        logging.warning(f"Rebuilt {len(live)} learner vectors from saved profiles")
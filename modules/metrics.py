@@ -0,0 +1,262 @@
+"""Latency histograms, counters and an optional trace log for the app's services.
+
+Metrics are off unless TONEMASTER_METRICS=1 is set before the instrumented
+modules are imported. While off, @timed returns the function unchanged and
+span() hands back a shared no-op context, so instrumented code runs as if
+the instrumentation was not there.
+
+When on, everything is exposed in the Prometheus text format: the API server
+serves it at /metrics, and the Streamlit app starts a small HTTP exporter on
+TONEMASTER_METRICS_PORT (default 9464). Setting TONEMASTER_TRACE_LOG to a
+path also appends every span to that file as one JSON object per line.
+"""
+import os
+import json
+import time
+import bisect
+import logging
+import functools
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Seconds; covers in-memory generators (microseconds) up to slow LLM calls
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "tonemaster_"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus expects it"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Histograms and counters keyed by metric name and label set"""
+
+    def __init__(self, enabled: bool = False, trace_path: Optional[str] = None):
+        self.enabled = enabled
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.counters = {}  # (name, labels) -> float
+        self._lock = threading.Lock()
+        self._trace_file = None
+        if enabled and trace_path:
+            self._trace_file = open(trace_path, "a", encoding="utf-8", buffering=1)
+
+    def histogram(self, name: str, labels: Dict[str, str] = None) -> Histogram:
+        """Get (creating if needed) the histogram for a name and label set"""
+        key = (name, tuple(sorted((labels or {}).items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name: str, seconds: float, labels: Dict[str, str] = None) -> None:
+        """Record one duration in a histogram"""
+        histogram = self.histogram(name, labels)
+        with self._lock:
+            histogram.observe(seconds)
+
+    def increment(self, name: str, value: float = 1, labels: Dict[str, str] = None) -> None:
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @property
+    def tracing(self) -> bool:
+        return self._trace_file is not None
+
+    def trace(self, name: str, seconds: float, labels: Dict[str, str]) -> None:
+        """Append a finished span to the trace log"""
+        if self._trace_file is None:
+            return
+        record = {"name": name, "start": round(time.time() - seconds, 6), "duration_ms": round(seconds * 1000, 3),
+                  "thread": threading.current_thread().name, **labels}
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._trace_file.write(line + "\n")
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = {key: (h.buckets, list(h.counts), h.sum, h.count) for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{METRIC_PREFIX}{name}{_labels(labels)} {value:g}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {METRIC_PREFIX}{name}_seconds histogram")
+            for (metric, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                running = 0
+                for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                    running += bucket_count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{METRIC_PREFIX}{name}_seconds_bucket{_labels(labels + (('le', le),))} {running}")
+                lines.append(f"{METRIC_PREFIX}{name}_seconds_sum{_labels(labels)} {total:.6f}")
+                lines.append(f"{METRIC_PREFIX}{name}_seconds_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Span:
+    """Times a block and records it in a histogram (and the trace log) when it ends"""
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry: MetricsRegistry, name: str, labels: Dict[str, str]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = time.perf_counter()
+
+    def finish(self) -> float:
+        seconds = time.perf_counter() - self.start
+        self.registry.observe(self.name, seconds, self.labels)
+        self.registry.trace(self.name, seconds, self.labels)
+        return seconds
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.finish()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def finish(self) -> float:
+        return 0.0
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+registry = MetricsRegistry(os.getenv("TONEMASTER_METRICS", "0") == "1", os.getenv("TONEMASTER_TRACE_LOG"))
+
+
+def enabled() -> bool:
+    return registry.enabled
+
+
+def span(name: str, **labels: Any):
+    """Context manager timing a block into the histogram `name`; also start_span(...).finish()"""
+    if not registry.enabled:
+        return _NOOP_SPAN
+    return Span(registry, name, labels)
+
+
+start_span = span
+
+
+def timed(name: str, **labels: Any) -> Callable[[Callable], Callable]:
+    """Decorator timing every call into the histogram `name`, labelled with the function name
+
+    Metrics must be enabled when the decorated module is imported; otherwise
+    the function is returned as is.
+    """
+    def decorate(func: Callable) -> Callable:
+        if not registry.enabled:
+            return func
+        function_labels = dict(labels, function=func.__name__)
+        # Resolved once here, so a call only pays for two clock reads and a lock
+        histogram = registry.histogram(name, function_labels)
+        lock = registry._lock
+        clock = time.perf_counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds = clock() - start
+                with lock:
+                    histogram.observe(seconds)
+                if registry.tracing:
+                    registry.trace(name, seconds, function_labels)
+        return wrapper
+    return decorate
+
+
+def increment(name: str, value: float = 1, **labels: Any) -> None:
+    """Add to the counter `name`"""
+    registry.increment(name, value, labels)
+
+
+def render() -> str:
+    """Current metrics in the Prometheus text format"""
+    return registry.render()
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def start_http_exporter(port: int = None, host: str = "127.0.0.1") -> Optional[int]:
+    """Serve /metrics from a daemon thread; does nothing when metrics are off or it already runs
+
+    Returns the port being served, or None.
+    """
+    global _exporter
+    if not registry.enabled:
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    found = self.path.split("?")[0] == "/metrics"
+                    body = render().encode("utf-8") if found else b"Not found\n"
+                    self.send_response(200 if found else 404)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            port = port if port is not None else int(os.getenv("TONEMASTER_METRICS_PORT", "9464"))
+            try:
+                _exporter = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError as e:
+                logging.warning(f"Could not start the metrics exporter on port {port}: {e}")
+                return None
+            threading.Thread(target=_exporter.serve_forever, name="metrics-exporter", daemon=True).start()
+        return _exporter.server_address[1]
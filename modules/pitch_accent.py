@@ -0,0 +1,294 @@
+"""Pitch-accent analysis for speech practice.
+
+F0 contours come from a YIN estimator that runs on all frames at once with
+FFT autocorrelation. The learner's contour is aligned to the reference with
+DTW, which fills one anti-diagonal at a time and can align a batch of pairs
+together. Each reference mora then gets a score from the aligned pitch.
+"""
+import io
+import wave
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass
+
+import numpy as np
+
+# Small kana attach to the mora before them; everything else in kana starts a new one
+SMALL_KANA = set("ゃゅょぁぃぅぇぉゎャュョァィゥェォヮ")
+NON_MORA = set("。、！？!?,.「」『』（）() 　・…")
+
+YIN_BLOCK_FRAMES = 256
+
+# Frames below this level are silence however quiet the whole recording is
+SILENCE_FLOOR_DB = -60.0
+
+
+def read_wav(source: Union[str, bytes, io.IOBase]) -> Tuple[np.ndarray, int]:
+    """Read PCM WAV from a path, bytes or file object as mono float32 in [-1, 1]"""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with wave.open(source, "rb") as f:
+        sample_rate = f.getframerate()
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        raw = f.readframes(f.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def split_morae(text: str) -> List[str]:
+    """Split kana into morae; other characters (e.g. kanji) count as one unit each"""
+    morae = []
+    for char in text:
+        if char in NON_MORA:
+            continue
+        if char in SMALL_KANA and morae:
+            morae[-1] += char
+        else:
+            morae.append(char)
+    return morae
+
+
+@dataclass(frozen=True)
+class PitchContour:
+    """F0 track of one recording; f0 is NaN where the frame is unvoiced"""
+    __slots__ = ("times", "f0", "voiced")
+
+    times: np.ndarray
+    f0: np.ndarray
+    voiced: np.ndarray
+
+    @property
+    def semitones(self) -> np.ndarray:
+        """Pitch in semitones relative to the speaker's median, so voices can be compared"""
+        if not self.voiced.any():
+            return np.full(len(self.f0), np.nan)
+        return 12 * np.log2(self.f0 / np.median(self.f0[self.voiced]))
+
+
+@dataclass(frozen=True)
+class MoraScore:
+    """Pitch match of the learner on one mora of the reference"""
+    __slots__ = ("mora", "score", "reference", "learner")
+
+    mora: str
+    score: Optional[float]  # 0-100, None when either side is unvoiced throughout
+    reference: float  # mean pitch in semitones
+    learner: float
+
+
+class PitchAccentAnalyzer:
+    """F0 extraction, DTW alignment and per-mora pitch-accent scoring"""
+
+    def __init__(self, fmin: float = 70.0, fmax: float = 400.0, hop_seconds: float = 0.01,
+                 threshold: float = 0.15, silence_db: float = -40.0, tolerance: float = 3.0):
+        """Initialize the analyzer
+
+        threshold is the YIN dip threshold; frames quieter than silence_db below
+        the loudest frame are unvoiced. tolerance is the pitch difference in
+        semitones at which a mora scores zero.
+        """
+        self.fmin = fmin
+        self.fmax = fmax
+        self.hop_seconds = hop_seconds
+        self.threshold = threshold
+        self.silence_db = silence_db
+        self.tolerance = tolerance
+
+    def _frame(self, samples: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, int, int]:
+        max_lag = int(np.ceil(sample_rate / self.fmin))
+        frame_length = 2 * max_lag
+        hop = max(1, int(round(self.hop_seconds * sample_rate)))
+        padded = np.pad(np.asarray(samples, dtype=np.float32), (max_lag, frame_length))
+        frames = np.lib.stride_tricks.sliding_window_view(padded, frame_length)[::hop]
+        count = int(np.ceil(len(samples) / hop))
+        return frames[:count], max_lag, hop
+
+    def _yin(self, frames: np.ndarray, sample_rate: int, max_lag: int) -> np.ndarray:
+        """Run YIN on a (frames, frame_length) matrix, returning F0 with NaN where there is no dip"""
+        frame_length = frames.shape[1]
+        window = frame_length - max_lag
+        min_lag = max(2, int(sample_rate / self.fmax))
+
+        # Difference function d(tau) = e(0) + e(tau) - 2 r(tau) over a fixed window
+        size = 1 << int(np.ceil(np.log2(2 * frame_length)))
+        spectrum = np.fft.rfft(frames, size, axis=1)
+        head = np.fft.rfft(frames[:, :window], size, axis=1)
+        correlation = np.fft.irfft(spectrum * np.conj(head), size, axis=1)[:, :max_lag + 1]
+        energy = np.concatenate([np.zeros((len(frames), 1), np.float32),
+                                 np.cumsum(frames.astype(np.float64) ** 2, axis=1)], axis=1)
+        lags = np.arange(max_lag + 1)
+        shifted_energy = energy[:, lags + window] - energy[:, lags]
+        difference = np.maximum(energy[:, [window]] + shifted_energy - 2 * correlation, 0)
+
+        # Cumulative mean normalized difference
+        cumulative = np.cumsum(difference[:, 1:], axis=1)
+        cmnd = np.ones_like(difference)
+        cmnd[:, 1:] = difference[:, 1:] * lags[1:] / np.maximum(cumulative, 1e-12)
+
+        # First dip under the threshold that is also a local minimum
+        search = cmnd[:, min_lag:max_lag]
+        dips = (search < self.threshold) & (search <= cmnd[:, min_lag + 1:max_lag + 1])
+        has_dip = dips.any(axis=1)
+        lag = np.argmax(dips, axis=1) + min_lag
+
+        # Parabolic interpolation around the chosen lag
+        rows = np.arange(len(frames))
+        left, center, right = cmnd[rows, lag - 1], cmnd[rows, lag], cmnd[rows, np.minimum(lag + 1, max_lag)]
+        curvature = left - 2 * center + right
+        offset = np.where(np.abs(curvature) > 1e-12, 0.5 * (left - right) / np.where(curvature == 0, 1, curvature), 0)
+        refined = lag + np.clip(offset, -1, 1)
+
+        return np.where(has_dip, sample_rate / refined, np.nan)
+
+    def extract(self, samples: np.ndarray, sample_rate: int) -> PitchContour:
+        """Estimate the F0 contour of one recording"""
+        return self.extract_batch([samples], sample_rate)[0]
+
+    def extract_batch(self, recordings: Sequence[np.ndarray], sample_rate: int) -> List[PitchContour]:
+        """Estimate F0 contours for many recordings with one FFT pass over all their frames"""
+        framed = [self._frame(samples, sample_rate) for samples in recordings]
+        if not framed:
+            return []
+        max_lag, hop = framed[0][1], framed[0][2]
+        all_frames = np.concatenate([frames for frames, _, _ in framed])
+        # Blocks keep the FFT working set in cache; one giant matrix is slower
+        f0 = np.concatenate([self._yin(all_frames[start:start + YIN_BLOCK_FRAMES], sample_rate, max_lag)
+                             for start in range(0, len(all_frames), YIN_BLOCK_FRAMES)] or [np.zeros(0)])
+        loudness = 10 * np.log10(np.maximum((all_frames.astype(np.float64) ** 2).mean(axis=1), 1e-12))
+
+        # Silence is judged per recording, not against the loudest recording in the batch
+        contours = []
+        start = 0
+        for frames, _, _ in framed:
+            stop = start + len(frames)
+            track_f0, track_loudness = f0[start:stop], loudness[start:stop]
+            voiced = ~np.isnan(track_f0)
+            if len(frames):
+                voiced &= track_loudness > max(track_loudness.max() + self.silence_db, SILENCE_FLOOR_DB)
+            contours.append(PitchContour(np.arange(len(frames)) * hop / sample_rate,
+                                         np.where(voiced, track_f0, np.nan), voiced))
+            start = stop
+        return contours
+
+    @staticmethod
+    def _features(contour: PitchContour) -> np.ndarray:
+        # Bridge unvoiced gaps so DTW sees a continuous melody
+        semitones = contour.semitones
+        if not contour.voiced.any():
+            return np.zeros(len(semitones))
+        positions = np.arange(len(semitones))
+        return np.interp(positions, positions[contour.voiced], semitones[contour.voiced])
+
+    def align_batch(self, pairs: Sequence[Tuple[np.ndarray, np.ndarray]]) -> List[Tuple[float, np.ndarray]]:
+        """DTW-align many (reference, learner) feature sequences at once
+
+        Returns (mean cost along the path, path) per pair, where path is an
+        (steps, 2) array of (reference frame, learner frame) indices.
+        """
+        if not pairs:
+            return []
+        lengths = np.array([(len(r), len(l)) for r, l in pairs])
+        rows, cols = lengths.max(axis=0)
+        reference = np.zeros((len(pairs), rows), dtype=np.float32)
+        learner = np.zeros((len(pairs), cols), dtype=np.float32)
+        for b, (r, l) in enumerate(pairs):
+            reference[b, :len(r)] = r
+            learner[b, :len(l)] = l
+
+        cost = np.abs(reference[:, :, None] - learner[:, None, :])
+        total = np.full((len(pairs), rows + 1, cols + 1), np.inf, dtype=np.float32)
+        total[:, 0, 0] = 0
+        # Cells on one anti-diagonal only depend on the two before it
+        for diagonal in range(2, rows + cols + 1):
+            i = np.arange(max(1, diagonal - cols), min(rows, diagonal - 1) + 1)
+            j = diagonal - i
+            best = np.minimum(np.minimum(total[:, i - 1, j - 1], total[:, i - 1, j]), total[:, i, j - 1])
+            total[:, i, j] = cost[:, i - 1, j - 1] + best
+
+        results = []
+        for b, (n, m) in enumerate(lengths):
+            results.append((float(total[b, n, m]) / (n + m), self._backtrack(total[b], n, m)))
+        return results
+
+    def align(self, reference: np.ndarray, learner: np.ndarray) -> Tuple[float, np.ndarray]:
+        """DTW-align one learner feature sequence to a reference"""
+        return self.align_batch([(reference, learner)])[0]
+
+    @staticmethod
+    def _backtrack(total: np.ndarray, n: int, m: int) -> np.ndarray:
+        path = []
+        i, j = n, m
+        while i > 0 and j > 0:
+            path.append((i - 1, j - 1))
+            steps = (total[i - 1, j - 1], total[i - 1, j], total[i, j - 1])
+            move = int(np.argmin(steps))
+            if move == 0:
+                i, j = i - 1, j - 1
+            elif move == 1:
+                i -= 1
+            else:
+                j -= 1
+        return np.array(path[::-1], dtype=np.int64).reshape(-1, 2)
+
+    def mora_boundaries(self, contour: PitchContour, mora_count: int) -> np.ndarray:
+        """Split the voiced span of a reference evenly into morae
+
+        Without a forced aligner this is an approximation; callers that know
+        the mora timings (e.g. from a synthesizer) should pass them instead.
+        """
+        voiced = np.flatnonzero(contour.voiced)
+        first, last = (voiced[0], voiced[-1] + 1) if len(voiced) else (0, len(contour.f0))
+        return np.linspace(first, last, mora_count + 1).round().astype(np.int64)
+
+    def score(self, reference: PitchContour, learner: PitchContour, text: str,
+              boundaries: np.ndarray = None) -> Dict[str, Any]:
+        """Score a learner recording against a reference, mora by mora"""
+        return self.score_batch([(reference, learner, text, boundaries)])[0]
+
+    def score_batch(self, items: Sequence[Tuple[PitchContour, PitchContour, str, Optional[np.ndarray]]]) -> List[Dict[str, Any]]:
+        """Score many (reference, learner, text, boundaries) items with one batched DTW"""
+        features = [(self._features(reference), self._features(learner)) for reference, learner, _, _ in items]
+        alignments = self.align_batch(features)
+
+        reports = []
+        for (reference, learner, text, boundaries), (ref_features, learner_features), (cost, path) in zip(
+                items, features, alignments):
+            morae = split_morae(text) or [text]
+            if boundaries is None:
+                boundaries = self.mora_boundaries(reference, len(morae))
+            ref_voiced = reference.voiced[path[:, 0]]
+            learner_voiced = learner.voiced[path[:, 1]]
+            difference = np.abs(ref_features[path[:, 0]] - learner_features[path[:, 1]])
+            mora_of_step = np.searchsorted(boundaries, path[:, 0], side="right") - 1
+
+            scores = []
+            for index, mora in enumerate(morae):
+                steps = (mora_of_step == index) & ref_voiced & learner_voiced
+                if not steps.any():
+                    scores.append(MoraScore(mora, None, float("nan"), float("nan")))
+                    continue
+                mean_difference = float(difference[steps].mean())
+                scores.append(MoraScore(
+                    mora,
+                    round(100 * max(0.0, 1 - mean_difference / self.tolerance), 1),
+                    float(ref_features[path[steps, 0]].mean()),
+                    float(learner_features[path[steps, 1]].mean())
+                ))
+
+            scored = [s.score for s in scores if s.score is not None]
+            reports.append({
+                "overall": round(float(np.mean(scored)), 1) if scored else None,
+                "alignment_cost": cost,
+                "morae": scores
+            })
+        return reports
@@ -1,12 +1,30 @@
 import random
 import os
-import pandas as pd
-from typing import List, Dict, Any, Tuple
+import logging
+from typing import List, Dict, Any, Set
+
+import numpy as np
+
+from modules import cloze_bank, corpus_refresh, difficulty, duplicates, exercise_bank, metrics, shared_corpus
+from modules.sentence_store import SentenceRow, SentenceStore
 
 class PracticeManager:
     """Manages practice activities for Japanese language learning"""
     
-    def __init__(self):
+    # Rows read from the Tatoeba export
+    CORPUS_ROW_LIMIT = 5000
+    
+    # Share of listening exercises built from AI example sentences rather than the corpus
+    AI_EXAMPLE_SHARE = 0.5
+    
+    # Practice types generate_exercise has a generator for; the others get its fixed fallback exercise
+    GENERATED_PRACTICE_TYPES = {
+        "kana_recognition", "kana_matching", "simple_vocabulary", "vocabulary_categories",
+        "dialogue_comprehension", "grammar_application", "sentence_creation", "verb_conjugation",
+        "reading_comprehension", "listen_and_choose", "listening_comprehension", "speech_practice"
+    }
+    
+    def __init__(self, example_store=None, recommender=None, audio_cache=None):
         """Initialize practice data and resources"""
         self.practice_types = {
             "beginner": [
@@ -35,7 +53,24 @@ class PracticeManager:
         }
         
         # Load sentences from Tatoeba for practice activities
-        self.sentences = self._load_sentences()
+        self.sentence_store = self._load_sentences()
+        # {tier: [sentence, ...]} views, for callers written against the old list-of-dict tiers
+        self.sentences = self.sentence_store.tiers_view()
+        # Cloze exercises mined from the corpus (see modules/cloze_bank.py), before any request needs them
+        self.cloze_bank = self._load_cloze_bank()
+        # Sentence rows grouped by tier and length, for distractors of matching difficulty
+        self.distractor_index = self._load_distractor_index()
+        # Pre-generated exercises served instead of running the generators (see modules/exercise_bank.py)
+        self.exercise_bank = self._attach_exercise_bank()
+        
+        # Parsed AI example sentences (shared with AIService), reused as exercise content
+        self.example_store = example_store
+        
+        # Optional collaborative-filtering recommender (see modules/collaborative.py)
+        self.recommender = recommender
+        
+        # Optional pronunciation clips (see modules/audio_cache.py)
+        self.audio_cache = audio_cache
         
         # Basic vocabulary with categories for beginner and intermediate practice
         self.vocabulary = {
@@ -108,7 +143,8 @@ class PracticeManager:
             }
         }
         
-    def _load_sentences(self) -> Dict[str, List[Dict[str, Any]]]:
+    @metrics.timed("corpus_load")
+    def _load_sentences(self) -> SentenceStore:
         """Load Japanese sentences from Tatoeba corpus with improved translation handling"""
         sentences = {
             "beginner": [],
@@ -117,46 +153,25 @@ class PracticeManager:
         }
         
         try:
+            # A corpus directory kept up to date by modules/corpus_refresh.py takes precedence
+            corpus_dir = os.getenv("TONEMASTER_CORPUS_DIR")
+            if corpus_dir and os.path.exists(os.path.join(corpus_dir, corpus_refresh.SENTENCES_FILE)):
+                return shared_corpus.attach(os.path.join(corpus_dir, corpus_refresh.SENTENCES_FILE))
+            
             # Look for the tsv directory
             tsv_dir = os.path.join(os.getcwd(), "jpn_sentences.tsv")
             
             # First try to load from the jpn_sentences.tsv directly (Japanese sentences only)
             jpn_path = os.path.join(tsv_dir, "jpn_sentences.tsv")
             if os.path.exists(jpn_path):
-                # Read Japanese sentences (limit to 5000 for efficiency)
-                df = pd.read_csv(jpn_path, sep='\t', header=None, names=['id', 'lang', 'text'], nrows=5000)
-                japanese_sentences = df[df['lang'] == 'jpn'][['id', 'text']].to_dict('records')
-                
-                # Categorize sentences by complexity
-                for sentence_data in japanese_sentences:
-                    sentence = sentence_data['text']
-                    sentence_id = sentence_data['id']
-                    
-                    # Simple categorization based on length and complexity
-                    entry = {"text": sentence, "id": sentence_id, "translation": "", "tags": []}
-                    
-                    if len(sentence) < 10 and all(char not in sentence for char in "。、"):
-                        sentences["beginner"].append(entry)
-                    elif len(sentence) < 20:
-                        sentences["intermediate"].append(entry)
-                    else:
-                        sentences["advanced"].append(entry)
-                
-                # Try to load translations from jp-en
                 en_path = os.path.join(tsv_dir, "jp-en - 2025-05-18.tsv")
-                if os.path.exists(en_path):
-                    try:
-                        # Load english translations
-                        trans_df = pd.read_csv(en_path, sep='\t', header=None, names=['jp_id', 'en_id', 'en_text'])
-                        translations = {row['jp_id']: row['en_text'] for _, row in trans_df.iterrows()}
-                        
-                        # Add translations to sentences
-                        for category in sentences.keys():
-                            for entry in sentences[category]:
-                                if entry["id"] in translations:
-                                    entry["translation"] = translations[entry["id"]]
-                    except Exception as e:
-                        print(f"Error loading translations: {e}")
+                if shared_corpus.enabled():
+                    # One read-only copy in the page cache for all app processes (see modules/shared_corpus.py)
+                    return shared_corpus.load([jpn_path, en_path], lambda: self._parse_corpus(jpn_path, en_path),
+                                              options=f"rows={self.CORPUS_ROW_LIMIT};"
+                                                      f"tiering={difficulty.CLASSIFIER_VERSION};"
+                                                      f"dedup={duplicates.DEDUP_VERSION}")
+                return self._parse_corpus(jpn_path, en_path)
             else:
                 print(f"Warning: Tatoeba sentences file not found at {jpn_path}")
                 # Fallback to a few hardcoded sentences for each level
@@ -190,12 +205,44 @@ class PracticeManager:
                 {"text": "ありがとうございます。", "translation": "Thank you.", "tags": ["courtesy"]}
             ]
             
-        return sentences
+        return SentenceStore.from_tiers(sentences)
+    
+    def _parse_corpus(self, jpn_path: str, en_path: str) -> SentenceStore:
+        """Read and tier the Tatoeba export, attaching English translations when available"""
+        import pandas as pd  # Deferred: only needed when the corpus file is present
+        
+        # Read Japanese sentences (limited for efficiency)
+        df = pd.read_csv(jpn_path, sep='\t', header=None, names=['id', 'lang', 'text'], nrows=self.CORPUS_ROW_LIMIT)
+        df = df[(df['lang'] == 'jpn') & df['text'].notna()]
+        ids = df['id'].to_numpy()
+        texts = df['text'].tolist()
+        
+        # Keep one sentence per duplicate cluster so sampling does not serve the same sentence twice
+        keep = duplicates.representatives(texts)
+        ids = ids[keep]
+        texts = [texts[i] for i in keep]
+        
+        # Categorize sentences by complexity (indexes into sentence_store.TIERS), in one vectorized pass
+        tiers = difficulty.DifficultyClassifier(difficulty.APP_TIERS).fit_predict(texts)
+        
+        # Try to load translations from jp-en
+        translations = [""] * len(texts)
+        if os.path.exists(en_path):
+            try:
+                # Load english translations
+                trans_df = pd.read_csv(en_path, sep='\t', header=None, names=['jp_id', 'en_id', 'en_text'])
+                by_id = dict(zip(trans_df['jp_id'], trans_df['en_text']))
+                translations = [by_id.get(sentence_id, "") for sentence_id in ids]
+            except Exception as e:
+                print(f"Error loading translations: {e}")
+        
+        return SentenceStore.build(ids, texts, translations, tiers)
     
     def get_practice_activities(self, difficulty: str) -> List[str]:
         """Get available practice activities for a given difficulty level"""
         return self.practice_types.get(difficulty.lower(), [])
     
+    @metrics.timed("exercise_generation")
     def generate_kana_recognition_exercise(self, syllabary_type: str, syllabary_data: Dict) -> Dict[str, Any]:
         """Generate a kana recognition exercise"""
         # Get all characters from the syllabary
@@ -207,10 +254,11 @@ class PracticeManager:
         answer = random.choice(all_kana)
         
         # Create options (1 correct + 3 random different options)
+        # Options must sound different too, since ぢ/じ and づ/ず share a romaji
         options = [answer]
         while len(options) < 4:
             option = random.choice(all_kana)
-            if option not in options:
+            if option["romaji"] not in [opt["romaji"] for opt in options]:
                 options.append(option)
         
         # Shuffle options
@@ -224,6 +272,7 @@ class PracticeManager:
             "explanation": f"The {syllabary_type} character for '{answer['romaji']}' is '{answer['symbol']}'"
         }
     
+    @metrics.timed("exercise_generation")
     def generate_kana_matching_exercise(self, hiragana_data: Dict, katakana_data: Dict) -> Dict[str, Any]:
         """Generate a hiragana-katakana matching exercise"""
         # Get matching pairs
@@ -265,6 +314,7 @@ class PracticeManager:
             "explanation": f"The hiragana '{question_pair['hiragana']}' and katakana '{correct_katakana}' both represent '{question_pair['romaji']}'"
         }
     
+    @metrics.timed("exercise_generation")
     def generate_vocabulary_exercise(self, difficulty: str) -> Dict[str, Any]:
         """Generate a vocabulary exercise based on difficulty"""
         if difficulty == "beginner":
@@ -325,8 +375,8 @@ class PracticeManager:
             }
         else:  # advanced
             # Get a sentence and create a fill-in-the-blank exercise
-            if len(self.sentences["advanced"]) > 0:
-                sentence = random.choice(self.sentences["advanced"])
+            if self.sentence_store.count("advanced") > 0:
+                sentence = self.sentence_store.sample("advanced")
                 # Split sentence into words (simplified approach)
                 words = sentence["text"].replace("。", "").replace("、", " ").split()
                 
@@ -342,9 +392,9 @@ class PracticeManager:
                     # Get options (1 correct + 3 distractors)
                     options = [correct_word]
                     
-                    # Get other words from sentences for distractors
+                    # Get other words for distractors from sentences of the same difficulty and length
                     all_words = []
-                    for s in self.sentences["advanced"] + self.sentences["intermediate"]:
+                    for s in self.distractor_sentences(sentence, 8):
                         all_words.extend(s["text"].replace("。", "").replace("、", " ").split())
                     
                     # Filter for words of similar length and different from the correct word
@@ -371,6 +421,7 @@ class PracticeManager:
             # Fallback if no suitable sentences
             return self.generate_vocabulary_exercise("intermediate")
     
+    @metrics.timed("exercise_generation")
     def generate_dialogue_comprehension(self) -> Dict[str, Any]:
         """Generate a dialogue comprehension exercise"""
         # Simple dialogues for practice
@@ -403,8 +454,68 @@ class PracticeManager:
         
         return random.choice(dialogues)
     
-    def generate_grammar_exercise(self) -> Dict[str, Any]:
-        """Generate a grammar exercise"""
+    def _attach_exercise_bank(self):
+        """The exercise bank named by TONEMASTER_EXERCISE_BANK, or None to generate every exercise"""
+        path = os.getenv("TONEMASTER_EXERCISE_BANK")
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return exercise_bank.attach(path)
+        except (OSError, ValueError) as e:
+            print(f"Error attaching exercise bank {path}: {e}")
+            return None
+    
+    def _load_cloze_bank(self) -> cloze_bank.ClozeBank:
+        """The cloze bank written into the corpus directory, or one mined from the in-tree corpus"""
+        corpus_dir = os.getenv("TONEMASTER_CORPUS_DIR")
+        path = os.path.join(corpus_dir, corpus_refresh.CLOZE_BANK_FILE) if corpus_dir else None
+        return cloze_bank.load_or_mine(self.sentence_store, path)
+    
+    def _load_distractor_index(self) -> corpus_refresh.DistractorIndex:
+        """The corpus directory's distractor index with its ids turned into rows, or one built from the store"""
+        store = self.sentence_store
+        corpus_dir = os.getenv("TONEMASTER_CORPUS_DIR")
+        path = os.path.join(corpus_dir, corpus_refresh.DISTRACTORS_FILE) if corpus_dir else None
+        if path and os.path.exists(path) and len(store):
+            try:
+                index = corpus_refresh.DistractorIndex.load(path)
+                order = np.argsort(store.ids, kind="stable")
+                rows = order[np.minimum(np.searchsorted(store.ids, index.ids, sorter=order), len(order) - 1)]
+                if len(rows) == len(store) and np.array_equal(store.ids[rows], index.ids):
+                    return corpus_refresh.DistractorIndex(index.keys, rows)
+                print(f"Distractor index {path} does not match the loaded corpus, rebuilding it")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error loading distractor index {path}: {e}")
+        return corpus_refresh.DistractorIndex().apply(np.zeros(0, dtype=np.int64), np.arange(len(store)),
+                                                      corpus_refresh.DistractorIndex.key(store.tiers, store.lengths))
+    
+    def distractor_sentences(self, sentence: SentenceRow, count: int = 3) -> List[SentenceRow]:
+        """Up to count other random sentences of the same tier and length bucket as sentence"""
+        rows = self.distractor_index.candidates(sentence.tier, sentence.length)
+        picks = rows[random.sample(range(len(rows)), min(count + 1, len(rows)))].tolist()
+        return [self.sentence_store.row(row) for row in picks if row != sentence.index][:count]
+    
+    @metrics.timed("exercise_generation")
+    def generate_grammar_exercise(self, difficulty: str = None) -> Dict[str, Any]:
+        """Generate a grammar exercise, blanking a particle or grammar pattern in a corpus sentence"""
+        bank = self.cloze_bank
+        cloze = bank.sample(difficulty)
+        if cloze is not None:
+            pattern_key, row, offset, length = cloze
+            sentence = self.sentence_store.row(row)
+            text = sentence.text
+            answer = text[offset:offset + length]
+            family, _, description = cloze_bank.PATTERNS[pattern_key]
+            return {
+                "type": "grammar_application",
+                "question": f"Fill in the blank: {text[:offset]}＿＿＿{text[offset + length:]}",
+                "options": bank.options(pattern_key, answer),
+                "answer": answer,
+                "pattern": answer if family == "particle" else f"〜{answer}",
+                "translation": sentence.translation,
+                "explanation": f"「{answer}」 {description}. Full sentence: {text}"
+            }
+        
         # Choose a random grammar pattern
         pattern_key = random.choice(list(self.grammar_patterns.keys()))
         pattern_data = self.grammar_patterns[pattern_key]
@@ -466,6 +577,7 @@ class PracticeManager:
             "explanation": f"The pattern '{pattern}' means: {pattern_data['description']}"
         }
     
+    @metrics.timed("exercise_generation")
     def generate_sentence_creation_exercise(self) -> Dict[str, Any]:
         """Generate a sentence creation exercise"""
         # Simple sentence creation prompts
@@ -492,6 +604,7 @@ class PracticeManager:
         
         return random.choice(prompts)
     
+    @metrics.timed("exercise_generation")
     def generate_verb_conjugation_exercise(self) -> Dict[str, Any]:
         """Generate a verb conjugation exercise"""
         # Basic verbs and their conjugations
@@ -588,6 +701,7 @@ class PracticeManager:
             "explanation": f"The {form_descriptions[form]} form of '{verb}' is '{correct_answer}'"
         }
     
+    @metrics.timed("exercise_generation")
     def generate_reading_comprehension_exercise(self) -> Dict[str, Any]:
         """Generate a reading comprehension exercise"""
         # Simple reading passages with questions
@@ -610,8 +724,26 @@ class PracticeManager:
         
         return random.choice(passages)
     
-    def generate_exercise(self, practice_type: str, difficulty: str, syllabary_data: Dict = None) -> Dict[str, Any]:
-        """Generate an exercise based on the practice type and difficulty"""
+    def generate_exercise(self, practice_type: str, difficulty: str, syllabary_data: Dict = None,
+                          cursor: Dict[str, Any] = None, exclude: Set[int] = None) -> Dict[str, Any]:
+        """Generate an exercise based on the practice type and difficulty
+        
+        With an exercise bank attached, banked practice types come from it, skipping the
+        fingerprints in exclude: at random, or along a learner's cursor (see
+        UserProgressManager.exercise_cursor), whose position in the partition is advanced in
+        place (see ExerciseBank.draw). The generators run for types the bank does not hold.
+        """
+        if self.exercise_bank is not None and practice_type not in exercise_bank.LIVE_PRACTICE_TYPES:
+            if cursor is not None:
+                key = exercise_bank.partition_key(practice_type, difficulty)
+                positions = cursor["positions"]
+                exercise, positions[key] = self.exercise_bank.draw(practice_type, difficulty, cursor["seed"],
+                                                                   positions.get(key, 0), exclude)
+            else:
+                exercise = self.exercise_bank.sample(practice_type, difficulty, exclude)
+            if exercise is not None:
+                return self._serve_banked(exercise)
+        
         if practice_type == "kana_recognition" and syllabary_data:
             syllabary_type = "hiragana" if "あ" in str(syllabary_data.values()) else "katakana"
             return self.generate_kana_recognition_exercise(syllabary_type, syllabary_data)
@@ -626,7 +758,7 @@ class PracticeManager:
             return self.generate_dialogue_comprehension()
         
         elif practice_type == "grammar_application":
-            return self.generate_grammar_exercise()
+            return self.generate_grammar_exercise(difficulty)
         
         elif practice_type == "sentence_creation":
             return self.generate_sentence_creation_exercise()
@@ -655,6 +787,16 @@ class PracticeManager:
             "explanation": "'こんにちは' means 'Hello' in English"
         }
     
+    def _serve_banked(self, exercise: Dict[str, Any]) -> Dict[str, Any]:
+        """Finish a banked exercise: render its audio fields and shuffle its options"""
+        for field in exercise_bank.AUDIO_FIELDS:
+            if exercise.get(field):
+                exercise[field] = self._audio_clip(exercise[field])
+        if isinstance(exercise.get("options"), list):
+            random.shuffle(exercise["options"])
+        metrics.increment("exercise_bank_hits_total", practice_type=exercise.get("type", "unknown"))
+        return exercise
+    
     def record_practice_result(self, user_id: str, practice_type: str, success: bool, details: Dict[str, Any] = None) -> None:
         """Record the result of a practice session for tracking user progress"""
         # In a real implementation, this would store data in a database
@@ -663,10 +805,27 @@ class PracticeManager:
         
     def get_recommended_practice(self, user_id: str, difficulty: str) -> str:
         """Get a recommended practice type based on user performance"""
-        # In a real implementation, this would analyze user data to recommend
-        # appropriate practice types. For now, return a random one.
-        return random.choice(self.practice_types.get(difficulty.lower(), []))
+        # Use precomputed recommendations from all learners' stats when available
+        available = self.practice_types.get(difficulty.lower(), [])
+        if self.recommender is not None:
+            for item, _ in self.recommender.recommend(user_id, f"practice:{difficulty.lower()}"):
+                practice_type = item.rsplit(":", 1)[1]
+                if practice_type in available:
+                    return practice_type
+        return random.choice(available)
     
+    @metrics.timed("audio_clip")
+    def _audio_clip(self, text: str) -> str:
+        """Get the audio cache key for text, or the text itself when no clip is available"""
+        if self.audio_cache is None:
+            return text
+        try:
+            return self.audio_cache.get_or_render(text)
+        except Exception as e:
+            logging.warning(f"Error rendering audio for '{text}': {e}")
+            return text
+    
+    @metrics.timed("exercise_generation")
     def generate_listen_and_choose_exercise(self) -> Dict[str, Any]:
         """Generate a listening exercise for beginners where they hear a word and pick its meaning"""
         # Choose a random category
@@ -685,7 +844,7 @@ class PracticeManager:
         
         return {
             "type": "listen_and_choose",
-            "audio_word": word,  # In real implementation, this would be a path to an audio file
+            "audio_word": self._audio_clip(word),
             "question": "Listen and select the meaning of the word",
             "japanese_text": word,  # Show Japanese text for learning purposes
             "options": options,
@@ -694,11 +853,18 @@ class PracticeManager:
             "explanation": f"The word '{word}' means '{data['meaning']}' in English"
         }
     
+    @metrics.timed("exercise_generation")
     def generate_listening_comprehension_exercise(self) -> Dict[str, Any]:
         """Generate a listening comprehension exercise for intermediate level"""
+        # Mix AI example sentences, which always come with a validated translation, with corpus sentences
+        examples = self.example_store.all() if self.example_store is not None else []
+        if len(examples) >= 4 and (self.sentence_store.count("intermediate") == 0
+                                   or random.random() < self.AI_EXAMPLE_SHARE):
+            return self.generate_example_sentence_exercise(examples)
+        
         # Get a suitable sentence
-        if len(self.sentences["intermediate"]) > 0:
-            sentence = random.choice(self.sentences["intermediate"])
+        if self.sentence_store.count("intermediate") > 0:
+            sentence = self.sentence_store.sample("intermediate")
             text = sentence["text"]
             translation = sentence.get("translation", "")
             
@@ -711,15 +877,18 @@ class PracticeManager:
             
             options = [correct_option]
             
-            # Create some plausible but incorrect options
-            distractors = [
-                "Asking for directions",
-                "Talking about the weather",
-                "Introducing oneself",
-                "Making an appointment",
-                "Ordering food",
-                "Discussing a hobby"
-            ]
+            # Translations of sentences of the same difficulty and length make plausible but incorrect options
+            distractors = [other.translation for other in self.distractor_sentences(sentence, 6)
+                           if translation and other.translation and other.translation != correct_option]
+            if len(distractors) < 3:
+                distractors = [
+                    "Asking for directions",
+                    "Talking about the weather",
+                    "Introducing oneself",
+                    "Making an appointment",
+                    "Ordering food",
+                    "Discussing a hobby"
+                ]
             
             # Remove the correct answer if it's similar to any distractor
             filtered_distractors = [d for d in distractors if not 
@@ -732,7 +901,7 @@ class PracticeManager:
             
             return {
                 "type": "listening_comprehension",
-                "audio_sentence": text,  # In real implementation, this would be a path to an audio file
+                "audio_sentence": self._audio_clip(text),
                 "japanese_text": text,  # Show Japanese text for learning purposes
                 "question": question,
                 "options": options,
@@ -744,7 +913,7 @@ class PracticeManager:
         # Fallback if no suitable sentences
         return {
             "type": "listening_comprehension",
-            "audio_sentence": "こんにちは、元気ですか？",
+            "audio_sentence": self._audio_clip("こんにちは、元気ですか？"),
             "japanese_text": "こんにちは、元気ですか？", 
             "question": "What is this sentence about?",
             "options": ["Greeting and asking how someone is", "Asking for directions", 
@@ -754,12 +923,35 @@ class PracticeManager:
             "explanation": "This is a common greeting asking how someone is feeling."
         }
     
+    @metrics.timed("exercise_generation")
+    def generate_example_sentence_exercise(self, examples: List[Any]) -> Dict[str, Any]:
+        """Generate a listening comprehension exercise from parsed example sentence records"""
+        example = random.choice(examples)
+        
+        # Distractors are translations of other examples
+        other_translations = list({e.english for e in examples if e.english != example.english})
+        options = [example.english] + random.sample(other_translations, min(3, len(other_translations)))
+        random.shuffle(options)
+        
+        return {
+            "type": "listening_comprehension",
+            "audio_sentence": self._audio_clip(example.japanese),
+            "japanese_text": example.japanese,
+            "romaji": example.romaji,
+            "question": "What is this sentence about?",
+            "options": options,
+            "answer": example.english,
+            "translation": example.english,
+            "explanation": f"The sentence '{example.japanese}' ({example.romaji}) means '{example.english}'"
+        }
+    
+    @metrics.timed("exercise_generation")
     def generate_speech_practice_exercise(self) -> Dict[str, Any]:
         """Generate a speech practice exercise for advanced level"""
         # For advanced practice, use real sentences from Tatoeba
-        if len(self.sentences["advanced"]) > 0:
+        if self.sentence_store.count("advanced") > 0:
             # Get a random sentence
-            sentence = random.choice(self.sentences["advanced"])
+            sentence = self.sentence_store.sample("advanced")
             text = sentence["text"]
             translation = sentence.get("translation", "")
             
@@ -771,7 +963,7 @@ class PracticeManager:
                 "type": "speech_practice",
                 "prompt": "Try to pronounce this sentence:",
                 "japanese_text": text,
-                "reference_audio": text,  # In real implementation, this would be a path to an audio file
+                "reference_audio": self._audio_clip(text),
                 "translation": translation,
                 "pronunciation_guidance": pronunciation_guidance,
                 "key_vocabulary": text.replace("。", "").replace("、", " ").split()[:3]  # First few words as key vocab
@@ -796,7 +988,7 @@ class PracticeManager:
             "type": "speech_practice",
             "prompt": "Try to pronounce this sentence:",
             "japanese_text": selected["text"],
-            "reference_audio": selected["text"],  # Would be audio file path in real implementation
+            "reference_audio": self._audio_clip(selected["text"]),
             "translation": selected["translation"],
             "pronunciation_guidance": selected["pronunciation_guidance"],
             "key_vocabulary": selected["text"].replace("。", "").replace("、", " ").split()[:3]
@@ -0,0 +1,136 @@
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict
+
+# Shared worker pool so a hung upstream call never blocks the Streamlit script thread
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-call")
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open"""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a call or its retries run past the deadline"""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for an unreliable upstream"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        """Open after failure_threshold consecutive failures, probe again after reset_timeout seconds"""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.total_successes = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Check whether a call may go upstream right now"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                # Let a single probe through; everyone else waits for its outcome
+                self._probe_in_flight = True
+                return True
+            if self.state != self.CLOSED:
+                self.total_rejected += 1
+                return False
+            return True
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful call"""
+        with self._lock:
+            self.total_successes += 1
+            self.consecutive_failures = 0
+            self.state = self.CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure and open the breaker when the threshold is reached"""
+        with self._lock:
+            self.total_failures += 1
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get breaker state and counters"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "successes": self.total_successes,
+                "failures": self.total_failures,
+                "rejected": self.total_rejected,
+                "times_opened": self.times_opened
+            }
+
+
+def call_with_timeout(fn: Callable[[], Any], timeout: float) -> Any:
+    """Run fn on the shared pool and give up waiting after timeout seconds"""
+    future = _executor.submit(fn)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise DeadlineExceededError(f"Call did not finish within {timeout:.1f}s")
+
+
+def call_with_retry(fn: Callable[[], Any], breaker: CircuitBreaker, timeout: float = 15.0,
+                    attempts: int = 3, base_delay: float = 0.5, max_delay: float = 4.0,
+                    deadline: float = 30.0) -> Any:
+    """Call fn with a per-attempt timeout, jittered exponential backoff and a total deadline"""
+    start = time.monotonic()
+    last_error = None
+
+    for attempt in range(attempts):
+        # Checked before the breaker, so a granted half-open probe is always made and recorded
+        remaining = deadline - (time.monotonic() - start)
+        if remaining <= 0:
+            break
+
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit '{breaker.name}' is open")
+
+        try:
+            result = call_with_timeout(fn, min(timeout, remaining))
+            breaker.record_success()
+            return result
+        except Exception as e:
+            last_error = e
+            breaker.record_failure()
+            logging.warning(f"{breaker.name} attempt {attempt + 1}/{attempts} failed: {e}")
+
+        if attempt < attempts - 1:
+            # Full jitter: sleep a random amount up to the exponential cap
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            remaining = deadline - (time.monotonic() - start)
+            if delay >= remaining:
+                break
+            time.sleep(delay)
+
+    if isinstance(last_error, Exception):
+        raise last_error
+    raise DeadlineExceededError(f"{breaker.name} exceeded its {deadline:.1f}s deadline")
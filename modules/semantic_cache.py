@@ -0,0 +1,143 @@
+import logging
+import threading
+from typing import List, Dict, Any, Callable, Optional
+
+import numpy as np
+
+
+def normalize_interests(interests: List[str]) -> str:
+    """Normalize an interest list into a canonical, order-independent key"""
+    terms = set()
+    for interest in interests:
+        for term in str(interest).replace("、", ",").split(","):
+            term = " ".join(term.lower().split())
+            if term:
+                terms.add(term)
+    return ", ".join(sorted(terms))
+
+
+class SemanticCache:
+    """Cache of generated content looked up by embedding similarity"""
+
+    def __init__(self, embed_fn: Callable[[str], List[float]], threshold: float = 0.9, max_entries: int = 512):
+        """Initialize the cache with an embedding function and a similarity threshold"""
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        self.keys = []
+        self.values = []
+        self.vectors = None  # (entries, dimension) matrix of unit vectors
+        self.exact = {}  # normalized key -> row, skips the embedding call on repeats
+        self.similarities = []  # best similarity seen by each embedding lookup
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _embed(self, key: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn(key), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, key: str, vector: np.ndarray = None) -> Optional[Any]:
+        """Return the cached value for the nearest key above the threshold, if any"""
+        with self._lock:
+            if key in self.exact:
+                self.hits += 1
+                self.exact_hits += 1
+                return self.values[self.exact[key]]
+
+        if vector is None:
+            vector = self._embed(key)
+
+        with self._lock:
+            if self.vectors is None or len(self.keys) == 0:
+                self.misses += 1
+                return None
+
+            scores = self.vectors @ vector
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            self.similarities.append(similarity)
+
+            if similarity >= self.threshold:
+                self.hits += 1
+                return self.values[best]
+            self.misses += 1
+            return None
+
+    def store(self, key: str, value: Any, vector: np.ndarray = None) -> None:
+        """Add a generated value to the cache, evicting the oldest entry when full"""
+        if vector is None:
+            vector = self._embed(key)
+
+        with self._lock:
+            if key in self.exact:
+                self.values[self.exact[key]] = value
+                return
+
+            if len(self.keys) >= self.max_entries:
+                self.keys.pop(0)
+                self.values.pop(0)
+                self.vectors = self.vectors[1:]
+
+            self.keys.append(key)
+            self.values.append(value)
+            row = vector.reshape(1, -1)
+            self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+            self.exact = {k: i for i, k in enumerate(self.keys)}
+
+    def get_or_create(self, key: str, create_fn: Callable[[], Any],
+                      cacheable: Callable[[Any], bool] = None) -> Any:
+        """Return a cached value for a similar key or create and cache a new one
+
+        Created values that cacheable rejects, e.g. offline fallbacks, are returned
+        without being stored, so the next lookup tries to create them again.
+        """
+        if key in self.exact:
+            return self.lookup(key)
+
+        try:
+            vector = self._embed(key)
+        except Exception as e:
+            logging.warning(f"Embedding failed, bypassing semantic cache: {e}")
+            with self._lock:
+                self.misses += 1
+            return create_fn()
+
+        value = self.lookup(key, vector)
+        if value is None:
+            value = create_fn()
+            if cacheable is None or cacheable(value):
+                self.store(key, value, vector)
+        return value
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit rate and the distribution of nearest-neighbour similarities"""
+        with self._lock:
+            total = self.hits + self.misses
+            similarities = np.asarray(self.similarities, dtype=np.float32)
+
+        stats = {
+            "entries": len(self.keys),
+            "lookups": total,
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "threshold": self.threshold,
+            "similarity_percentiles": {},
+            "similarity_histogram": []
+        }
+        if len(similarities):
+            percentiles = np.percentile(similarities, [10, 50, 90, 99])
+            stats["similarity_percentiles"] = {
+                f"p{p}": round(float(v), 4) for p, v in zip([10, 50, 90, 99], percentiles)
+            }
+            counts, edges = np.histogram(np.clip(similarities, 0, 1), bins=10, range=(0.0, 1.0))
+            stats["similarity_histogram"] = [
+                {"bucket": f"{edges[i]:.1f}-{edges[i + 1]:.1f}", "count": int(count)}
+                for i, count in enumerate(counts)
+            ]
+        return stats
@@ -0,0 +1,254 @@
+"""Columnar storage for corpus sentences.
+
+Strings are kept the way Arrow keeps them: one UTF-8 byte blob per column
+plus an offsets array, so sentence i of a column is
+blob[offsets[i]:offsets[i + 1]]. Numeric attributes are NumPy columns. Rows
+are grouped by tier, which makes sampling a tier a single randrange. Nothing
+is a Python object until a row is read, and a row read is a small
+SentenceRow view that decodes its fields on access.
+
+PracticeManager.sentences is kept for existing callers as tiers_view(): a dict of
+list-like tier views whose items answer sentence["text"],
+sentence.get("translation") and so on like the old dicts.
+"""
+import random
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+TIERS = ("beginner", "intermediate", "advanced")
+STRING_COLUMNS = ("text", "translation", "tags")
+TAG_SEPARATOR = "\x1f"
+
+# Hiragana and katakana blocks, including the prolonged sound mark
+KANA_FIRST, KANA_LAST = 0x3041, 0x30FF
+
+
+def _offsets(lengths: np.ndarray) -> np.ndarray:
+    """Offsets array for strings of these byte lengths, 32-bit unless the blob needs more"""
+    offsets = np.zeros(len(lengths) + 1, dtype="<u4" if int(lengths.sum()) < 2 ** 32 else "<u8")
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def encode_strings(values: Iterable[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Offsets and UTF-8 blob for a string column; anything but a str is stored as ''"""
+    encoded = [value.encode("utf-8") if isinstance(value, str) else b"" for value in values]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    return _offsets(lengths), np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def codepoints(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """All texts as one uint32 codepoint array, with the start of each text (len(texts) + 1 entries)"""
+    starts = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)), out=starts[1:])
+    return np.frombuffer("".join(texts).encode("utf-32-le"), dtype="<u4"), starts
+
+
+def segment_sums(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Sum of values within each [starts[i], starts[i + 1]) segment, empty segments included"""
+    running = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(values, out=running[1:])
+    return running[starts[1:]] - running[starts[:-1]]
+
+
+class SentenceStore:
+    """Sentences as columns: id, tier, length, kana_ratio and UTF-8 text, translation and tags"""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+        self.ids = columns["id"]
+        self.tiers = columns["tier"]
+        self.lengths = columns["length"]
+        self.kana_ratios = columns["kana_ratio"]
+        # Rows are grouped by tier: tier t is rows tier_bounds[t]:tier_bounds[t + 1]
+        self.tier_bounds = columns["tier_bounds"]
+        self._tier_ranges = {tier: range(*self.tier_bounds[index:index + 2].tolist())
+                             for index, tier in enumerate(TIERS)}
+        # Indexing and slicing memoryviews is several times cheaper than NumPy scalar access
+        self._strings = {name: (memoryview(columns[f"{name}_offsets"]), memoryview(columns[f"{name}_bytes"]))
+                         for name in STRING_COLUMNS}
+
+    @classmethod
+    def build(cls, ids: Iterable[int], texts: List[str], translations: List[Any], tiers: Iterable[int],
+              tags: Optional[List[List[str]]] = None) -> "SentenceStore":
+        """Store rows given as parallel sequences; tiers are indexes into TIERS"""
+        tiers = np.asarray(list(tiers) if not isinstance(tiers, np.ndarray) else tiers, dtype=np.int8)
+        order = np.argsort(tiers, kind="stable")
+        texts = [texts[i] for i in order]
+        translations = [translations[i] for i in order]
+        tags = [TAG_SEPARATOR.join(tags[i]) for i in order] if tags is not None else [""] * len(texts)
+
+        points, starts = codepoints(texts)
+        lengths = np.diff(starts)
+        kana = segment_sums((points >= KANA_FIRST) & (points <= KANA_LAST), starts)
+        columns = {
+            "id": np.asarray(list(ids) if not isinstance(ids, np.ndarray) else ids, dtype="<i8")[order],
+            "tier": tiers[order],
+            "length": lengths.astype("<i4"),
+            "kana_ratio": (kana / np.maximum(lengths, 1)).astype("<f4"),
+            "tier_bounds": np.searchsorted(tiers[order], np.arange(len(TIERS) + 1)).astype("<i8"),
+        }
+        for name, values in zip(STRING_COLUMNS, (texts, translations, tags)):
+            columns[f"{name}_offsets"], columns[f"{name}_bytes"] = encode_strings(values)
+        return cls(columns)
+
+    @classmethod
+    def from_tiers(cls, sentences: Dict[str, List[Dict[str, Any]]]) -> "SentenceStore":
+        """Store the old {tier: [sentence dict, ...]} layout"""
+        rows = [(TIERS.index(tier), entry) for tier in TIERS for entry in sentences.get(tier, [])]
+        return cls.build([entry.get("id", -1) for _, entry in rows], [entry["text"] for _, entry in rows],
+                         [entry.get("translation", "") for _, entry in rows], [tier for tier, _ in rows],
+                         [entry.get("tags", []) for _, entry in rows])
+
+    def apply(self, deleted_ids: np.ndarray, added: "SentenceStore") -> "SentenceStore":
+        """A new store without the rows whose ids are in deleted_ids, plus every row of added
+
+        Untouched rows are copied as contiguous blocks, so the Python-level work
+        grows with the number of changed rows rather than with the store.
+        """
+        kept = np.flatnonzero(~np.isin(self.ids, deleted_ids))
+        blocks = []  # (store, start row, stop row) in output order: per tier, kept runs then added rows
+        for index, tier in enumerate(TIERS):
+            rows = kept[(kept >= self.tier_bounds[index]) & (kept < self.tier_bounds[index + 1])]
+            if len(rows):
+                breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+                starts, stops = rows[np.r_[0, breaks]], rows[np.r_[breaks - 1, len(rows) - 1]] + 1
+                blocks.extend((self, int(start), int(stop)) for start, stop in zip(starts, stops))
+            if added.count(tier):
+                blocks.append((added, added.tier_range(tier).start, added.tier_range(tier).stop))
+        return SentenceStore._from_blocks(blocks) if blocks else SentenceStore.build([], [], [], [])
+
+    @classmethod
+    def _from_blocks(cls, blocks: List[Tuple["SentenceStore", int, int]]) -> "SentenceStore":
+        columns = {name: np.concatenate([store.columns[name][start:stop] for store, start, stop in blocks])
+                   for name in ("id", "tier", "length", "kana_ratio")}
+        for name in STRING_COLUMNS:
+            lengths, pieces = [], []
+            for store, start, stop in blocks:
+                offsets = store.columns[f"{name}_offsets"]
+                lengths.append(np.diff(offsets[start:stop + 1].astype(np.int64)))
+                pieces.append(store.columns[f"{name}_bytes"][offsets[start]:offsets[stop]])
+            columns[f"{name}_offsets"] = _offsets(np.concatenate(lengths))
+            columns[f"{name}_bytes"] = np.concatenate(pieces)
+        columns["tier_bounds"] = np.searchsorted(columns["tier"], np.arange(len(TIERS) + 1)).astype("<i8")
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def string(self, row: int, column: str = "text") -> str:
+        offsets, blob = self._strings[column]
+        return blob[offsets[row]:offsets[row + 1]].tobytes().decode("utf-8")
+
+    def row(self, row: int) -> "SentenceRow":
+        return SentenceRow(self, row)
+
+    def tier_range(self, tier: str) -> range:
+        return self._tier_ranges[tier]
+
+    def count(self, tier: str) -> int:
+        return len(self.tier_range(tier))
+
+    def sample(self, tier: str, rng: random.Random = random) -> "SentenceRow":
+        """A uniformly random sentence of a tier; IndexError when the tier is empty, like random.choice"""
+        rows = self.tier_range(tier)
+        if not rows:
+            raise IndexError(f"No {tier} sentences to sample from")
+        return SentenceRow(self, rows.start + rng.randrange(len(rows)))
+
+    def tiers_view(self) -> Dict[str, "TierView"]:
+        """The old {tier: list of sentences} shape, as lazy views"""
+        return {tier: TierView(self, self.tier_range(tier)) for tier in TIERS}
+
+
+class SentenceRow:
+    """One row of a SentenceStore; also readable like the sentence dicts it replaces"""
+    __slots__ = ("store", "index")
+
+    FIELDS = ("text", "id", "translation", "tags")
+
+    def __init__(self, store: SentenceStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def text(self) -> str:
+        return self.store.string(self.index)
+
+    @property
+    def translation(self) -> str:
+        return self.store.string(self.index, "translation")
+
+    @property
+    def tags(self) -> List[str]:
+        tags = self.store.string(self.index, "tags")
+        return tags.split(TAG_SEPARATOR) if tags else []
+
+    @property
+    def id(self) -> int:
+        return int(self.store.ids[self.index])
+
+    @property
+    def tier(self) -> str:
+        return TIERS[self.store.tiers[self.index]]
+
+    @property
+    def length(self) -> int:
+        return int(self.store.lengths[self.index])
+
+    @property
+    def kana_ratio(self) -> float:
+        return float(self.store.kana_ratios[self.index])
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self.FIELDS else default
+
+    def keys(self) -> tuple:
+        return self.FIELDS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self.FIELDS}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SentenceRow):
+            return self.store is other.store and self.index == other.index
+        return isinstance(other, dict) and self.to_dict() == other
+
+    def __repr__(self) -> str:
+        return f"SentenceRow({self.to_dict()!r})"
+
+
+class TierView(Sequence):
+    """List-like view of one tier's rows"""
+
+    def __init__(self, store: SentenceStore, rows: range):
+        self.store = store
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SentenceRow(self.store, row) for row in self.rows[index]]
+        return SentenceRow(self.store, self.rows[index])
+
+    def __add__(self, other) -> List[SentenceRow]:
+        return list(self) + list(other)
+
+    def __radd__(self, other) -> List[SentenceRow]:
+        return list(other) + list(self)
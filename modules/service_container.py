@@ -0,0 +1,163 @@
+import os
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class ServiceContainer:
+    """Builds application services on first use instead of at startup"""
+
+    def __init__(self):
+        """Initialize the container with the default service factories"""
+        self._factories = {}  # name -> factory(container)
+        self._instances = {}
+        self._build_seconds = {}
+        self._lock = threading.Lock()
+        self._service_locks = {}  # one lock per service, so slow builds don't block each other
+        self._warm_up_thread = None
+
+        self.register("example_store", _build_example_store)
+        self.register("ai_service", _build_ai_service)
+        self.register("syllabary", _build_syllabary)
+        self.register("practice_recommender", _build_practice_recommender)
+        self.register("user_manager", _build_user_manager)
+        self.register("recommender", _build_recommender)
+        self.register("practice_manager", _build_practice_manager)
+        self.register("learner_index", _build_learner_index)
+        self.register("transliterator", _build_transliterator)
+        self.register("answer_checker", _build_answer_checker)
+        self.register("pitch_analyzer", _build_pitch_analyzer)
+        self.register("audio_cache", _build_audio_cache)
+
+    def register(self, name: str, factory: Callable[["ServiceContainer"], Any]) -> None:
+        """Register (or replace) the factory used to build a service"""
+        with self._lock:
+            self._factories[name] = factory
+            self._service_locks[name] = threading.Lock()
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Get a service, importing and building it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"Unknown service '{name}'")
+
+        with self._service_locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name](self)
+                self._build_seconds[name] = time.perf_counter() - start
+                logging.info(f"Built service '{name}' in {self._build_seconds[name]:.3f}s")
+            return self._instances[name]
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self.get(name)
+        except KeyError:
+            raise AttributeError(name)
+
+    def is_loaded(self, name: str) -> bool:
+        """Check whether a service has already been built"""
+        return name in self._instances
+
+    def get_build_times(self) -> Dict[str, float]:
+        """Get how long each built service took to construct, in seconds"""
+        return dict(self._build_seconds)
+
+    def start_warm_up(self, names: List[str] = None) -> None:
+        """Build services in a background thread, typically after the first page is rendered"""
+        with self._lock:
+            if self._warm_up_thread is not None:
+                return
+            names = names or list(self._factories)
+            self._warm_up_thread = threading.Thread(
+                target=self._warm_up, args=(names,), name="service-warm-up", daemon=True
+            )
+            self._warm_up_thread.start()
+
+    def _warm_up(self, names: List[str]) -> None:
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                # The page that needs the service will surface the error on first use
+                logging.warning(f"Warm-up of service '{name}' failed: {e}")
+
+
+def _build_example_store(services):
+    from modules.examples import ExampleStore
+    return ExampleStore("example_sentences.json")  # Shared cache of parsed AI examples
+
+
+def _build_ai_service(services):
+    from modules.ai_service import AIService
+    return AIService(example_store=services.example_store)
+
+
+def _build_syllabary(services):
+    from modules.syllabary import JapaneseSyllabary
+    return JapaneseSyllabary()
+
+
+def _build_practice_recommender(services):
+    # Produced by the batch job in modules/collaborative.py; absent until it has run
+    if not os.path.exists("recommendations.npz"):
+        return None
+    from modules.collaborative import ItemItemRecommender
+    return ItemItemRecommender.load("recommendations.npz")
+
+
+def _build_user_manager(services):
+    from modules.user_data import UserProgressManager
+    return UserProgressManager(recommender=services.practice_recommender)
+
+
+def _build_recommender(services):
+    from modules.content_recommender import ContentRecommender
+    return ContentRecommender(services.ai_service)
+
+
+def _build_practice_manager(services):
+    from modules.practice_manager import PracticeManager
+    return PracticeManager(example_store=services.example_store, recommender=services.practice_recommender,
+                           audio_cache=services.audio_cache)
+
+
+def _build_learner_index(services):
+    import atexit
+    from modules.learner_index import LearnerIndex
+    learner_index = LearnerIndex("learner_profiles")
+    atexit.register(learner_index.flush)  # changes are saved on a schedule, keep the last ones
+    return learner_index
+
+
+def _build_transliterator(services):
+    from modules.transliteration import Transliterator
+    return Transliterator(services.syllabary)
+
+
+def _build_answer_checker(services):
+    from modules.answer_checker import AnswerChecker
+    checker = AnswerChecker(services.transliterator)
+    syllabary = services.syllabary
+    checker.precompute(entry["symbol"] for table in (syllabary.hiragana, syllabary.katakana) for entry in table.values())
+    return checker
+
+
+def _build_pitch_analyzer(services):
+    from modules.pitch_accent import PitchAccentAnalyzer
+    return PitchAccentAnalyzer()
+
+
+def _build_audio_cache(services):
+    import atexit
+    from modules.audio_cache import AudioCache
+    audio_cache = AudioCache("audio_cache")
+    atexit.register(audio_cache.flush)  # the index is written on a timer, keep the last clips
+    return audio_cache
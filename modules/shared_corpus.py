@@ -0,0 +1,166 @@
+"""Read-only copy of the Tatoeba corpus shared by every app process.
+
+The first process to load a corpus writes its SentenceStore columns (see
+modules/sentence_store.py) into a segment file, each column 8-byte aligned
+after a small JSON table of contents. Every process, including that first
+one, then memory-maps the segment read-only and wraps the mapped columns in a
+SentenceStore. The page cache holds one copy no matter how many Streamlit
+workers attach, and sentences are only decoded when they are picked.
+
+Segments live in TONEMASTER_CORPUS_SEGMENTS (default: a per-user directory
+under the system temp dir). They are named after the source paths, and
+versioned by the size and mtime of the source files, so a new export gets a
+new segment and replaces the old one. Those names are predictable, so the
+directory must belong to the current user and be writable by nobody else,
+and a segment is only mapped when the current user owns it. Set
+TONEMASTER_SHARED_CORPUS=0 to keep the corpus in private memory instead.
+
+attach() maps a file again when it has been replaced since the last call,
+but a store already handed out keeps the mapping it was built on. App
+processes serve a refreshed corpus directory once they build a new
+PracticeManager, in practice after a restart.
+"""
+import os
+import json
+import mmap
+import stat
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Callable, List
+
+import numpy as np
+
+from modules.sentence_store import SentenceStore
+
+SEGMENT_MAGIC = b"TMSC"
+SEGMENT_VERSION = 2
+SEGMENT_HEADER = struct.Struct("<4sHI")  # magic, version, table-of-contents length
+ALIGNMENT = 8
+
+_segments = {}  # path -> (file identity, SentenceStore over the mapping), one mapping per file and process
+_segments_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.getenv("TONEMASTER_SHARED_CORPUS", "1") != "0"
+
+
+def _user_id():
+    return os.getuid() if hasattr(os, "getuid") else None
+
+
+def segment_dir() -> str:
+    default = f"tonemaster-corpus-{_user_id()}" if _user_id() is not None else "tonemaster-corpus"
+    return os.getenv("TONEMASTER_CORPUS_SEGMENTS") or os.path.join(tempfile.gettempdir(), default)
+
+
+def _private_dir(directory: str) -> None:
+    """Create the segment directory closed to other users, or refuse one another user could write into"""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode):
+        raise OSError(f"Segment directory is not a directory: {directory}")
+    if _user_id() is not None and (info.st_uid != _user_id() or info.st_mode & 0o022):
+        raise OSError(f"Segment directory is not private to this user: {directory}")
+
+
+def _check_owner(path: str) -> None:
+    info = os.lstat(path)
+    if not stat.S_ISREG(info.st_mode) or (_user_id() is not None and info.st_uid != _user_id()):
+        raise OSError(f"Segment not owned by this user: {path}")
+
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()[:16]
+
+
+def segment_name(sources: List[str], options: str = "") -> str:
+    """File name for the segment built from these source files and loader options
+
+    The first part identifies the sources, the second their current contents.
+    """
+    paths = [os.path.abspath(path) for path in sources]
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps.append([stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            stamps.append(None)
+    return f"sentences-{_digest([paths, options])}-{_digest([stamps, SEGMENT_VERSION])}.bin"
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def write_segment(path: str, store: SentenceStore) -> None:
+    """Write a store's columns as a segment, atomically replacing any file at path"""
+    toc, position = {}, 0
+    for name, column in store.columns.items():
+        toc[name] = [column.dtype.str, position, len(column)]
+        position += _aligned(column.nbytes)
+    toc_bytes = json.dumps(toc).encode("utf-8")
+    data_start = _aligned(SEGMENT_HEADER.size + len(toc_bytes))
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, len(toc_bytes)) + toc_bytes)
+        for name, column in store.columns.items():
+            f.seek(data_start + toc[name][1])
+            f.write(column.tobytes())
+        f.truncate(data_start + position)
+    os.replace(temp_path, path)
+
+
+def map_segment(path: str) -> SentenceStore:
+    """A SentenceStore whose columns are zero-copy views into the mapped segment"""
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, toc_length = SEGMENT_HEADER.unpack_from(mapping)
+    if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+        raise ValueError(f"Not a corpus segment: {path}")
+    toc = json.loads(mapping[SEGMENT_HEADER.size:SEGMENT_HEADER.size + toc_length])
+    data_start = _aligned(SEGMENT_HEADER.size + toc_length)
+    return SentenceStore({name: np.frombuffer(mapping, dtype=dtype, count=count, offset=data_start + offset)
+                          for name, (dtype, offset, count) in toc.items()})
+
+
+def attach(path: str) -> SentenceStore:
+    """The store over a segment file, mapped once per process until the file is replaced"""
+    info = os.stat(path)
+    identity = (info.st_ino, info.st_size, info.st_mtime_ns)
+    with _segments_lock:
+        entry = _segments.get(path)
+        if entry is None or entry[0] != identity:
+            entry = _segments[path] = (identity, map_segment(path))
+        return entry[1]
+
+
+def load(sources: List[str], build: Callable[[], SentenceStore], options: str = "") -> SentenceStore:
+    """The shared store for these sources, building and writing it first if needed
+
+    Falls back to the privately built store when the segment cannot be written or mapped.
+    """
+    directory = segment_dir()
+    name = segment_name(sources, options)
+    path = os.path.join(directory, name)
+    store = None
+    try:
+        _private_dir(directory)
+        if not os.path.exists(path):
+            store = build()
+            write_segment(path, store)
+            prefix = name.rsplit("-", 1)[0] + "-"
+            for other in os.listdir(directory):
+                # Segments of older exports of the same files; processes still mapping them keep their pages
+                if other.startswith(prefix) and other.endswith(".bin") and other != name:
+                    os.remove(os.path.join(directory, other))
+        _check_owner(path)
+        return attach(path)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Shared corpus unavailable, keeping a private copy: {e}")
+        return store if store is not None else build()
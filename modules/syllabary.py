@@ -1,4 +1,3 @@
-import pandas as pd
 import random
 
 class JapaneseSyllabary:
@@ -50,8 +49,69 @@ class JapaneseSyllabary:
             're': {'symbol': 'れ', 'romaji': 're'},
             'ro': {'symbol': 'ろ', 'romaji': 'ro'},
             'wa': {'symbol': 'わ', 'romaji': 'wa'},
-            'o': {'symbol': 'を', 'romaji': 'o'},
+            'wo': {'symbol': 'を', 'romaji': 'wo'},
             'n': {'symbol': 'ん', 'romaji': 'n'},
+            # Dakuten (voiced sounds)
+            'ga': {'symbol': 'が', 'romaji': 'ga'},
+            'gi': {'symbol': 'ぎ', 'romaji': 'gi'},
+            'gu': {'symbol': 'ぐ', 'romaji': 'gu'},
+            'ge': {'symbol': 'げ', 'romaji': 'ge'},
+            'go': {'symbol': 'ご', 'romaji': 'go'},
+            'za': {'symbol': 'ざ', 'romaji': 'za'},
+            'ji': {'symbol': 'じ', 'romaji': 'ji'},
+            'zu': {'symbol': 'ず', 'romaji': 'zu'},
+            'ze': {'symbol': 'ぜ', 'romaji': 'ze'},
+            'zo': {'symbol': 'ぞ', 'romaji': 'zo'},
+            'da': {'symbol': 'だ', 'romaji': 'da'},
+            'di': {'symbol': 'ぢ', 'romaji': 'ji'},
+            'du': {'symbol': 'づ', 'romaji': 'zu'},
+            'de': {'symbol': 'で', 'romaji': 'de'},
+            'do': {'symbol': 'ど', 'romaji': 'do'},
+            'ba': {'symbol': 'ば', 'romaji': 'ba'},
+            'bi': {'symbol': 'び', 'romaji': 'bi'},
+            'bu': {'symbol': 'ぶ', 'romaji': 'bu'},
+            'be': {'symbol': 'べ', 'romaji': 'be'},
+            'bo': {'symbol': 'ぼ', 'romaji': 'bo'},
+            # Handakuten (semi-voiced sounds)
+            'pa': {'symbol': 'ぱ', 'romaji': 'pa'},
+            'pi': {'symbol': 'ぴ', 'romaji': 'pi'},
+            'pu': {'symbol': 'ぷ', 'romaji': 'pu'},
+            'pe': {'symbol': 'ぺ', 'romaji': 'pe'},
+            'po': {'symbol': 'ぽ', 'romaji': 'po'},
+            # Yoon (contracted sounds)
+            'kya': {'symbol': 'きゃ', 'romaji': 'kya'},
+            'kyu': {'symbol': 'きゅ', 'romaji': 'kyu'},
+            'kyo': {'symbol': 'きょ', 'romaji': 'kyo'},
+            'gya': {'symbol': 'ぎゃ', 'romaji': 'gya'},
+            'gyu': {'symbol': 'ぎゅ', 'romaji': 'gyu'},
+            'gyo': {'symbol': 'ぎょ', 'romaji': 'gyo'},
+            'sha': {'symbol': 'しゃ', 'romaji': 'sha'},
+            'shu': {'symbol': 'しゅ', 'romaji': 'shu'},
+            'sho': {'symbol': 'しょ', 'romaji': 'sho'},
+            'ja': {'symbol': 'じゃ', 'romaji': 'ja'},
+            'ju': {'symbol': 'じゅ', 'romaji': 'ju'},
+            'jo': {'symbol': 'じょ', 'romaji': 'jo'},
+            'cha': {'symbol': 'ちゃ', 'romaji': 'cha'},
+            'chu': {'symbol': 'ちゅ', 'romaji': 'chu'},
+            'cho': {'symbol': 'ちょ', 'romaji': 'cho'},
+            'nya': {'symbol': 'にゃ', 'romaji': 'nya'},
+            'nyu': {'symbol': 'にゅ', 'romaji': 'nyu'},
+            'nyo': {'symbol': 'にょ', 'romaji': 'nyo'},
+            'hya': {'symbol': 'ひゃ', 'romaji': 'hya'},
+            'hyu': {'symbol': 'ひゅ', 'romaji': 'hyu'},
+            'hyo': {'symbol': 'ひょ', 'romaji': 'hyo'},
+            'bya': {'symbol': 'びゃ', 'romaji': 'bya'},
+            'byu': {'symbol': 'びゅ', 'romaji': 'byu'},
+            'byo': {'symbol': 'びょ', 'romaji': 'byo'},
+            'pya': {'symbol': 'ぴゃ', 'romaji': 'pya'},
+            'pyu': {'symbol': 'ぴゅ', 'romaji': 'pyu'},
+            'pyo': {'symbol': 'ぴょ', 'romaji': 'pyo'},
+            'mya': {'symbol': 'みゃ', 'romaji': 'mya'},
+            'myu': {'symbol': 'みゅ', 'romaji': 'myu'},
+            'myo': {'symbol': 'みょ', 'romaji': 'myo'},
+            'rya': {'symbol': 'りゃ', 'romaji': 'rya'},
+            'ryu': {'symbol': 'りゅ', 'romaji': 'ryu'},
+            'ryo': {'symbol': 'りょ', 'romaji': 'ryo'},
         }
         
         # Initialize katakana
@@ -102,20 +162,93 @@ class JapaneseSyllabary:
             'wa': {'symbol': 'ワ', 'romaji': 'wa'},
             'wo': {'symbol': 'ヲ', 'romaji': 'wo'},
             'n': {'symbol': 'ン', 'romaji': 'n'},
-            # Add more katakana characters as needed
+            # Dakuten (voiced sounds)
+            'ga': {'symbol': 'ガ', 'romaji': 'ga'},
+            'gi': {'symbol': 'ギ', 'romaji': 'gi'},
+            'gu': {'symbol': 'グ', 'romaji': 'gu'},
+            'ge': {'symbol': 'ゲ', 'romaji': 'ge'},
+            'go': {'symbol': 'ゴ', 'romaji': 'go'},
+            'za': {'symbol': 'ザ', 'romaji': 'za'},
+            'ji': {'symbol': 'ジ', 'romaji': 'ji'},
+            'zu': {'symbol': 'ズ', 'romaji': 'zu'},
+            'ze': {'symbol': 'ゼ', 'romaji': 'ze'},
+            'zo': {'symbol': 'ゾ', 'romaji': 'zo'},
+            'da': {'symbol': 'ダ', 'romaji': 'da'},
+            'di': {'symbol': 'ヂ', 'romaji': 'ji'},
+            'du': {'symbol': 'ヅ', 'romaji': 'zu'},
+            'de': {'symbol': 'デ', 'romaji': 'de'},
+            'do': {'symbol': 'ド', 'romaji': 'do'},
+            'ba': {'symbol': 'バ', 'romaji': 'ba'},
+            'bi': {'symbol': 'ビ', 'romaji': 'bi'},
+            'bu': {'symbol': 'ブ', 'romaji': 'bu'},
+            'be': {'symbol': 'ベ', 'romaji': 'be'},
+            'bo': {'symbol': 'ボ', 'romaji': 'bo'},
+            # Handakuten (semi-voiced sounds)
+            'pa': {'symbol': 'パ', 'romaji': 'pa'},
+            'pi': {'symbol': 'ピ', 'romaji': 'pi'},
+            'pu': {'symbol': 'プ', 'romaji': 'pu'},
+            'pe': {'symbol': 'ペ', 'romaji': 'pe'},
+            'po': {'symbol': 'ポ', 'romaji': 'po'},
+            # Yoon (contracted sounds)
+            'kya': {'symbol': 'キャ', 'romaji': 'kya'},
+            'kyu': {'symbol': 'キュ', 'romaji': 'kyu'},
+            'kyo': {'symbol': 'キョ', 'romaji': 'kyo'},
+            'gya': {'symbol': 'ギャ', 'romaji': 'gya'},
+            'gyu': {'symbol': 'ギュ', 'romaji': 'gyu'},
+            'gyo': {'symbol': 'ギョ', 'romaji': 'gyo'},
+            'sha': {'symbol': 'シャ', 'romaji': 'sha'},
+            'shu': {'symbol': 'シュ', 'romaji': 'shu'},
+            'sho': {'symbol': 'ショ', 'romaji': 'sho'},
+            'ja': {'symbol': 'ジャ', 'romaji': 'ja'},
+            'ju': {'symbol': 'ジュ', 'romaji': 'ju'},
+            'jo': {'symbol': 'ジョ', 'romaji': 'jo'},
+            'cha': {'symbol': 'チャ', 'romaji': 'cha'},
+            'chu': {'symbol': 'チュ', 'romaji': 'chu'},
+            'cho': {'symbol': 'チョ', 'romaji': 'cho'},
+            'nya': {'symbol': 'ニャ', 'romaji': 'nya'},
+            'nyu': {'symbol': 'ニュ', 'romaji': 'nyu'},
+            'nyo': {'symbol': 'ニョ', 'romaji': 'nyo'},
+            'hya': {'symbol': 'ヒャ', 'romaji': 'hya'},
+            'hyu': {'symbol': 'ヒュ', 'romaji': 'hyu'},
+            'hyo': {'symbol': 'ヒョ', 'romaji': 'hyo'},
+            'bya': {'symbol': 'ビャ', 'romaji': 'bya'},
+            'byu': {'symbol': 'ビュ', 'romaji': 'byu'},
+            'byo': {'symbol': 'ビョ', 'romaji': 'byo'},
+            'pya': {'symbol': 'ピャ', 'romaji': 'pya'},
+            'pyu': {'symbol': 'ピュ', 'romaji': 'pyu'},
+            'pyo': {'symbol': 'ピョ', 'romaji': 'pyo'},
+            'mya': {'symbol': 'ミャ', 'romaji': 'mya'},
+            'myu': {'symbol': 'ミュ', 'romaji': 'myu'},
+            'myo': {'symbol': 'ミョ', 'romaji': 'myo'},
+            'rya': {'symbol': 'リャ', 'romaji': 'rya'},
+            'ryu': {'symbol': 'リュ', 'romaji': 'ryu'},
+            'ryo': {'symbol': 'リョ', 'romaji': 'ryo'},
+        }
+        
+        # Small marks that modify the surrounding kana rather than standing alone
+        self.marks = {
+            'hiragana': {'sokuon': 'っ'},
+            'katakana': {'sokuon': 'ッ', 'long_vowel': 'ー'},
         }
         
         # Define the syllabary structure for display
         self.structure = {
             'vowels': ['a', 'i', 'u', 'e', 'o'],
-            'consonants': ['k', 's', 't', 'n', 'h', 'm', 'y', 'r', 'w']
+            'consonants': ['k', 's', 't', 'n', 'h', 'm', 'y', 'r', 'w', 'g', 'z', 'd', 'b', 'p'],
+            'yoon_vowels': ['a', 'u', 'o'],
+            'yoon_consonants': ['ky', 'gy', 'sh', 'j', 'ch', 'ny', 'hy', 'by', 'py', 'my', 'ry']
         }
+        
+        # Chart cells are laid out by consonant row, but keys use Hepburn spelling
+        self.chart_keys = {'si': 'shi', 'ti': 'chi', 'tu': 'tsu', 'hu': 'fu', 'zi': 'ji'}
     
     def get_chart(self, syllabary_type):
         """Generate a chart for the specified syllabary type"""
         if syllabary_type not in ['hiragana', 'katakana']:
             raise ValueError("Syllabary type must be 'hiragana' or 'katakana'")
             
+        import pandas as pd  # Deferred to keep import of this module cheap
+        
         data = self.hiragana if syllabary_type == 'hiragana' else self.katakana
         
         # Create a DataFrame for display
@@ -124,6 +257,7 @@ class JapaneseSyllabary:
             row = [consonant.upper()] if consonant else ['']
             for vowel in self.structure['vowels']:
                 key = f"{consonant}{vowel}" if consonant else vowel
+                key = self.chart_keys.get(key, key)
                 if key in data:
                     row.append(f"{data[key]['symbol']} ({data[key]['romaji']})")
                 else:
@@ -131,6 +265,25 @@ class JapaneseSyllabary:
             chart_data.append(row)
             
         return pd.DataFrame(chart_data, columns=[''] + self.structure['vowels'])
+    
+    def get_yoon_chart(self, syllabary_type):
+        """Generate a chart of the contracted (yoon) sounds for the specified syllabary type"""
+        if syllabary_type not in ['hiragana', 'katakana']:
+            raise ValueError("Syllabary type must be 'hiragana' or 'katakana'")
+            
+        import pandas as pd  # Deferred to keep import of this module cheap
+        
+        data = self.hiragana if syllabary_type == 'hiragana' else self.katakana
+        
+        chart_data = []
+        for consonant in self.structure['yoon_consonants']:
+            row = [consonant.upper()]
+            for vowel in self.structure['yoon_vowels']:
+                key = f"{consonant}{vowel}"
+                row.append(f"{data[key]['symbol']} ({data[key]['romaji']})" if key in data else '')
+            chart_data.append(row)
+            
+        return pd.DataFrame(chart_data, columns=[''] + self.structure['yoon_vowels'])
         
     def get_random_character(self, syllabary_type):
         """Get a random character from the specified syllabary"""
@@ -0,0 +1,273 @@
+"""Theme to vocabulary inverted index, mined offline from the corpus.
+
+Build it from the repository root with:
+
+    python -m modules.theme_index --output theme_index.npz
+"""
+import os
+import re
+import argparse
+from typing import List, Dict, Iterable, Tuple
+
+import numpy as np
+
+from modules.corpus_files import find_translation_file, read_translation_pairs
+
+# Seed words per theme: Japanese seeds match corpus sentences, translation seeds match
+# their Chinese (Tatoeba pairs) or English (cached LLM examples) translations
+THEME_SEEDS = {
+    "anime": {"ja": ["アニメ", "漫画", "まんが", "マンガ", "キャラクター", "声優"],
+              "translation": ["动画", "漫画", "anime", "manga", "cartoon"]},
+    "food": {"ja": ["料理", "すし", "寿司", "ラーメン", "レストラン", "ご飯", "おいしい"],
+             "translation": ["美味", "食物", "饭", "food", "eat", "restaurant"]},
+    "travel": {"ja": ["旅行", "りょこう", "電車", "でんしゃ", "ホテル", "空港", "切符"],
+               "translation": ["旅游", "火车", "travel", "trip", "train", "hotel"]},
+    "music": {"ja": ["音楽", "ピアノ", "ギター", "コンサート", "歌手"],
+              "translation": ["音乐", "唱歌", "music", "song", "piano"]},
+    "sports": {"ja": ["スポーツ", "野球", "サッカー", "テニス", "試合"],
+               "translation": ["运动", "足球", "sport", "soccer", "baseball"]},
+    "school": {"ja": ["学校", "先生", "学生", "勉強", "宿題", "試験", "授業"],
+               "translation": ["学校", "老师", "school", "teacher", "student"]},
+    "family": {"ja": ["家族", "両親", "父親", "母親", "兄弟", "子供"],
+               "translation": ["家人", "family", "mother", "father"]},
+    "work": {"ja": ["仕事", "会社", "会議", "社長", "給料"],
+             "translation": ["工作", "公司", "work", "job", "office"]},
+    "weather": {"ja": ["天気", "台風", "雨", "雪", "晴れ"],
+                "translation": ["天气", "weather", "rain", "snow"]},
+    "animals": {"ja": ["動物", "いぬ", "ねこ", "犬", "猫"],
+                "translation": ["动物", "狗", "animal", "dog", "cat"]},
+    "shopping": {"ja": ["買い物", "デパート", "スーパー", "値段", "お金"],
+                 "translation": ["买", "商店", "shop", "buy", "price"]},
+    "health": {"ja": ["病院", "医者", "病気", "風邪", "健康"],
+               "translation": ["医院", "医生", "hospital", "doctor", "sick"]}
+}
+
+# Meanings for common seed words, shown next to them in vocabulary lists
+SEED_GLOSSES = {
+    "まんが": "manga", "アニメ": "anime", "キャラクター": "character", "すし": "sushi",
+    "ラーメン": "ramen", "でんしゃ": "train", "ホテル": "hotel", "りょこう": "trip",
+    "料理": "cooking", "旅行": "travel", "音楽": "music", "学校": "school", "家族": "family",
+    "仕事": "work", "天気": "weather", "動物": "animal", "病院": "hospital", "買い物": "shopping"
+}
+
+# Katakana loanwords and kanji compounds are the vocabulary we can mine without a tokenizer
+_TERM_PATTERN = re.compile(r"[ァ-ヺ][ァ-ヺー]+|[一-鿿々]{2,}")
+
+
+def extract_terms(text: str, lexicon: Iterable[str] = ()) -> List[str]:
+    """Extract candidate vocabulary from a Japanese sentence"""
+    terms = set(_TERM_PATTERN.findall(text))
+    terms.update(word for word in lexicon if word in text)
+    return list(terms)
+
+
+class ThemeIndex:
+    """Ranked vocabulary per theme, stored as a CSR-style inverted index
+
+    Every theme owns a slice of one term-id array and one score array, sorted
+    by score, so top-k is a slice. Term postings (term -> sentences) are kept
+    as well so new themes can be added without re-reading the corpus.
+    """
+
+    def __init__(self, max_terms_per_theme: int = 200):
+        """Initialize an empty index"""
+        self.max_terms_per_theme = max_terms_per_theme
+        self.terms = []  # term id -> term text
+        self.term_ids = {}
+        self.glosses = dict(SEED_GLOSSES)  # term -> short meaning, when one is known
+        self.themes = {}  # theme -> (term ids, scores), sorted by descending score
+        self.postings = np.zeros(0, dtype=np.int32)  # sentence ids, grouped by term
+        self.postings_offsets = np.zeros(1, dtype=np.int64)
+        self.doc_frequency = np.zeros(0, dtype=np.int32)
+        self.num_docs = 0
+
+    def _term_id(self, term: str) -> int:
+        if term not in self.term_ids:
+            self.term_ids[term] = len(self.terms)
+            self.terms.append(term)
+        return self.term_ids[term]
+
+    def build(self, documents: List[Tuple[str, str]], theme_seeds: Dict[str, Dict[str, List[str]]] = None,
+              lexicon: Iterable[str] = ()) -> None:
+        """Build postings from (japanese, translation) documents and rank every seeded theme"""
+        lexicon = [word for word in lexicon if len(word) > 1]  # single kana match everywhere
+        doc_column, term_column = [], []
+        for doc, (japanese, _) in enumerate(documents):
+            for term in extract_terms(japanese, lexicon):
+                doc_column.append(doc)
+                term_column.append(self._term_id(term))
+
+        self.num_docs = len(documents)
+        docs = np.asarray(doc_column, dtype=np.int32)
+        term_ids = np.asarray(term_column, dtype=np.int32)
+
+        # Sort pairs by term to get contiguous postings per term
+        order = np.argsort(term_ids, kind="stable")
+        self.postings = docs[order]
+        self.doc_frequency = np.bincount(term_ids, minlength=len(self.terms)).astype(np.int32)
+        self.postings_offsets = np.concatenate([[0], np.cumsum(self.doc_frequency)]).astype(np.int64)
+
+        translations = [translation.lower() for _, translation in documents]
+        for theme, seeds in (theme_seeds or THEME_SEEDS).items():
+            mask = np.zeros(self.num_docs, dtype=bool)
+            lowered = [seed.lower() for seed in seeds.get("translation", [])]
+            if lowered:
+                matched = [i for i, text in enumerate(translations) if any(seed in text for seed in lowered)]
+                mask[matched] = True
+            self.add_theme(theme, seeds.get("ja", []), extra_mask=mask)
+
+    def _docs_for_term(self, term: str) -> np.ndarray:
+        term_id = self.term_ids.get(term)
+        if term_id is None or term_id >= len(self.doc_frequency):
+            return np.zeros(0, dtype=np.int32)
+        return self.postings[self.postings_offsets[term_id]:self.postings_offsets[term_id + 1]]
+
+    def add_theme(self, theme: str, seeds: List[str], extra_mask: np.ndarray = None) -> int:
+        """Rank vocabulary for a theme from sentences containing its Japanese seed terms"""
+        mask = np.zeros(self.num_docs, dtype=bool) if extra_mask is None else extra_mask.copy()
+        for seed in seeds:
+            mask[self._docs_for_term(seed)] = True
+
+        # Seeds may be new terms, so register them before sizing the score array
+        seed_ids = [self._term_id(seed) for seed in seeds]
+        scores = np.zeros(len(self.terms), dtype=np.float32)
+
+        num_indexed = len(self.doc_frequency)
+        if mask.any() and num_indexed:
+            # tf-idf of each indexed term within the theme's sentences
+            term_of_posting = np.repeat(np.arange(num_indexed), self.doc_frequency)
+            tf = np.bincount(term_of_posting[mask[self.postings]], minlength=num_indexed).astype(np.float32)
+            idf = np.log((self.num_docs + 1) / (self.doc_frequency.astype(np.float32) + 1))
+            tf_idf = tf * idf
+
+            # Keep terms that are over-represented in the theme; one-off co-occurrences are noise
+            lift = (tf / mask.sum()) / np.maximum(self.doc_frequency / self.num_docs, 1e-9)
+            tf_idf[(tf < 2) | (lift < 3)] = 0
+            scores[:num_indexed] = tf_idf
+
+        # Seed words always lead their theme, in the order given
+        top = float(scores.max()) if len(scores) else 0.0
+        for rank, term_id in enumerate(seed_ids):
+            scores[term_id] = max(scores[term_id], top + len(seed_ids) - rank)
+
+        self._set_theme(theme, scores)
+        return len(self.themes[theme.lower()][0])
+
+    def add_terms(self, theme: str, terms: Dict[str, float], glosses: Dict[str, str] = None) -> None:
+        """Merge scored terms into a theme, e.g. vocabulary from cached LLM output"""
+        theme = theme.lower()
+        ids, scores = self.themes.get(theme, (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)))
+        merged = dict(zip(ids.tolist(), scores.tolist()))
+        for term, score in terms.items():
+            term_id = self._term_id(term)
+            merged[term_id] = max(merged.get(term_id, 0.0), float(score))
+        self.glosses.update(glosses or {})
+
+        dense = np.zeros(len(self.terms), dtype=np.float32)
+        dense[list(merged)] = list(merged.values())
+        self._set_theme(theme, dense)
+
+    def _set_theme(self, theme: str, scores: np.ndarray) -> None:
+        candidates = np.flatnonzero(scores > 0)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")][:self.max_terms_per_theme]
+        self.themes[theme.lower()] = (order.astype(np.int32), scores[order].astype(np.float32))
+
+    def top_k(self, theme: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Get the k best (term, score) pairs for a theme"""
+        entry = self.themes.get(theme.lower())
+        if entry is None:
+            return []
+        ids, scores = entry
+        return [(self.terms[i], float(s)) for i, s in zip(ids[:k], scores[:k])]
+
+    def format_term(self, term: str) -> str:
+        """Format a term with its gloss, matching the 'すし (sushi)' display style"""
+        gloss = self.glosses.get(term)
+        return f"{term} ({gloss})" if gloss else term
+
+    def save(self, path: str) -> None:
+        """Save the index as a single compressed .npz file"""
+        names = sorted(self.themes)
+        theme_offsets = np.concatenate([[0], np.cumsum([len(self.themes[n][0]) for n in names])]).astype(np.int64)
+        np.savez_compressed(
+            path,
+            terms=np.array(self.terms, dtype=object).astype(str),
+            gloss_terms=np.array(list(self.glosses), dtype=str),
+            gloss_values=np.array(list(self.glosses.values()), dtype=str),
+            theme_names=np.array(names, dtype=str),
+            theme_offsets=theme_offsets,
+            theme_term_ids=np.concatenate([self.themes[n][0] for n in names] or [np.zeros(0, np.int32)]),
+            theme_scores=np.concatenate([self.themes[n][1] for n in names] or [np.zeros(0, np.float32)]),
+            postings=self.postings,
+            postings_offsets=self.postings_offsets,
+            doc_frequency=self.doc_frequency,
+            num_docs=np.int64(self.num_docs),
+            max_terms_per_theme=np.int64(self.max_terms_per_theme)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ThemeIndex":
+        """Load an index saved with save()"""
+        with np.load(path, allow_pickle=False) as data:
+            index = cls(int(data["max_terms_per_theme"]))
+            index.terms = data["terms"].tolist()
+            index.term_ids = {term: i for i, term in enumerate(index.terms)}
+            index.glosses = dict(zip(data["gloss_terms"].tolist(), data["gloss_values"].tolist()))
+            offsets = data["theme_offsets"]
+            ids, scores = data["theme_term_ids"], data["theme_scores"]
+            for i, name in enumerate(data["theme_names"].tolist()):
+                index.themes[name] = (ids[offsets[i]:offsets[i + 1]], scores[offsets[i]:offsets[i + 1]])
+            index.postings = data["postings"]
+            index.postings_offsets = data["postings_offsets"]
+            index.doc_frequency = data["doc_frequency"]
+            index.num_docs = int(data["num_docs"])
+        return index
+
+
+def build_default_index(base_dir: str = None, example_store=None, vocabulary: Dict = None) -> ThemeIndex:
+    """Build the theme index from the Tatoeba pairs, cached LLM examples and built-in vocabulary"""
+    documents = []
+    seen_ids = set()
+    pair_path = find_translation_file("zh", base_dir)
+    if pair_path:
+        for jp_id, jp_text, _, zh_text in read_translation_pairs(pair_path):
+            if jp_id not in seen_ids:
+                seen_ids.add(jp_id)
+                documents.append((jp_text, zh_text))
+    if example_store is not None:
+        documents.extend((record.japanese, record.english) for record in example_store.all())
+
+    lexicon = set()
+    for seeds in THEME_SEEDS.values():
+        lexicon.update(seeds["ja"])
+    for words in (vocabulary or {}).values():
+        lexicon.update(words)
+
+    index = ThemeIndex()
+    index.build(documents, THEME_SEEDS, lexicon)
+
+    # Built-in vocabulary categories become themes of their own, with glosses
+    for category, words in (vocabulary or {}).items():
+        index.add_terms(category, {word: 1.0 for word in words},
+                        {word: data["meaning"] for word, data in words.items()})
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the themed vocabulary index")
+    parser.add_argument("--output", default="theme_index.npz")
+    args = parser.parse_args()
+
+    from modules.examples import ExampleStore
+    from modules.practice_manager import PracticeManager
+    example_path = "example_sentences.json"
+    example_store = ExampleStore(example_path) if os.path.exists(example_path) else None
+    index = build_default_index(example_store=example_store, vocabulary=PracticeManager().vocabulary)
+    index.save(args.output)
+    print(f"Indexed {len(index.terms)} terms over {index.num_docs} sentences into {len(index.themes)} themes")
+    for theme in sorted(index.themes):
+        print(f"  {theme}: {', '.join(term for term, _ in index.top_k(theme, 8))}")
+
+
+if __name__ == "__main__":
+    main()
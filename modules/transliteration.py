@@ -0,0 +1,317 @@
+"""Romaji <-> kana transliteration over compiled tries.
+
+Both directions are a single greedy longest-match scan over a trie whose
+nodes are compiled into flat transition tables. Kana tables come from
+JapaneseSyllabary; Kunrei-shiki spellings are derived from the Hepburn ones.
+
+Transliterate the corpus to romaji from the repository root with:
+
+    python -m modules.transliteration --output corpus_romaji.tsv
+"""
+import re
+import csv
+import argparse
+from typing import List, Dict, Iterable, Optional, Tuple
+
+from modules.corpus_files import find_translation_file, read_translation_pairs
+from modules.syllabary import JapaneseSyllabary
+
+SYSTEMS = ["hepburn", "kunrei"]
+SCRIPTS = ["hiragana", "katakana"]
+
+VOWELS = "aeiou"
+SOKUON = {"っ", "ッ"}
+# A sokuon with no consonant to double (at the end, before a vowel or n) is written as an apostrophe
+SOKUON_MARK = "'"
+LONG_VOWEL_MARK = "ー"
+
+# Katakana sits exactly 0x60 code points above hiragana
+KATAKANA_OFFSET = 0x60
+
+# Hepburn -> Kunrei-shiki spelling changes, applied to the start of a syllable
+KUNREI_RULES = [
+    (re.compile(r"^shi"), "si"), (re.compile(r"^sh"), "sy"),
+    (re.compile(r"^chi"), "ti"), (re.compile(r"^ch"), "ty"),
+    (re.compile(r"^tsu"), "tu"), (re.compile(r"^fu"), "hu"),
+    (re.compile(r"^ji"), "zi"), (re.compile(r"^j"), "zy"),
+    (re.compile(r"^wo$"), "o"),
+]
+
+# Kana outside the learning tables: small kana, vu and the loanword combinations. ティ, ディ, トゥ
+# and ドゥ are spelled the way IMEs type them, so they stay apart from ち, ぢ, つ and づ
+EXTRA_KANA = {
+    "ぁ": "a", "ぃ": "i", "ぅ": "u", "ぇ": "e", "ぉ": "o",
+    "ゃ": "ya", "ゅ": "yu", "ょ": "yo", "ゎ": "wa",
+    "ゔ": "vu", "ゔぁ": "va", "ゔぃ": "vi", "ゔぇ": "ve", "ゔぉ": "vo",
+    "ふぁ": "fa", "ふぃ": "fi", "ふぇ": "fe", "ふぉ": "fo",
+    "てぃ": "thi", "でぃ": "dhi", "とぅ": "twu", "どぅ": "dwu",
+    "しぇ": "she", "じぇ": "je", "ちぇ": "che",
+    "うぃ": "wi", "うぇ": "we", "うぉ": "wo",
+}
+
+# Romaji spellings that are accepted as input but never produced as output
+EXTRA_ROMAJI = {
+    "xa": "ぁ", "xi": "ぃ", "xu": "ぅ", "xe": "ぇ", "xo": "ぉ",
+    "la": "ぁ", "li": "ぃ", "lu": "ぅ", "le": "ぇ", "lo": "ぉ",
+    "xya": "ゃ", "xyu": "ゅ", "xyo": "ょ", "lya": "ゃ", "lyu": "ゅ", "lyo": "ょ",
+    "xtu": "っ", "xtsu": "っ", "ltu": "っ", "ltsu": "っ",
+    "jya": "じゃ", "jyu": "じゅ", "jyo": "じょ",
+    "cya": "ちゃ", "cyu": "ちゅ", "cyo": "ちょ",
+    "nn": "ん", "n'": "ん", "-": "ー", SOKUON_MARK: "っ",
+    "di": "ぢ", "du": "づ",  # Nihon-shiki
+}
+
+# Macron and circumflex long vowels, spelled out for hiragana or marked with ー for katakana
+LONG_VOWELS = {
+    "ā": "a", "ī": "i", "ū": "u", "ē": "e", "ō": "o",
+    "â": "a", "î": "i", "û": "u", "ê": "e", "ô": "o",
+}
+HIRAGANA_LENGTHENING = {"a": "a", "i": "i", "u": "u", "e": "e", "o": "u"}
+
+# Separates texts in a batch; it never appears in either trie
+BATCH_SEPARATOR = "\x00"
+
+
+def to_katakana(text: str) -> str:
+    """Shift hiragana to katakana, leaving everything else as is"""
+    return "".join(chr(ord(c) + KATAKANA_OFFSET) if "ぁ" <= c <= "ゖ" else c for c in text)
+
+
+def to_kunrei(romaji: str) -> str:
+    """Respell one Hepburn syllable in Kunrei-shiki"""
+    for pattern, replacement in KUNREI_RULES:
+        romaji, count = pattern.subn(replacement, romaji)
+        if count:
+            break
+    return romaji
+
+
+class CompiledTrie:
+    """Trie over string keys, compiled to one transition dict and one output per state"""
+
+    def __init__(self, mapping: Dict[str, str]):
+        """Build the trie; when two keys collide the first one wins"""
+        self.transitions = [{}]
+        self.outputs = [None]
+        for key, value in mapping.items():
+            state = 0
+            for char in key:
+                next_state = self.transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][char] = next_state
+                    self.transitions.append({})
+                    self.outputs.append(None)
+                state = next_state
+            if self.outputs[state] is None:
+                self.outputs[state] = value
+
+    def __len__(self) -> int:
+        return len(self.transitions)
+
+    def longest_match(self, text: str, start: int) -> Tuple[int, Optional[str]]:
+        """Get (end, output) of the longest key starting at start, or (start, None)"""
+        transitions, outputs = self.transitions, self.outputs
+        best_end, best = start, None
+        state = 0
+        for i in range(start, len(text)):
+            state = transitions[state].get(text[i])
+            if state is None:
+                break
+            if outputs[state] is not None:
+                best_end, best = i + 1, outputs[state]
+        return best_end, best
+
+
+class Transliterator:
+    """Romaji <-> kana conversion for Hepburn and Kunrei-shiki spellings"""
+
+    def __init__(self, syllabary: JapaneseSyllabary = None):
+        """Compile the tries from the syllabary tables"""
+        syllabary = syllabary or JapaneseSyllabary()
+
+        # Kana -> romaji, one trie per output system (katakana shares the trie)
+        hepburn = {}
+        for script in SCRIPTS:
+            data = syllabary.hiragana if script == "hiragana" else syllabary.katakana
+            for entry in data.values():
+                hepburn.setdefault(entry["symbol"], entry["romaji"])
+        for kana, romaji in EXTRA_KANA.items():
+            hepburn.setdefault(kana, romaji)
+            hepburn.setdefault(to_katakana(kana), romaji)
+        # Kunrei-shiki has no loanword spellings, so those keep their Hepburn form
+        loanwords = set(EXTRA_KANA) | {to_katakana(kana) for kana in EXTRA_KANA}
+        self.kana_tries = {
+            "hepburn": CompiledTrie(hepburn),
+            "kunrei": CompiledTrie({kana: romaji if kana in loanwords else to_kunrei(romaji)
+                                    for kana, romaji in hepburn.items()}),
+        }
+
+        # Romaji -> kana accepts Hepburn, Kunrei and Nihon-shiki spellings. What to_romaji produces
+        # reads back to the same kana, except where two kana share a spelling: ぢ/づ (Hepburn ji/zu),
+        # を in Kunrei-shiki (o), うぉ (wo, read back as を), small kana written alone, and a
+        # repeated vowel, which comes back spelled out in hiragana (らーめん) and as ー in katakana (アア)
+        self.romaji_tries = {}
+        for script in SCRIPTS:
+            data = syllabary.hiragana if script == "hiragana" else syllabary.katakana
+            spellings = {}
+            for entry in data.values():
+                spellings.setdefault(entry["romaji"], entry["symbol"])
+                spellings.setdefault(to_kunrei(entry["romaji"]), entry["symbol"])
+            for kana, romaji in EXTRA_KANA.items():
+                spellings.setdefault(romaji, kana if script == "hiragana" else to_katakana(kana))
+            for romaji, kana in EXTRA_ROMAJI.items():
+                spellings.setdefault(romaji, kana if script == "hiragana" else to_katakana(kana))
+            self.romaji_tries[script] = CompiledTrie(spellings)
+
+        self.sokuon = {script: marks["sokuon"] for script, marks in syllabary.marks.items()}
+
+    def to_romaji(self, text: str, system: str = "hepburn") -> str:
+        """Transliterate kana in text to romaji; other characters pass through"""
+        if system not in self.kana_tries:
+            raise ValueError(f"System must be one of {SYSTEMS}")
+        trie = self.kana_tries[system]
+        out = []
+        i, length = 0, len(text)
+        double_next = False
+
+        def mark_sokuon():
+            if out and out[-1] == "n":
+                out[-1] = "n'"  # so the mark is not read as the end of n'
+            out.append(SOKUON_MARK)
+
+        while i < length:
+            char = text[i]
+            if char in SOKUON:
+                if double_next:
+                    mark_sokuon()
+                double_next = True
+                i += 1
+                continue
+            if char == LONG_VOWEL_MARK and out and out[-1] and out[-1][-1] in VOWELS:
+                out.append(out[-1][-1])
+                i += 1
+                continue
+
+            end, romaji = trie.longest_match(text, i)
+            if romaji is None:
+                if double_next:
+                    mark_sokuon()
+                out.append(char)
+                i += 1
+                double_next = False
+                continue
+
+            if double_next:
+                if romaji[0] in VOWELS + "n":
+                    mark_sokuon()
+                else:
+                    # Hepburn writes a geminated ch as tch (matcha), Kunrei doubles the t (mattya)
+                    romaji = ("t" + romaji) if romaji.startswith("ch") else romaji[0] + romaji
+            double_next = False
+            # Keep syllabic n apart from a following vowel or y (kan'i, not kani)
+            if out and out[-1] == "n" and text[i - 1] in ("ん", "ン") and romaji[0] in VOWELS + "y":
+                out[-1] = "n'"
+            out.append(romaji)
+            i = end
+        if double_next:
+            mark_sokuon()
+        return "".join(out)
+
+    def to_kana(self, romaji: str, script: str = "hiragana") -> str:
+        """Transliterate romaji to kana, accepting Hepburn and Kunrei spellings"""
+        if script not in self.romaji_tries:
+            raise ValueError(f"Script must be one of {SCRIPTS}")
+        trie = self.romaji_tries[script]
+        text = self._expand_long_vowels(romaji.lower(), script)
+        sokuon = self.sokuon[script]
+        out = []
+        i, length = 0, len(text)
+        last_vowel = None  # vowel the previous kana ends in; katakana writes it again as ー
+        while i < length:
+            char = text[i]
+            following = text[i + 1] if i + 1 < length else ""
+            # Doubled consonants (and the tch of Hepburn) mark a sokuon
+            if "a" <= char <= "z" and char not in VOWELS and char != "n" and (
+                    following == char or (char == "t" and following == "c")):
+                out.append(sokuon)
+                i += 1
+                last_vowel = None
+                continue
+            # nn before a vowel is n + na-row (konnichiwa), not a doubled n
+            if char == "n" and following == "n" and i + 2 < length and text[i + 2] in VOWELS + "y":
+                out.append(trie.outputs[trie.transitions[0]["n"]])
+                i += 1
+                last_vowel = None
+                continue
+
+            end, kana = trie.longest_match(text, i)
+            if kana is None:
+                out.append(char)
+                i += 1
+                last_vowel = None
+            else:
+                if script == "katakana" and end == i + 1 and char == last_vowel:
+                    kana = LONG_VOWEL_MARK
+                out.append(kana)
+                last_vowel = text[end - 1] if text[end - 1] in VOWELS else None
+                i = end
+        return "".join(out)
+
+    @staticmethod
+    def _expand_long_vowels(text: str, script: str) -> str:
+        if not any(char in LONG_VOWELS for char in text):
+            return text
+        expanded = []
+        for char in text:
+            vowel = LONG_VOWELS.get(char)
+            if vowel is None:
+                expanded.append(char)
+            elif script == "katakana":
+                expanded.append(vowel + "-")
+            else:
+                expanded.append(vowel + HIRAGANA_LENGTHENING[vowel])
+        return "".join(expanded)
+
+    def romanize_many(self, texts: Iterable[str], system: str = "hepburn") -> List[str]:
+        """Transliterate many texts in one pass over their concatenation"""
+        texts = [text.replace(BATCH_SEPARATOR, "") for text in texts]
+        if not texts:
+            return []
+        return self.to_romaji(BATCH_SEPARATOR.join(texts), system).split(BATCH_SEPARATOR)
+
+
+def romanize_corpus(path: str, system: str = "hepburn",
+                    transliterator: Transliterator = None) -> List[Tuple[int, str, str]]:
+    """Transliterate every Japanese sentence of a pair file to (jp_id, japanese, romaji)
+
+    Only kana is converted; kanji has no reading data here and passes through.
+    """
+    sentences = {}
+    for jp_id, jp_text, _, _ in read_translation_pairs(path):
+        sentences.setdefault(jp_id, jp_text)
+    transliterator = transliterator or Transliterator()
+    ids = list(sentences)
+    romaji = transliterator.romanize_many((sentences[jp_id] for jp_id in ids), system)
+    return [(jp_id, sentences[jp_id], text) for jp_id, text in zip(ids, romaji)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transliterate the Japanese corpus to romaji")
+    parser.add_argument("--input", default=None, help="Pair file, defaults to the newest jp-zh export")
+    parser.add_argument("--output", default="corpus_romaji.tsv")
+    parser.add_argument("--system", choices=SYSTEMS, default="hepburn")
+    args = parser.parse_args()
+
+    path = args.input or find_translation_file()
+    if path is None:
+        parser.error("No corpus pair file found")
+    rows = romanize_corpus(path, args.system)
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar="\\")
+        writer.writerows(rows)
+    print(f"Transliterated {len(rows)} sentences into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,17 @@ import json
 from datetime import datetime
 import random
 
+from modules import metrics
+
 class UserProgressManager:
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, user_id=None, recommender=None):
         """Initialize the user progress manager"""
         # Default to local file-based storage for MVP
         self.db_path = db_path or "user_progress.json"
+        self.user_id = user_id or os.path.splitext(os.path.basename(self.db_path))[0]
+        
+        # Optional collaborative-filtering recommender (see modules/collaborative.py)
+        self.recommender = recommender
         
         # Initialize data structure if file doesn't exist
         if not os.path.exists(self.db_path):
@@ -38,6 +44,7 @@ class UserProgressManager:
         else:
             self.load_progress()
     
+    @metrics.timed("progress_io")
     def load_progress(self):
         """Load user progress from file"""
         try:
@@ -53,6 +60,7 @@ class UserProgressManager:
                 "settings": {"daily_goal_minutes": 15, "difficulty": "beginner"}
             }
     
+    @metrics.timed("progress_io")
     def save_progress(self):
         """Save user progress to file"""
         try:
@@ -136,8 +144,13 @@ class UserProgressManager:
         }
         self.save_progress()
     
-    def record_practice_result(self, difficulty, practice_type, success, content=None):
-        """Record the result of a practice activity"""
+    @metrics.timed("progress_update")
+    def record_practice_result(self, difficulty, practice_type, success, content=None, fingerprint=None):
+        """Record the result of a practice activity
+        
+        fingerprint identifies a banked exercise (see modules/exercise_bank.py), so it can be
+        excluded the next time one is drawn for the learner.
+        """
         # Update current time for activity tracking
         self.progress_data["statistics"]["last_active"] = datetime.now().isoformat()
         self.progress_data["statistics"]["total_attempts"] += 1
@@ -172,14 +185,35 @@ class UserProgressManager:
             # Keep a history of recent content (limit to 50 items)
             if len(stats["content_history"]) >= 50:
                 stats["content_history"].pop(0)  # Remove oldest
-            stats["content_history"].append({
+            entry = {
                 "content_id": hash(str(content)),
                 "timestamp": datetime.now().isoformat(),
                 "success": success
-            })
+            }
+            if fingerprint is not None:
+                entry["fingerprint"] = fingerprint
+            stats["content_history"].append(entry)
         
         self.save_progress()
     
+    def exercise_cursor(self):
+        """The learner's place in the exercise bank: a seed and the exercises drawn per partition
+        
+        PracticeManager.generate_exercise advances it in place, and it is saved with the rest of
+        the progress, so a learner keeps their order through the bank across restarts.
+        """
+        cursor = self.progress_data.get("exercise_cursor")
+        if cursor is None:
+            cursor = self.progress_data["exercise_cursor"] = {"seed": random.getrandbits(64), "positions": {}}
+        return cursor
+    
+    def recent_fingerprints(self, difficulty, practice_type):
+        """Fingerprints of the banked exercises in the learner's recent history of a practice type"""
+        stats = self.progress_data.get("practice_stats", {}).get(difficulty, {}).get(practice_type)
+        if not stats:
+            return set()
+        return {entry["fingerprint"] for entry in stats["content_history"] if "fingerprint" in entry}
+    
     def get_practice_stats(self):
         """Get statistics about practice activities"""
         if "practice_stats" not in self.progress_data:
@@ -189,6 +223,13 @@ class UserProgressManager:
     
     def get_recommended_practice(self, difficulty):
         """Get recommended practice activities based on performance"""
+        # Prefer precomputed recommendations learned from all learners' stats
+        if self.recommender is not None:
+            recommended = self.recommender.recommend(self.user_id, f"practice:{difficulty}", count=1,
+                                                     progress_data=self.progress_data)
+            if recommended:
+                return recommended[0][0].rsplit(":", 1)[1]
+        
         if "practice_stats" not in self.progress_data:
             return None
         
@@ -0,0 +1,169 @@
+import os
+import json
+import logging
+from typing import List, Dict, Any, Sequence, Tuple
+
+import numpy as np
+import faiss
+
+# Supported index layouts, from exact to most compressed
+INDEX_TYPES = ["flat", "fp16", "sq8", "ivfpq"]
+
+
+class CorpusVectorStore:
+    """Memory-lean FAISS index over corpus sentence embeddings"""
+
+    def __init__(self, dimension: int = 1024, index_type: str = "fp16",
+                 nlist: int = None, pq_m: int = 64, pq_bits: int = 8, nprobe: int = 16):
+        """Initialize an empty store with the given index layout
+
+        - flat:  exact float32 vectors (the reference index)
+        - fp16:  half precision scalar quantizer, 2 bytes per dimension
+        - sq8:   8-bit scalar quantizer, 1 byte per dimension
+        - ivfpq: inverted file with product quantization, pq_m bytes per vector
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Index type must be one of {', '.join(INDEX_TYPES)}")
+        if index_type == "ivfpq" and dimension % pq_m != 0:
+            raise ValueError(f"Dimension {dimension} must be divisible by pq_m={pq_m}")
+
+        self.dimension = dimension
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.pq_bits = pq_bits
+        self.nprobe = nprobe
+        self.index = None
+        self.path = None
+
+    def _create_index(self, num_vectors: int):
+        """Create the underlying FAISS index for the configured layout"""
+        metric = faiss.METRIC_INNER_PRODUCT
+        if self.index_type == "flat":
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        if self.index_type == "fp16":
+            sq = faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_fp16, metric)
+            return faiss.IndexIDMap2(sq)
+        if self.index_type == "sq8":
+            sq = faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_8bit, metric)
+            return faiss.IndexIDMap2(sq)
+
+        # Rule of thumb: about 4*sqrt(N) inverted lists, capped so every list gets training points
+        nlist = self.nlist or max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+        self.nlist = nlist
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, self.pq_m, self.pq_bits, metric)
+        index.nprobe = self.nprobe
+        return index
+
+    @staticmethod
+    def _prepare(vectors) -> np.ndarray:
+        """Convert vectors to a contiguous, L2-normalized float32 matrix"""
+        matrix = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    def build(self, vectors, ids: Sequence[int] = None) -> None:
+        """Build the index from scratch, training the quantizer if needed"""
+        matrix = self._prepare(vectors)
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {matrix.shape[1]}")
+
+        # PQ needs 2**pq_bits training points per codebook and IVF one per list, so
+        # small builds (e.g. a sparse refresh shard) use the 8-bit scalar quantizer instead
+        if self.index_type == "ivfpq" and len(matrix) < max(2 ** self.pq_bits, self.nlist or 1):
+            logging.warning(f"{len(matrix)} vectors are too few to train ivfpq, building sq8 instead")
+            self.index_type = "sq8"
+        self.index = self._create_index(len(matrix))
+        if not self.index.is_trained:
+            self.index.train(matrix)
+        self.add(matrix, ids)
+
+    def add(self, vectors, ids: Sequence[int] = None) -> None:
+        """Add vectors to a built index (ids default to consecutive row numbers)"""
+        if self.index is None:
+            raise RuntimeError("Index has not been built or loaded")
+        matrix = self._prepare(vectors)
+        if ids is None:
+            ids = np.arange(self.index.ntotal, self.index.ntotal + len(matrix))
+        self.index.add_with_ids(matrix, np.asarray(ids, dtype=np.int64))
+
+    def search(self, query_vectors, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, ids) of the k nearest corpus vectors for each query"""
+        if self.index is None:
+            raise RuntimeError("Index has not been built or loaded")
+        return self.index.search(self._prepare(query_vectors), k)
+
+    def __len__(self) -> int:
+        return 0 if self.index is None else self.index.ntotal
+
+    def code_size(self) -> int:
+        """Bytes used per stored vector (excluding ids and list overhead)"""
+        if self.index_type == "flat":
+            return self.dimension * 4
+        if self.index_type == "fp16":
+            return self.dimension * 2
+        if self.index_type == "sq8":
+            return self.dimension
+        return self.pq_m * self.pq_bits // 8
+
+    def memory_bytes(self) -> int:
+        """Estimate resident bytes for vector codes plus 64-bit ids"""
+        return len(self) * (self.code_size() + 8)
+
+    def save(self, path: str) -> None:
+        """Write the index and its settings next to each other on disk"""
+        if self.index is None:
+            raise RuntimeError("Index has not been built or loaded")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        faiss.write_index(self.index, path)
+        with open(path + ".json", "w") as f:
+            json.dump(self.get_settings(), f)
+        self.path = path
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get the settings needed to reopen this store"""
+        return {
+            "dimension": self.dimension,
+            "index_type": self.index_type,
+            "nlist": self.nlist,
+            "pq_m": self.pq_m,
+            "pq_bits": self.pq_bits,
+            "nprobe": self.nprobe
+        }
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CorpusVectorStore":
+        """Open a saved store, memory-mapping the vector codes by default
+
+        IO_FLAG_MMAP_IFC maps the codes of the flat and scalar quantizer layouts,
+        which plain IO_FLAG_MMAP (inverted lists only) would read into memory.
+        """
+        with open(path + ".json", "r") as f:
+            settings = json.load(f)
+        store = cls(**settings)
+        if not mmap:
+            flags = 0
+        elif store.index_type == "ivfpq":
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        else:
+            flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+        store.index = faiss.read_index(path, flags)
+        if store.index_type == "ivfpq":
+            faiss.extract_index_ivf(store.index).nprobe = store.nprobe
+        store.path = path
+        logging.info(f"Loaded {store.index_type} vector store with {len(store)} vectors from {path}")
+        return store
+
+
+def embed_texts(embeddings, texts: List[str], batch_size: int = 64) -> np.ndarray:
+    """Embed texts in batches into a float32 matrix, without keeping float64 lists around"""
+    matrix = None
+    for start in range(0, len(texts), batch_size):
+        batch = embeddings.embed_documents(texts[start:start + batch_size])
+        if matrix is None:
+            matrix = np.empty((len(texts), len(batch[0])), dtype=np.float32)
+        matrix[start:start + len(batch)] = batch
+    return matrix if matrix is not None else np.empty((0, 0), dtype=np.float32)
@@ -0,0 +1,54 @@
+import pytest
+
+from modules.ai_service import AIService, FALLBACK_CONTENT, FallbackContent
+from modules.examples import ExampleStore
+from modules.syllabary import JapaneseSyllabary
+
+SYLLABARY = JapaneseSyllabary()
+CHARACTERS = [entry["symbol"] for data in (SYLLABARY.hiragana, SYLLABARY.katakana) for entry in data.values()]
+
+
+@pytest.fixture
+def ai():
+    return AIService(offline=True, example_store=ExampleStore())
+
+
+@pytest.mark.parametrize("character", CHARACTERS)
+def test_fallback_examples_parse(ai, character):
+    examples = ai.generate_example_sentences(character)
+    assert examples and all(example.is_valid() for example in examples)
+
+
+@pytest.mark.parametrize("character", CHARACTERS)
+def test_fallback_tips(ai, character):
+    tips = ai.get_learning_tips(character)
+    assert isinstance(tips, FallbackContent) and character in tips
+
+
+def test_fallback_learning_path(ai):
+    path = ai.create_personalized_learning_path(["anime", "food"])
+    assert isinstance(path, FallbackContent) and "anime, food" in path
+
+
+def test_every_fallback_is_consumed():
+    assert set(FALLBACK_CONTENT) == {"generate_example_sentences", "get_learning_tips",
+                                     "create_personalized_learning_path"}
+
+
+def test_examples_are_cached_per_interest_set():
+    ai = AIService(offline=True, example_store=ExampleStore())
+    ai.llm = object()
+    calls = []
+
+    def run_chain(method, prompt, on_success=None, **inputs):
+        calls.append(inputs["interests"])
+        response = f"Japanese: あさです。\nRomaji: asa desu.\nEnglish: Morning, about {inputs['interests']}."
+        on_success(response)
+        return response
+
+    ai._run_chain = run_chain
+    assert ai.generate_example_sentences("あ", ["Anime", "food"])[0].english == "Morning, about anime, food."
+    assert ai.generate_example_sentences("あ", ["food", "anime"])[0].topic == "anime, food"
+    assert ai.generate_example_sentences("あ", ["travel"])[0].english == "Morning, about travel."
+    assert ai.generate_example_sentences("あ")[0].english == "Morning, about general topics."
+    assert calls == ["anime, food", "travel", "general topics"]
@@ -0,0 +1,65 @@
+import pytest
+
+from modules.answer_checker import AnswerChecker
+
+
+@pytest.fixture(scope="module")
+def checker():
+    return AnswerChecker()
+
+
+@pytest.mark.parametrize("answer, kana, correct", [
+    # Loanword combinations, in common and IME spellings
+    ("paatii", "パーティー", True),
+    ("paathii", "パーティー", True),
+    ("ti", "ティ", True),
+    ("tu", "トゥ", True),
+    ("di", "ディ", True),
+    # Long vowels: doubled, dropped, macron and circumflex
+    ("koohii", "コーヒー", True),
+    ("kōhī", "コーヒー", True),
+    ("kôhî", "コーヒー", True),
+    ("kohi", "コーヒー", True),
+    ("ramen", "ラーメン", True),
+    ("raamen", "ラーメン", True),
+    ("tokyo", "とうきょう", True),
+    ("tōkyō", "とうきょう", True),
+    ("toukyou", "とうきょう", True),
+    ("obaasan", "おばあさん", True),
+    # Kunrei-shiki and Nihon-shiki
+    ("si", "し", True),
+    ("tu", "つ", True),
+    ("zu", "づ", True),
+    ("du", "づ", True),
+    ("ji", "ぢ", True),
+    ("di", "ぢ", True),
+    # Particles
+    ("watashi wa", "わたしは", True),
+    ("watashi ha", "わたしは", True),
+    ("ha", "は", True),
+    ("wa", "は", False),
+    # Sokuon
+    ("kippu", "きっぷ", True),
+    ("kipu", "きっぷ", False),
+    # Plain mistakes
+    ("ka", "さ", False),
+    ("sushi", "すし", True),
+    ("sashi", "すし", False),
+])
+def test_check(checker, answer, kana, correct):
+    assert checker.check(answer, kana=kana).correct is correct
+
+
+@pytest.mark.parametrize("answer, romaji, correct", [
+    ("Tokyo", "Toukyou", True),
+    ("konnichiwa", "konnichiwa", True),
+    ("konnichi ha", "konnichi wa", True),
+    ("konbanwa", "konnichiwa", False),
+])
+def test_check_romaji(checker, answer, romaji, correct):
+    assert checker.check(answer, romaji=romaji).correct is correct
+
+
+def test_close_answer(checker):
+    result = checker.check("sashi", kana="すし")
+    assert result.close and result.distance == 1
@@ -0,0 +1,24 @@
+import os
+
+from modules.audio_cache import AudioCache
+
+
+def test_eviction_removes_the_clip_file(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=1)
+    first = cache.get_or_render("あ", persist=False)
+    second = cache.get_or_render("い", persist=False)
+    assert first not in cache and not os.path.exists(cache.clip_path(first))
+    assert cache.open(first) is None and cache.metadata(first) is None
+    assert os.path.exists(cache.clip_path(second))
+    assert not [name for name in os.listdir(os.path.dirname(cache.clip_path(second))) if name.endswith(".tmp")]
+
+
+def test_reader_returns_the_rendered_wav(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    wav, _ = cache.synthesizer.render("こんにちは")
+    key = cache.put("こんにちは", wav, persist=False)
+    with cache.open(key) as reader:
+        assert reader.read() == wav
+        reader.seek(100)
+        assert reader.read() == wav[100:]
+    assert cache.read_range(key, 10, 50) == wav[10:50]
@@ -0,0 +1,55 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+from modules import cloze_bank, shared_corpus
+from modules.cloze_bank import INTERCHANGEABLE, PATTERNS, ClozeBank
+from modules.corpus_build import build
+from modules.corpus_refresh import CLOZE_BANK_FILE, SENTENCES_FILE, refresh
+
+SENTENCES = ["空港への行き方を教えてください。", "私は本を読んでいます。", "雨なので家にいます。",
+             "東京から大阪まで行きました。", "寿司を食べたことがあります。"]
+
+
+@pytest.mark.parametrize("pattern, excluded", [
+    ("te_iru", {"てください", "てもいい", "てはいけない", "たことがある"}),
+    ("te_kudasai", {"ています", "てもいい", "てはいけない", "たことがある"}),
+    ("node", {"のに"}),
+    ("particle_e", {"に", "から", "まで"}),
+    ("particle_kara", {"へ", "まで", "より"}),
+    ("particle_wa", {"が", "も"}),
+])
+def test_options_leave_out_interchangeable_patterns(pattern, excluded):
+    answer = PATTERNS[pattern][1][0]
+    bank = ClozeBank.mine(SENTENCES, np.zeros(len(SENTENCES), dtype=np.int64))
+    rng = random.Random(0)
+    for _ in range(50):
+        options = bank.options(pattern, answer, count=4, rng=rng)
+        assert answer in options and not excluded & set(options)
+
+
+def test_interchangeable_is_symmetric():
+    for key, others in INTERCHANGEABLE.items():
+        assert key not in others
+        assert all(key in INTERCHANGEABLE[other] for other in others)
+
+
+def write_export(path, sentences):
+    with open(path, "w", encoding="utf-8") as f:
+        for jp_id, text in enumerate(sentences, 1):
+            f.write(f"{jp_id}\t{text}\t{jp_id + 1000}\ttranslation {jp_id}\n")
+
+
+@pytest.mark.parametrize("writer", [lambda corpus_dir, path: build(corpus_dir, path, workers=1), refresh])
+def test_corpus_directory_holds_the_cloze_bank(tmp_path, writer):
+    export = str(tmp_path / "export.tsv")
+    write_export(export, SENTENCES)
+    corpus_dir = str(tmp_path / "corpus")
+    writer(corpus_dir, export)
+
+    store = shared_corpus.map_segment(os.path.join(corpus_dir, SENTENCES_FILE))
+    bank = ClozeBank.load(os.path.join(corpus_dir, CLOZE_BANK_FILE), store)
+    assert bank.count("particle_e") == 1 and bank.count("te_iru") == 1
+    assert len(bank) == len(cloze_bank.ClozeBank.from_store(store))
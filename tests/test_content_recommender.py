@@ -0,0 +1,34 @@
+from modules.ai_service import AIService, FallbackContent
+from modules.content_recommender import ContentRecommender
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return [1.0, float(len(text))]
+
+
+def test_fallback_paths_are_not_cached():
+    ai = AIService(offline=True)
+    ai.embeddings = FakeEmbeddings()
+    recommender = ContentRecommender(ai, theme_index_path=None)
+
+    offline = recommender.generate_recommendation(["anime"])
+    assert isinstance(offline, FallbackContent)
+    assert recommender.get_cache_stats()["entries"] == 0
+
+    ai.llm = object()
+    ai._run_chain = lambda method, prompt, **inputs: f"path for {inputs['interests']}"
+    assert recommender.generate_recommendation(["anime"]) == "path for anime"
+    assert recommender.get_cache_stats()["entries"] == 1
+    assert recommender.generate_recommendation(["Anime"]) == "path for anime"
+
+
+def test_embeddings_go_through_the_breaker():
+    ai = AIService(offline=True, max_attempts=1)
+    ai.embeddings = FakeEmbeddings()
+    for _ in range(ai.breaker.failure_threshold):
+        ai.breaker.record_failure()
+    recommender = ContentRecommender(ai, theme_index_path=None)
+
+    assert isinstance(recommender.generate_recommendation(["anime"]), FallbackContent)
+    assert recommender.get_cache_stats()["entries"] == 0
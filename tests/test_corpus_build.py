@@ -0,0 +1,75 @@
+import hashlib
+import os
+
+from modules import shared_corpus
+from modules.corpus_build import build
+from modules.corpus_refresh import MANIFEST_FILE, SENTENCES_FILE, _save_npz, load_manifest, refresh
+
+# Rows 2 and 4 are duplicates of rows 1 and 3; row 5 differs from row 1 by its question mark
+SENTENCES = {1: "はい、そうです。", 2: "はい そうです！", 3: "東京に行きます。", 4: "東京に行きます", 5: "はい、そうです？",
+             6: "猫が好きです。"}
+
+
+def write_export(path, sentences):
+    with open(path, "w", encoding="utf-8") as f:
+        for jp_id, text in sorted(sentences.items()):
+            f.write(f"{jp_id}\t{text}\t{jp_id + 1000}\ttranslation {jp_id}\n")
+
+
+def digests(corpus_dir):
+    return {name: hashlib.sha256(open(os.path.join(corpus_dir, name), "rb").read()).hexdigest()
+            for name in sorted(os.listdir(corpus_dir)) if os.path.isfile(os.path.join(corpus_dir, name))}
+
+
+def stored_ids(corpus_dir):
+    return sorted(shared_corpus.map_segment(os.path.join(corpus_dir, SENTENCES_FILE)).ids.tolist())
+
+
+def test_build_and_refresh_keep_one_sentence_per_duplicate_cluster(tmp_path):
+    export = str(tmp_path / "export.tsv")
+    write_export(export, SENTENCES)
+    built, refreshed = str(tmp_path / "built"), str(tmp_path / "refreshed")
+
+    stats = build(built, export, workers=1)
+    refresh(refreshed, export)
+
+    assert stats["duplicates"] == 2
+    assert stored_ids(built) == stored_ids(refreshed) == [1, 3, 5, 6]
+    assert load_manifest(built)["ids"].tolist() == [1, 3, 5, 6]
+    shared = digests(refreshed)
+    assert all(digests(built)[name] == digest for name, digest in shared.items())
+
+
+def test_refresh_promotes_a_duplicate_when_its_representative_is_deleted(tmp_path):
+    export = str(tmp_path / "export.tsv")
+    corpus_dir = str(tmp_path / "corpus")
+    write_export(export, SENTENCES)
+    refresh(corpus_dir, export)
+
+    write_export(export, {jp_id: text for jp_id, text in SENTENCES.items() if jp_id != 3})
+    stats = refresh(corpus_dir, export)
+    assert stats["inserted"] == 1 and stats["deleted"] == 1
+    assert stored_ids(corpus_dir) == [1, 4, 5, 6]
+
+
+def test_refresh_rebuilds_artifacts_from_another_dedup_version(tmp_path):
+    export = str(tmp_path / "export.tsv")
+    corpus_dir = str(tmp_path / "corpus")
+    write_export(export, SENTENCES)
+    refresh(corpus_dir, export)
+
+    manifest = load_manifest(corpus_dir)
+    manifest.pop("dedup_version")
+    _save_npz(os.path.join(corpus_dir, MANIFEST_FILE), **manifest)
+    assert refresh(corpus_dir, export)["inserted"] == 4
+
+
+def test_artifacts_replace_files_nothing_reads(tmp_path):
+    export = str(tmp_path / "export.tsv")
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    for name in ("kana_masks.npz", "romaji.npz", "clusters.npz"):
+        (corpus_dir / name).write_bytes(b"")
+    write_export(export, SENTENCES)
+    build(str(corpus_dir), export, workers=1)
+    assert sorted(os.listdir(corpus_dir)) == ["cloze_bank.npz", "distractors.npz", "manifest.npz", "sentences.seg"]
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from modules.exercise_bank import ExerciseBank, write_bank
+from modules.practice_manager import PracticeManager
+from modules.user_data import UserProgressManager
+
+EXERCISES = [{"type": "simple_vocabulary", "question": f"question {i}", "options": ["a", "b", "c", "d"],
+              "answer": "a"} for i in range(30)]
+
+
+@pytest.fixture
+def bank(tmp_path):
+    path = str(tmp_path / "exercises.bank")
+    write_bank(path, {"beginner:simple_vocabulary": EXERCISES, "advanced:grammar_application": EXERCISES[:1]})
+    return ExerciseBank(path)
+
+
+def test_draw_serves_a_whole_pass_before_repeating(bank):
+    position, seen = 0, []
+    for _ in range(2 * len(EXERCISES)):
+        exercise, position = bank.draw("simple_vocabulary", "beginner", 42, position)
+        seen.append(exercise["fingerprint"])
+    assert len(set(seen[:len(EXERCISES)])) == len(set(seen[len(EXERCISES):])) == len(EXERCISES)
+    assert bank.draw("simple_vocabulary", "intermediate", 42, 0) == (None, 0)
+
+
+def test_draw_skips_excluded_fingerprints(bank):
+    exclude = set(bank.fingerprints[:10].tolist())
+    position, seen = 0, set()
+    for _ in range(len(EXERCISES) - len(exclude)):
+        exercise, position = bank.draw("simple_vocabulary", "beginner", 7, position, exclude)
+        seen.add(exercise["fingerprint"])
+    assert seen == set(bank.fingerprints[10:len(EXERCISES)].tolist())
+
+
+def test_sample_skips_excluded_fingerprints(bank):
+    rng = random.Random(0)
+    exclude = set(bank.fingerprints[1:len(EXERCISES)].tolist())
+    for _ in range(20):
+        assert bank.sample("simple_vocabulary", "beginner", exclude, rng)["question"] == "question 0"
+    assert bank.sample("grammar_application", "advanced", set(bank.fingerprints.tolist()), rng) is None
+
+
+def test_cursor_is_kept_with_the_learner_progress(bank, tmp_path):
+    practice_manager = PracticeManager()
+    practice_manager.exercise_bank = bank
+    path = str(tmp_path / "learner.json")
+    user_manager = UserProgressManager(db_path=path)
+    served = [practice_manager.generate_exercise("simple_vocabulary", "beginner", cursor=user_manager.exercise_cursor())
+              for _ in range(10)]
+    user_manager.record_practice_result("beginner", "simple_vocabulary", True, served[-1]["question"],
+                                        served[-1]["fingerprint"])
+
+    # A restart picks the learner's order up where it stopped
+    user_manager = UserProgressManager(db_path=path)
+    assert user_manager.recent_fingerprints("beginner", "simple_vocabulary") == {served[-1]["fingerprint"]}
+    served += [practice_manager.generate_exercise("simple_vocabulary", "beginner", cursor=user_manager.exercise_cursor())
+               for _ in range(len(EXERCISES) - 10)]
+    assert len({exercise["fingerprint"] for exercise in served}) == len(EXERCISES)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from modules.corpus_refresh import DistractorIndex, refresh
+from modules.practice_manager import PracticeManager
+from tests.test_corpus_build import write_export
+
+SENTENCES = {jp_id: text for jp_id, text in enumerate(
+    ["猫がいます。", "犬がいます。", "本を読みます。", "水を飲みます。", "空が青いです。", "山に登ります。",
+     "明日は雨が降るでしょう。", "この本はとても面白いです。", "私は毎日日本語を勉強します。",
+     "駅までどのくらいかかりますか。", "日本の伝統文化について詳しく説明してください。",
+     "環境問題の解決策について話し合いましょう。"], 1)}
+
+
+@pytest.fixture(params=["corpus_dir", "in_tree"])
+def practice_manager(request, tmp_path, monkeypatch):
+    if request.param == "corpus_dir":
+        export = str(tmp_path / "export.tsv")
+        write_export(export, SENTENCES)
+        refresh(str(tmp_path / "corpus"), export)
+        monkeypatch.setenv("TONEMASTER_CORPUS_DIR", str(tmp_path / "corpus"))
+    else:
+        monkeypatch.delenv("TONEMASTER_CORPUS_DIR", raising=False)
+    return PracticeManager()
+
+
+def test_distractors_share_tier_and_length_bucket(practice_manager):
+    store = practice_manager.sentence_store
+    assert len(practice_manager.distractor_index.ids) == len(store)
+    for row in range(len(store)):
+        sentence = store.row(row)
+        key = DistractorIndex.key([store.tiers[row]], [sentence.length])[0]
+        for other in practice_manager.distractor_sentences(sentence, 3):
+            assert other.index != row
+            assert DistractorIndex.key([store.tiers[other.index]], [other.length])[0] == key
+
+
+def test_index_from_the_corpus_directory_maps_ids_to_rows(practice_manager):
+    store = practice_manager.sentence_store
+    rows = practice_manager.distractor_index.ids
+    assert np.array_equal(np.sort(rows), np.arange(len(store)))
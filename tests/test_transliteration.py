@@ -0,0 +1,59 @@
+import pytest
+
+from modules.syllabary import JapaneseSyllabary
+from modules.transliteration import SYSTEMS, Transliterator
+
+# Kana that share a spelling with other kana, so they cannot read back (see Transliterator.__init__)
+SHARED_SPELLINGS = {"ぢ", "づ", "ヂ", "ヅ", "を", "ヲ"}
+
+
+@pytest.fixture(scope="module")
+def transliterator():
+    return Transliterator()
+
+
+@pytest.mark.parametrize("kana, romaji", [
+    ("ティ", "thi"),
+    ("トゥ", "twu"),
+    ("ディ", "dhi"),
+    ("ドゥ", "dwu"),
+    ("パーティー", "paathii"),
+    ("ラーメン", "raamen"),
+    ("コーヒー", "koohii"),
+    ("まっちゃ", "matcha"),
+    ("きっぷ", "kippu"),
+    ("あっ", "a'"),
+    ("うんっ", "un''"),
+    ("すっ、", "su'、"),
+    ("かんい", "kan'i"),
+])
+def test_round_trip(transliterator, kana, romaji):
+    script = "katakana" if any("ァ" <= char <= "ヶ" for char in kana) else "hiragana"
+    assert transliterator.to_romaji(kana) == romaji
+    assert transliterator.to_kana(romaji, script) == kana
+
+
+@pytest.mark.parametrize("system", SYSTEMS)
+@pytest.mark.parametrize("script", ["hiragana", "katakana"])
+def test_learning_tables_round_trip(transliterator, system, script):
+    syllabary = JapaneseSyllabary()
+    data = syllabary.hiragana if script == "hiragana" else syllabary.katakana
+    for entry in data.values():
+        kana = entry["symbol"]
+        if kana in SHARED_SPELLINGS:
+            continue
+        sokuon = syllabary.marks[script]["sokuon"]
+        for text in (kana, kana + sokuon, sokuon + kana):
+            assert transliterator.to_kana(transliterator.to_romaji(text, system), script) == text
+
+
+@pytest.mark.parametrize("romaji, kana", [
+    ("ti", "ち"),
+    ("tu", "つ"),
+    ("di", "ぢ"),
+    ("du", "づ"),
+    ("thi", "てぃ"),
+    ("twu", "とぅ"),
+])
+def test_input_spellings(transliterator, romaji, kana):
+    assert transliterator.to_kana(romaji) == kana
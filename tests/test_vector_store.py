@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from modules.vector_store import CorpusVectorStore, INDEX_TYPES
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_save_and_mmap_load(tmp_path, index_type):
+    vectors = np.random.default_rng(0).random((300, 16), dtype=np.float32)
+    store = CorpusVectorStore(16, index_type, pq_m=4, pq_bits=4)
+    store.build(vectors)
+    path = str(tmp_path / "store.faiss")
+    store.save(path)
+
+    loaded = CorpusVectorStore.load(path)
+    assert len(loaded) == len(vectors)
+    _, ids = loaded.search(vectors[:5], k=1)
+    if index_type != "ivfpq":
+        assert ids[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_small_ivfpq_build_falls_back_to_sq8(tmp_path):
+    vectors = np.random.default_rng(0).random((100, 16), dtype=np.float32)
+    store = CorpusVectorStore(16, "ivfpq", pq_m=4)
+    store.build(vectors)
+    assert store.index_type == "sq8" and len(store) == 100
+
+    path = str(tmp_path / "store.faiss")
+    store.save(path)
+    assert CorpusVectorStore.load(path).index_type == "sq8"